@@ -1,8 +1,37 @@
+import heapq
+import logging
+import math
+import sys
 from enum import Enum, auto
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Dict, Optional
+from datetime import datetime, timedelta
+from itertools import count
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
 from Vehicle import ElectricVehicle, ElectricCar, ElectricBike, VehicleType
+from clock import Clock, SYSTEM_CLOCK
+from events import (CHARGER_ADDED, CHARGER_OCCUPIED, CHARGER_RELEASED, QUEUED, SESSION_ENDED, SESSION_STARTED,
+                    WAIT_CANCELLED)
+from locks import make_lock, synchronized
+from metrics import Metrics, log_event
+from session_history import SessionHistory
+
+# Slotted dataclasses where the interpreter supports them (3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+log = logging.getLogger("parking.charging")
+
+# Operations timed when metrics are DETAILED
+TIMED_OPERATIONS = ("register_charger", "start_session", "stop_session", "request_charging")
+
+# Battery energy per percent of charge (an 80 kWh pack)
+KWH_PER_PERCENT = 0.8
+
+
+def _check_priority(priority):
+    """Raise TypeError unless priority is an int (tiers and queue keys are compared with each other)."""
+    if isinstance(priority, bool) or not isinstance(priority, int):
+        raise TypeError(f"Charging priority must be an integer, got {priority!r}.")
 
 # ==============================
 # ENUMS
@@ -18,39 +47,328 @@ class ChargerStatus(Enum):
 # DOMAIN ENTITIES
 # ==============================
 
-@dataclass
+@dataclass(**_SLOTS)
 class Charger:
     charger_id: str
     connector_type: str
     max_kw: float
     status: ChargerStatus = ChargerStatus.AVAILABLE
+    use_count: int = 0
+    pool: Optional["ChargerPool"] = field(default=None, repr=False, compare=False)
 
     def occupy(self):
         if self.status == ChargerStatus.AVAILABLE:
             self.status = ChargerStatus.OCCUPIED
+            self.use_count += 1
+            if self.pool is not None:
+                self.pool.discard(self)
         else:
             raise RuntimeError(f"Charger {self.charger_id} not available.")
 
     def release(self):
+        if self.status == ChargerStatus.AVAILABLE:
+            return
         self.status = ChargerStatus.AVAILABLE
+        if self.pool is not None:
+            self.pool.add(self)
+
+
+class ChargerPool:
+    """
+    Free chargers sharing one connector type and power level.
+
+    Chargers sit in a heap ordered by use count, so the least-worn free
+    charger is handed out first; ties go to the charger that has been free
+    the longest, which rotates work round-robin. Entries are invalidated
+    lazily, so add, discard and peek are all O(log n) amortized.
+    """
+
+    def __init__(self, connector_type: str, max_kw: float):
+        self.connector_type = connector_type
+        self.max_kw = max_kw
+        self._heap: List[Tuple[int, int, Charger]] = []
+        self._live: Dict[str, int] = {}  # charger_id -> sequence of its valid heap entry
+        self._seq = count()
+
+    def __len__(self):
+        return len(self._live)
+
+    def add(self, charger: Charger):
+        seq = next(self._seq)
+        self._live[charger.charger_id] = seq
+        heapq.heappush(self._heap, (charger.use_count, seq, charger))
+
+    def discard(self, charger: Charger):
+        self._live.pop(charger.charger_id, None)
 
+    def peek(self) -> Optional[Charger]:
+        """Return the best free charger without taking it, or None."""
+        heap = self._heap
+        while heap:
+            _, seq, charger = heap[0]
+            if self._live.get(charger.charger_id) == seq and charger.status == ChargerStatus.AVAILABLE:
+                return charger
+            heapq.heappop(heap)
+        return None
 
-@dataclass
+
+@dataclass(**_SLOTS)
 class ChargingSession:
     session_id: str
     charger_id: str
     vehicle: ElectricVehicle
-    start_time: datetime = field(default_factory=datetime.now)
+    start_time: datetime = field(default_factory=SYSTEM_CLOCK.now)
     end_time: Optional[datetime] = None
     kwh_used: float = 0.0
     rate_per_kwh: float = 50.0  # base rate (KES)
     cost: float = 0.0
+    max_kw: float = 0.0  # rating of the charger in use
+    priority: int = 0  # higher tiers are powered first when the site is at its limit
+    energy_mark: float = field(default=0.0, repr=False, compare=False)  # tier energy integral at start
+    # Energy the battery could still take when the session started, in kWh
+    room_kwh: float = field(default=math.inf, repr=False, compare=False)
 
-    def end_session(self, kwh_used: float):
-        self.end_time = datetime.now()
+    def end_session(self, kwh_used: float, end_time: Optional[datetime] = None):
+        self.end_time = end_time or SYSTEM_CLOCK.now()
         self.kwh_used = kwh_used
         self.cost = round(self.kwh_used * self.rate_per_kwh, 2)
-        self.vehicle.charge = min(100.0, self.vehicle.charge + (kwh_used / 0.8))  # Simulate charge increase
+        self.vehicle.charge = min(100.0, self.vehicle.charge + (kwh_used / KWH_PER_PERCENT))  # Simulate charge increase
+
+
+# ==============================
+# WAITING QUEUE
+# ==============================
+
+@dataclass(**_SLOTS)
+class WaitingVehicle:
+    vehicle: ElectricVehicle
+    enqueued_at: datetime
+    connector_type: Optional[str] = None  # None accepts any connector
+    priority: int = 0  # paid priority; also the session's power tier
+
+
+# Queue order per policy (lower keys are served first; ties go to the earliest arrival)
+QUEUE_POLICIES = {
+    "arrival": lambda waiting: 0,
+    "charge": lambda waiting: waiting.vehicle.charge,  # emptiest battery first
+    "priority": lambda waiting: -waiting.priority,  # highest paid priority first
+}
+
+
+class ChargingQueue:
+    """
+    Vehicles waiting for one connector type.
+
+    A heap keyed by the queue policy, with arrival order as tie-break.
+    Cancelled entries are skipped lazily when they reach the head, so push,
+    pop and cancel are all O(log n) amortized.
+    """
+
+    def __init__(self, policy: str = "arrival"):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self._key = QUEUE_POLICIES[policy]
+        self._heap: List[Tuple[float, int, str]] = []
+        self._live: Dict[str, Tuple[int, WaitingVehicle]] = {}  # regnum -> (sequence, entry)
+        # Wait-time statistics for vehicles that got a charger
+        self.served = 0
+        self.total_wait = 0.0  # seconds
+        self.max_wait = 0.0
+
+    def __len__(self):
+        return len(self._live)
+
+    def __iter__(self):
+        """Waiting vehicles in service order (sorts; meant for display)."""
+        for _, seq, regnum in sorted(self._heap):
+            live = self._live.get(regnum)
+            if live is not None and live[0] == seq:
+                yield live[1]
+
+    def push(self, waiting: WaitingVehicle, seq: int):
+        self._live[waiting.vehicle.regnum] = (seq, waiting)
+        heapq.heappush(self._heap, (self._key(waiting), seq, waiting.vehicle.regnum))
+
+    def discard(self, regnum: str):
+        self._live.pop(regnum, None)
+
+    def head(self) -> Optional[Tuple[float, int, str]]:
+        """Return the (key, sequence, regnum) entry served next, or None."""
+        heap = self._heap
+        while heap:
+            _, seq, regnum = heap[0]
+            live = self._live.get(regnum)
+            if live is not None and live[0] == seq:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def pop(self, now: datetime) -> WaitingVehicle:
+        """Remove the head (call head() first) and record how long it waited."""
+        _, _, regnum = heapq.heappop(self._heap)
+        _, waiting = self._live.pop(regnum)
+        wait = (now - waiting.enqueued_at).total_seconds()
+        self.served += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return waiting
+
+
+# ==============================
+# POWER ALLOCATION
+# ==============================
+
+class PowerScheduler:
+    """
+    Shares a site power limit between active charging sessions.
+
+    Sessions are grouped into priority tiers and higher tiers are served
+    first. Within a tier every session gets the same fraction of its
+    charger's rating, so power is split in proportion to max_kw. Each tier
+    integrates that fraction over time; a session's energy is its rating
+    times the growth of the integral since it started. Starting or stopping
+    a session touches only its tier's demand and one factor per tier, so the
+    cost does not grow with the number of sessions.
+
+    A session whose battery is full (it has received room_kwh) stops
+    drawing power: each tier keeps a heap of the integral values at which
+    its sessions fill up, and time is integrated piecewise up to each
+    completion, where the session's rating leaves the tier's demand and
+    the freed power is shared out again.
+    """
+
+    def __init__(self, site_kw: Optional[float] = None):
+        """
+        Args:
+            site_kw: Grid connection limit in kW, or None for no limit
+        """
+        self.site_kw = site_kw
+        self._demand: Dict[int, float] = {}  # tier -> summed max_kw of its sessions still drawing power
+        self._sessions: Dict[int, int] = {}  # tier -> number of sessions
+        self._share: Dict[int, float] = {}  # tier -> fraction of rated power delivered
+        self._energy: Dict[int, float] = {}  # tier -> integral of the share, in hours
+        # tier -> heap of (integral value at which the battery is full, session id, max_kw)
+        self._full_at: Dict[int, list] = {}
+        self._drawing: Dict[str, float] = {}  # session id -> its full_at value, for sessions still drawing power
+        self._updated: Optional[datetime] = None
+
+    def _integrate(self, hours: float):
+        for tier, share in self._share.items():
+            self._energy[tier] += share * hours
+
+    def _next_completion(self):
+        """Return (hours from _updated, tier) of the next session to fill up, or None."""
+        drawing = self._drawing
+        soonest = None
+        for tier, heap in self._full_at.items():
+            # Sessions stopped before filling up leave their entries behind
+            while heap and drawing.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            share = self._share.get(tier, 0.0)
+            if heap and share > 0:
+                hours = max(0.0, (heap[0][0] - self._energy[tier]) / share)
+                if soonest is None or hours < soonest[0]:
+                    soonest = (hours, tier)
+        return soonest
+
+    def _complete(self, tier: int):
+        """Stop powering the sessions of `tier` that are full, starting with the head of its heap."""
+        heap = self._full_at[tier]
+        energy = self._energy[tier]
+        full_at, session_id, max_kw = heapq.heappop(heap)
+        while True:
+            del self._drawing[session_id]
+            self._demand[tier] -= max_kw
+            if not heap or heap[0][0] > energy or self._drawing.get(heap[0][1]) != heap[0][0]:
+                break
+            full_at, session_id, max_kw = heapq.heappop(heap)
+        if self._demand[tier] < 1e-9:
+            self._demand[tier] = 0.0  # no rounding residue once nobody draws power
+        self._rebalance()
+
+    def _advance(self, now: datetime):
+        """Integrate every tier's share up to `now`, dropping sessions as their batteries fill up."""
+        if self._updated is None:
+            self._updated = now
+            return
+        while now > self._updated:
+            hours = (now - self._updated).total_seconds() / 3600
+            completion = self._next_completion()
+            if completion is None or completion[0] >= hours:
+                self._integrate(hours)
+                self._updated = now
+                return
+            step, tier = completion
+            self._integrate(step)
+            self._updated += timedelta(hours=step)
+            self._complete(tier)
+
+    def _rebalance(self):
+        remaining = math.inf if self.site_kw is None else self.site_kw
+        for tier in sorted(self._demand, reverse=True):
+            demand = self._demand[tier]
+            share = 1.0 if demand <= remaining else remaining / demand
+            self._share[tier] = share
+            remaining = max(0.0, remaining - demand * share)
+
+    def start(self, session: ChargingSession, now: datetime):
+        self._advance(now)
+        tier = session.priority
+        self._sessions[tier] = self._sessions.get(tier, 0) + 1
+        self._demand.setdefault(tier, 0.0)
+        session.energy_mark = self._energy.setdefault(tier, 0.0)
+        if session.room_kwh > 0 and session.max_kw > 0:
+            self._demand[tier] += session.max_kw
+            if session.room_kwh != math.inf:
+                full_at = session.energy_mark + session.room_kwh / session.max_kw
+                self._drawing[session.session_id] = full_at
+                heapq.heappush(self._full_at.setdefault(tier, []), (full_at, session.session_id, session.max_kw))
+            else:
+                self._drawing[session.session_id] = math.inf
+        self._rebalance()
+
+    def stop(self, session: ChargingSession, now: datetime) -> float:
+        """Remove a session and return the energy it received, in kWh."""
+        self._advance(now)
+        tier = session.priority
+        kwh = min(session.room_kwh, session.max_kw * (self._energy[tier] - session.energy_mark))
+        self._sessions[tier] -= 1
+        if self._sessions[tier]:
+            if self._drawing.pop(session.session_id, None) is not None:
+                self._demand[tier] -= session.max_kw
+        else:
+            # Last session of the tier: drop it so rounding errors do not build up
+            self._drawing.pop(session.session_id, None)
+            for table in (self._demand, self._sessions, self._share, self._energy):
+                del table[tier]
+            self._full_at.pop(tier, None)
+        self._rebalance()
+        return kwh
+
+    def delivered(self, session: ChargingSession, now: datetime) -> float:
+        """Energy delivered so far to an active session, in kWh."""
+        self._advance(now)
+        return min(session.room_kwh, session.max_kw * (self._energy[session.priority] - session.energy_mark))
+
+    def power(self, session: ChargingSession, now: Optional[datetime] = None) -> float:
+        """Power delivered to an active session at `now` (default: the last update), in kW; 0 once it is full."""
+        if now is not None:
+            self._advance(now)
+        if session.session_id not in self._drawing:
+            return 0.0
+        return session.max_kw * self._share.get(session.priority, 0.0)
+
+    def load(self, now: Optional[datetime] = None) -> float:
+        """Total power drawn by the site at `now` (default: the last update), in kW."""
+        if now is not None:
+            self._advance(now)
+        return sum(demand * self._share[tier] for tier, demand in self._demand.items())
+
+    def set_limit(self, site_kw: Optional[float], now: datetime):
+        """Change the site limit; energy up to `now` is billed at the old split."""
+        self._advance(now)
+        self.site_kw = site_kw
+        self._rebalance()
 
 
 # ==============================
@@ -58,17 +376,127 @@ class ChargingSession:
 # ==============================
 
 class EVChargingManager:
-    def __init__(self):
+    """
+    Chargers, active sessions, waiting queues and the site power budget.
+
+    With thread_safe=True every public method runs under one manager lock.
+    The power scheduler couples all active sessions (a start or stop
+    changes every session's share), so charging state is not split further.
+
+    Changes are counted in `metrics` and logged to the "parking.charging"
+    logger (chargers at DEBUG, sessions at INFO); neither writes anything
+    unless enabled. Each one also bumps `version`, which keys the cached
+    charger_status() text.
+    """
+
+    def __init__(self, history: Optional[SessionHistory] = None, site_kw: Optional[float] = None,
+                 queue_policy: str = "arrival", clock: Optional[Clock] = None, thread_safe: bool = False,
+                 metrics: Optional[Metrics] = None):
+        """
+        Args:
+            history: Store for finished sessions (in-memory by default)
+            site_kw: Site power limit shared by all sessions, or None for no limit
+            queue_policy: Order of the waiting queues ("arrival", "charge" or "priority")
+            clock: Time source for sessions, queues and energy (the system clock by default)
+            thread_safe: Serialize calls from several threads
+            metrics: Registry to record counters and latencies in (a disabled one by default)
+        """
+        self._lock = make_lock(thread_safe, reentrant=True)
+        self.clock = clock or SYSTEM_CLOCK
         self.chargers: Dict[str, Charger] = {}
+        # Active sessions only; finished ones move to self.history
         self.sessions: Dict[str, ChargingSession] = {}
+        self.active_by_regnum: Dict[str, ChargingSession] = {}
+        self.active_by_charger: Dict[str, ChargingSession] = {}
+        self.history = history if history is not None else SessionHistory()
+        self._next_session = self.history.next_sequence()
+        # (connector_type, max_kw) -> pool of free chargers
+        self.pools: Dict[Tuple[str, float], ChargerPool] = {}
+        self.power = PowerScheduler(site_kw)
+        if queue_policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {queue_policy}")
+        self.queue_policy = queue_policy
+        # connector type (None for "any") -> vehicles waiting for it
+        self.queues: Dict[Optional[str], ChargingQueue] = {}
+        self._waiting: Dict[str, Optional[str]] = {}  # regnum -> key of the queue it is in
+        self._wait_seq = count()
+        self.journal = None  # StateStore recording changes, if persistence is enabled
+        self.events = None  # EventBus told about changes, if anyone subscribes
+        self.version = 0  # bumped by every change to chargers, sessions or waiting queues
+        self._charger_lines: Dict[str, str] = {}  # charger id -> rendered charger_status() line
+        self._stale_chargers = set()  # charger ids whose line must be rendered again
+        self._status = (-1, "")  # (version, text) of the last charger_status()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._register_metrics(self.metrics)
+
+    def _register_metrics(self, metrics: Metrics):
+        self._chargers_added = metrics.counter("chargers_registered_total", "Chargers registered")
+        self._sessions_started = metrics.counter("charging_sessions_started_total", "Charging sessions started")
+        self._sessions_stopped = metrics.counter("charging_sessions_stopped_total", "Charging sessions stopped")
+        self._energy_billed = metrics.counter("charging_energy_kwh_total", "Energy billed by stopped sessions, in kWh")
+        self._revenue = metrics.counter("charging_revenue_kes_total", "Charging fees billed, in KES")
+        self._vehicles_queued = metrics.counter("charging_queued_total", "Vehicles put in a waiting queue")
+        self._waits_cancelled = metrics.counter("charging_wait_cancelled_total", "Vehicles that left a waiting queue")
+        self._latency = {operation: metrics.histogram("charging_operation_seconds", "Time spent in charging operations",
+                                                      operation=operation)
+                         for operation in TIMED_OPERATIONS}
+        # Gauges read the manager at export time, so they cost nothing per operation
+        metrics.gauge("chargers", "Registered chargers", read=lambda: len(self.chargers))
+        metrics.gauge("chargers_occupied", "Chargers with an active session", read=lambda: len(self.active_by_charger))
+        metrics.gauge("charging_waiting", "Vehicles waiting for a charger", read=lambda: len(self._waiting))
+        metrics.gauge("charging_site_load_kw", "Power drawn by all active sessions, in kW", read=self.site_load)
 
+    def _changed(self, charger_id: Optional[str] = None):
+        """Bump the version, marking a charger whose status line is out of date."""
+        self.version += 1
+        if charger_id is not None:
+            self._stale_chargers.add(charger_id)
+
+    def _observe(self, operation: str, started: float):
+        """Record an operation's latency if it was timed (see TIMED_OPERATIONS)."""
+        if started:
+            self._latency[operation].observe(perf_counter() - started)
+
+    @synchronized
     def register_charger(self, charger_id: str, connector_type: str, max_kw: float):
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
+        charger = self._add_charger(charger_id, connector_type, max_kw)
+        if self.journal is not None:
+            self.journal.charger_registered(charger)
+        self._emit(CHARGER_ADDED, charger_id=charger_id)
+        log_event(log, "charger_registered", logging.DEBUG, charger=charger_id, connector=connector_type,
+                  max_kw=max_kw)
+        self._dispatch(charger)
+        if metrics.enabled:
+            self._chargers_added.inc()
+            self._observe("register_charger", started)
+
+    def _add_charger(self, charger_id: str, connector_type: str, max_kw: float, use_count: int = 0) -> Charger:
         if charger_id in self.chargers:
             raise ValueError(f"Charger {charger_id} already exists.")
-        self.chargers[charger_id] = Charger(charger_id, connector_type, max_kw)
-        print(f"✅ Registered charger {charger_id} ({connector_type}, {max_kw}kW).")
+        key = (connector_type, max_kw)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = ChargerPool(connector_type, max_kw)
+        charger = Charger(charger_id, connector_type, max_kw, use_count=use_count, pool=pool)
+        self.chargers[charger_id] = charger
+        pool.add(charger)
+        self._changed(charger_id)
+        return charger
 
-    def start_session(self, session_id: str, charger_id: str, vehicle: ElectricVehicle):
+    @synchronized
+    def new_session_id(self, regnum: str) -> str:
+        """Return a session id that is unique even when a vehicle charges again."""
+        seq = self._next_session
+        self._next_session += 1
+        self.history.reserve(seq)  # a restart must not issue it again, even if the session never stops
+        return f"SESS_{regnum}_{seq}"
+
+    @synchronized
+    def start_session(self, session_id: str, charger_id: str, vehicle: ElectricVehicle, priority: int = 0):
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
         charger = self.chargers.get(charger_id)
         if not charger:
             raise ValueError(f"Charger {charger_id} not found.")
@@ -77,27 +505,349 @@ class EVChargingManager:
 
         if vehicle.vehicle_type not in [VehicleType.ELECTRIC_CAR, VehicleType.ELECTRIC_BIKE]:
             raise TypeError("Only electric vehicles can start a charging session.")
+        if session_id in self.sessions:
+            raise ValueError(f"Session {session_id} is already active.")
+        if vehicle.regnum in self.active_by_regnum:
+            raise RuntimeError(f"Vehicle {vehicle.regnum} is already charging.")
+        _check_priority(priority)
 
+        session = ChargingSession(session_id, charger_id, vehicle, start_time=self.clock.now(),
+                                  max_kw=charger.max_kw, priority=priority,
+                                  room_kwh=(100.0 - vehicle.charge) * KWH_PER_PERCENT)
+        # Power first: the charger is only taken once the scheduler has accepted the session
+        self.power.start(session, session.start_time)
         charger.occupy()
-        session = ChargingSession(session_id, charger_id, vehicle)
         self.sessions[session_id] = session
-        print(f"⚡ Charging started for {vehicle} on charger {charger_id} at {session.start_time}.")
+        self.active_by_regnum[vehicle.regnum] = session
+        self.active_by_charger[charger_id] = session
+        self._changed(charger_id)
+        if self.journal is not None:
+            self.journal.session_started(session)
+        self._emit(CHARGER_OCCUPIED, session.start_time, regnum=vehicle.regnum, charger_id=charger_id,
+                   session_id=session_id)
+        self._emit(SESSION_STARTED, session.start_time, regnum=vehicle.regnum, charger_id=charger_id,
+                   session_id=session_id, vehicle=vehicle)
+        log_event(log, "session_started", session=session_id, regnum=vehicle.regnum, charger=charger_id,
+                  priority=priority)
+        if metrics.enabled:
+            self._sessions_started.inc()
+            self._observe("start_session", started)
 
-    def stop_session(self, session_id: str, kwh_used: float):
-        session = self.sessions.get(session_id)
+    @synchronized
+    def stop_session(self, session_id: str, kwh_used: Optional[float] = None):
+        """
+        End a session and bill it.
+
+        Args:
+            session_id: Active session to stop
+            kwh_used: Metered energy; None bills the energy the scheduler delivered
+        """
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
+        session = self.sessions.pop(session_id, None)
         if not session:
             raise ValueError(f"Session {session_id} not found.")
+        del self.active_by_regnum[session.vehicle.regnum]
+        del self.active_by_charger[session.charger_id]
 
-        session.end_session(kwh_used)
+        now = self.clock.now()
+        delivered = self.power.stop(session, now)
+        session.end_session(round(delivered, 3) if kwh_used is None else kwh_used, now)
         charger = self.chargers.get(session.charger_id)
         charger.release()
+        self.history.append(session)
+        self._changed(charger.charger_id)
+        if self.journal is not None:
+            self.journal.session_stopped(session)
+        regnum = session.vehicle.regnum
+        self._emit(SESSION_ENDED, now, regnum=regnum, charger_id=charger.charger_id, session_id=session_id,
+                   vehicle=session.vehicle, kwh=session.kwh_used)
+        self._emit(CHARGER_RELEASED, now, regnum=regnum, charger_id=charger.charger_id, session_id=session_id)
+        log_event(log, "session_stopped", session=session_id, regnum=regnum, charger=charger.charger_id,
+                  kwh=session.kwh_used, rate=session.rate_per_kwh, cost=session.cost, charge=session.vehicle.charge)
+        if metrics.enabled:
+            self._sessions_stopped.inc()
+            self._energy_billed.inc(session.kwh_used)
+            self._revenue.inc(session.cost)
+
+        # Hand the freed charger straight to the next vehicle in line
+        self._dispatch(charger)
+        if started:
+            self._observe("stop_session", started)
+        return session
+
+    # ==============================
+    # WAITING QUEUE
+    # ==============================
+
+    @synchronized
+    def request_charging(self, vehicle: ElectricVehicle, connector_type: Optional[str] = None,
+                         priority: int = 0) -> Optional[ChargingSession]:
+        """
+        Start charging on the best free charger, or queue the vehicle until one frees up.
 
-        print(f"🔋 Charging stopped for {session.vehicle}.")
-        print(f"⚙️ Total: {session.kwh_used} kWh used at {session.rate_per_kwh} KES/kWh = {session.cost} KES.")
-        print(f"Vehicle now charged to {session.vehicle.charge}%.")
+        Args:
+            vehicle: Electric vehicle to charge
+            connector_type: Required connector, or None for any
+            priority: Paid priority, used by the "priority" policy and as the power tier
 
+        Returns:
+            The started session, or None if the vehicle was queued
+
+        Raises:
+            RuntimeError: If no registered charger could ever serve the vehicle
+        """
+        started = perf_counter() if self.metrics.detailed else 0.0
+        charger = self.find_available_charger(connector_type)
+        if charger is not None:
+            session_id = self.new_session_id(vehicle.regnum)
+            self.start_session(session_id, charger.charger_id, vehicle, priority)
+            session = self.sessions[session_id]
+        elif not any(connector_type in (None, pool_connector) for pool_connector, _ in self.pools):
+            raise RuntimeError("No charging stations available.")
+        else:
+            self.enqueue(vehicle, connector_type, priority)
+            session = None
+        self._observe("request_charging", started)
         return session
 
+    @synchronized
+    def enqueue(self, vehicle: ElectricVehicle, connector_type: Optional[str] = None, priority: int = 0):
+        """Put a vehicle in the waiting queue for its connector type."""
+        regnum = vehicle.regnum
+        if regnum in self.active_by_regnum:
+            raise RuntimeError(f"Vehicle {regnum} is already charging.")
+        if regnum in self._waiting:
+            raise RuntimeError(f"Vehicle {regnum} is already waiting.")
+        _check_priority(priority)
+        waiting = WaitingVehicle(vehicle, self.clock.now(), connector_type, priority)
+        self._push_waiting(waiting)
+        if self.journal is not None:
+            self.journal.vehicle_queued(waiting)
+        self._emit(QUEUED, waiting.enqueued_at, regnum=regnum, vehicle=vehicle)
+        log_event(log, "vehicle_queued", regnum=regnum, connector=connector_type, priority=priority)
+        if self.metrics.enabled:
+            self._vehicles_queued.inc()
+
+    def _push_waiting(self, waiting: WaitingVehicle):
+        queue = self.queues.get(waiting.connector_type)
+        if queue is None:
+            queue = self.queues[waiting.connector_type] = ChargingQueue(self.queue_policy)
+        queue.push(waiting, next(self._wait_seq))
+        self._waiting[waiting.vehicle.regnum] = waiting.connector_type
+        self._changed()
+
+    @synchronized
+    def cancel_waiting(self, regnum: str) -> bool:
+        """Take a vehicle out of the waiting queue; return False if it was not waiting."""
+        if regnum not in self._waiting:
+            return False
+        self.queues[self._waiting.pop(regnum)].discard(regnum)
+        self._changed()
+        if self.journal is not None:
+            self.journal.wait_cancelled(regnum)
+        self._emit(WAIT_CANCELLED, regnum=regnum)
+        log_event(log, "wait_cancelled", regnum=regnum)
+        if self.metrics.enabled:
+            self._waits_cancelled.inc()
+        return True
+
+    def is_waiting(self, regnum: str) -> bool:
+        return regnum in self._waiting
+
+    @synchronized
+    def waiting_vehicles(self) -> List[WaitingVehicle]:
+        """Return every waiting vehicle, each queue in service order."""
+        return [waiting for queue in self.queues.values() for waiting in queue]
+
+    @synchronized
+    def queue_stats(self) -> Dict[str, dict]:
+        """
+        Report queue lengths and wait times.
+
+        Returns:
+            Dict keyed by connector type ("any" for vehicles without a
+            preference) with the number waiting, the number served, and the
+            mean and max wait in seconds of those served
+        """
+        return {
+            connector or "any": {
+                "waiting": len(queue),
+                "served": queue.served,
+                "mean_wait_s": queue.total_wait / queue.served if queue.served else 0.0,
+                "max_wait_s": queue.max_wait,
+            }
+            for connector, queue in self.queues.items()
+        }
+
+    def _emit(self, kind: str, time: Optional[datetime] = None, **fields):
+        """Publish a change event, if anyone is listening."""
+        events = self.events
+        if events is not None and events.active:
+            events.publish(kind, time or self.clock.now(), **fields)
+
+    def _dispatch(self, charger: Charger) -> Optional[ChargingSession]:
+        """Start a session for the best vehicle waiting for this free charger, if any."""
+        if charger.status != ChargerStatus.AVAILABLE:
+            return None
+        best = best_queue = None
+        for queue in (self.queues.get(charger.connector_type), self.queues.get(None)):
+            if not queue:
+                continue
+            head = queue.head()
+            if head is not None and (best is None or head[:2] < best[:2]):
+                best, best_queue = head, queue
+        if best_queue is None:
+            return None
+        waiting = best_queue.pop(self.clock.now())
+        regnum = waiting.vehicle.regnum
+        del self._waiting[regnum]
+        session_id = self.new_session_id(regnum)
+        self.start_session(session_id, charger.charger_id, waiting.vehicle, waiting.priority)
+        return self.sessions[session_id]
+
+    @synchronized
+    def charger_status(self) -> str:
+        """
+        Return one line per charger, then the vehicles waiting to charge in service order.
+
+        Unchanged since the last call: the cached string. Otherwise only the
+        lines of chargers that changed are rendered again before the join.
+        """
+        version, text = self._status
+        if version == self.version:
+            return text
+        lines = self._charger_lines
+        for charger_id in self._stale_chargers:
+            charger = self.chargers[charger_id]
+            line = f"{charger_id}: {charger.status.name} ({charger.connector_type}, {charger.max_kw}kW)"
+            session = self.active_by_charger.get(charger_id)
+            if session is not None:
+                line += f" - Charging {session.vehicle.regnum}"
+            lines[charger_id] = line + "\n"
+        self._stale_chargers.clear()
+        parts = [lines[charger_id] for charger_id in self.chargers]
+        waiting = self.waiting_vehicles()
+        if waiting:
+            parts.append("\nVehicles waiting to charge:\n")
+            parts.extend(f"- {entry.vehicle.regnum} (since {entry.enqueued_at:%H:%M})\n" for entry in waiting)
+        text = "".join(parts)
+        self._status = (self.version, text)
+        return text
+
+    @synchronized
+    def find_available_charger(self, connector_type: Optional[str] = None,
+                               min_kw: Optional[float] = None) -> Optional[Charger]:
+        """
+        Return the best free charger matching the request, without occupying it.
+
+        Args:
+            connector_type: Required connector (e.g. "CCS"), or None for any
+            min_kw: Minimum charger power, or None for any
+
+        Returns:
+            The most powerful matching charger, least used first, or None
+        """
+        best = None
+        for (pool_connector, pool_kw), pool in self.pools.items():
+            if connector_type is not None and pool_connector != connector_type:
+                continue
+            if min_kw is not None and pool_kw < min_kw:
+                continue
+            charger = pool.peek()
+            if charger is None:
+                continue
+            if best is None or (charger.max_kw, -charger.use_count) > (best.max_kw, -best.use_count):
+                best = charger
+        return best
+
+    # ==============================
+    # RESTORE
+    # ==============================
+    #
+    # Used by persistence to rebuild state from a snapshot or journal. These
+    # do not journal, log or hand chargers to the queue: the journal already
+    # holds whatever happened next.
+
+    @synchronized
+    def restore_charger(self, charger_id: str, connector_type: str, max_kw: float, use_count: int = 0):
+        self._add_charger(charger_id, connector_type, max_kw, use_count)
+
+    @synchronized
+    def restore_session(self, session_id: str, charger_id: str, vehicle: ElectricVehicle,
+                        start_time: datetime, priority: int = 0) -> ChargingSession:
+        """Reopen an active session as it was recorded."""
+        if vehicle.regnum in self._waiting:
+            self.queues[self._waiting.pop(vehicle.regnum)].discard(vehicle.regnum)
+        charger = self.chargers[charger_id]
+        session = ChargingSession(session_id, charger_id, vehicle, start_time=start_time,
+                                  max_kw=charger.max_kw, priority=priority,
+                                  room_kwh=(100.0 - vehicle.charge) * KWH_PER_PERCENT)
+        self.power.start(session, start_time)
+        charger.occupy()
+        self.sessions[session_id] = session
+        self.active_by_regnum[vehicle.regnum] = session
+        self.active_by_charger[charger_id] = session
+        self._changed(charger_id)
+        # Keep new session ids past the restored ones
+        suffix = session_id.rsplit("_", 1)[-1]
+        if suffix.isdigit():
+            self._next_session = max(self._next_session, int(suffix) + 1)
+        return session
+
+    @synchronized
+    def restore_stop(self, session_id: str, kwh_used: float, end_time: datetime) -> ChargingSession:
+        """Close a restored session with the energy and end time that were recorded."""
+        session = self.sessions.pop(session_id)
+        del self.active_by_regnum[session.vehicle.regnum]
+        del self.active_by_charger[session.charger_id]
+        self.power.stop(session, end_time)
+        session.end_session(kwh_used, end_time)
+        self.chargers[session.charger_id].release()
+        self.history.append(session)
+        self._changed(session.charger_id)
+        return session
+
+    @synchronized
+    def restore_waiting(self, waiting: WaitingVehicle):
+        self._push_waiting(waiting)
+
+    @synchronized
+    def restore_cancel(self, regnum: str):
+        if regnum in self._waiting:
+            self.queues[self._waiting.pop(regnum)].discard(regnum)
+            self._changed()
+
+    @synchronized
+    def session_power(self, session_id: str) -> float:
+        """Return the power an active session is drawing, in kW."""
+        session = self.sessions.get(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found.")
+        return self.power.power(session, self.clock.now())
+
+    @synchronized
+    def delivered_kwh(self, session_id: str) -> float:
+        """Return the energy delivered so far to an active session."""
+        session = self.sessions.get(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found.")
+        return self.power.delivered(session, self.clock.now())
+
+    @synchronized
+    def site_load(self) -> float:
+        """Return the power drawn by all active sessions, in kW."""
+        return self.power.load(self.clock.now())
+
+    @synchronized
+    def set_site_limit(self, site_kw: Optional[float]):
+        """Change the site power limit; active sessions are rebalanced immediately."""
+        self.power.set_limit(site_kw, self.clock.now())
+
+    def get_active_session(self, regnum: str) -> Optional[ChargingSession]:
+        """Return the vehicle's active charging session, or None."""
+        return self.active_by_regnum.get(regnum)
+
     def get_charger_status(self, charger_id: str) -> ChargerStatus:
         charger = self.chargers.get(charger_id)
         if not charger:
@@ -116,6 +866,8 @@ class EVChargingManager:
 if __name__ == "__main__":
     from Vehicle import VehicleFactory
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Create manager and register chargers
     manager = EVChargingManager()
     manager.register_charger("EV001", "Type2", 22)
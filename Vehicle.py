@@ -1,8 +1,7 @@
 #needed imports
 from enum import Enum, auto
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Type, Dict
+from typing import Type, Dict, NamedTuple, Optional
 
 
 #VehicleType enum to rep different vehicle types
@@ -14,72 +13,80 @@ class VehicleType(Enum):
     ELECTRIC_CAR = auto()
     ELECTRIC_BIKE = auto()
 #Vehicle class that is an abstract base class for all vehicle types
-@dataclass
 class Vehicle(ABC):
-    """Base class for all vehicle types """
-    regnum: str
-    make: str
-    model: str
-    color: str
+    """
+    Base class for all vehicle types.
+
+    Vehicles use __slots__ instead of a per-instance __dict__, which keeps
+    them small and makes attribute access a plain slot lookup.
+    """
+    __slots__ = ("regnum", "make", "model", "color")
+
+    def __init__(self, regnum: str, make: str, model: str, color: str):
+        self.regnum = regnum
+        self.make = make
+        self.model = model
+        self.color = color
 
     @property
     @abstractmethod
     def vehicle_type(self) -> VehicleType:
         pass
 
+    def _fields(self) -> tuple:
+        return (self.regnum, self.make, self.model, self.color)
+
     def __str__(self) -> str:
         return f"{self.vehicle_type.name.title()}: {self.make} {self.model} ({self.regnum})"
-    
-    # Properties with getters and setters for vehicle attributes
-    @property
-    def make(self) -> str:
-        return self._make
-        
-    @make.setter
-    def make(self, value: str) -> None:
-        self._make = value
-        
-    @property
-    def model(self) -> str:
-        return self._model
-        
-    @model.setter
-    def model(self, value: str) -> None:
-        self._model = value
-        
-    @property
-    def color(self) -> str:
-        return self._color
-        
-    @color.setter
-    def color(self, value: str) -> None:
-        self._color = value
-        
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}(regnum={self.regnum!r}, make={self.make!r}, "
+                f"model={self.model!r}, color={self.color!r})")
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
     @property
     def regNum(self) -> str:
-        return self._regnum
-        
+        return self.regnum
+
     @regNum.setter
     def regNum(self, value: str) -> None:
-        self._regnum = value
+        self.regnum = value
+
+    def freeze(self) -> "VehicleRecord":
+        """Return an immutable, compact snapshot of this vehicle."""
+        return VehicleRecord(self.regnum, self.vehicle_type, self.make, self.model, self.color)
 
 class Car(Vehicle):
+    __slots__ = ()
+
     @property
     def vehicle_type(self) -> VehicleType:
         return VehicleType.CAR
 
 class Truck(Vehicle):
+    __slots__ = ()
+
     @property
     def vehicle_type(self) -> VehicleType:
         return VehicleType.TRUCK
 
 class Motorcycle(Vehicle):
+    __slots__ = ()
+
     @property
     def vehicle_type(self) -> VehicleType:
         return VehicleType.MOTORCYCLE
 
 
 class Bus(Vehicle):
+    __slots__ = ()
+
     @property
     def vehicle_type(self) -> VehicleType:
         return VehicleType.BUS
@@ -87,10 +94,16 @@ class Bus(Vehicle):
 #ElectricVehicle Base class and its subclasses
 class ElectricVehicle(Vehicle):
     "Base class for all electric vehicles"
+    __slots__ = ("_charge",)
 
     def __init__(self, regnum:str, make:str, model:str, color:str, charge: float = 0.0):
-        super().__init__(regnum, make, model, color)
-        self.charge = charge  # This will use the setter to validate the value
+        # Fields are set directly rather than through Vehicle.__init__ and the
+        # charge property: this runs for every EV that enters the lot
+        self.regnum = regnum
+        self.make = make
+        self.model = model
+        self.color = color
+        self._charge = max(0.0, min(100.0, charge))  # same clamp as the setter
     
     @property
     def charge(self) -> float:
@@ -101,20 +114,50 @@ class ElectricVehicle(Vehicle):
     def charge(self,value:float) -> None:
         "Set the charge level (0-100)"
         self._charge = max(0.0, min(100.0, value))
-    
+
+    def _fields(self) -> tuple:
+        return (self.regnum, self.make, self.model, self.color, self._charge)
+
+    def __repr__(self) -> str:
+        return f"{super().__repr__()[:-1]}, charge={self._charge!r})"
+
     def __str__(self) -> str:
         return f"{super().__str__()} [Charge: {self.charge}%]"
 
+    def freeze(self) -> "VehicleRecord":
+        return VehicleRecord(self.regnum, self.vehicle_type, self.make, self.model, self.color, self._charge)
+
 class ElectricCar(ElectricVehicle):
+    __slots__ = ()
+
     @property
     def vehicle_type(self) -> VehicleType:
         return VehicleType.ELECTRIC_CAR
 class ElectricBike(ElectricVehicle):
+    __slots__ = ()
+
     @property
     def vehicle_type(self) -> VehicleType:
         return VehicleType.ELECTRIC_BIKE
 
 
+class VehicleRecord(NamedTuple):
+    """Frozen vehicle representation, e.g. for snapshots and caches."""
+    regnum: str
+    vehicle_type: VehicleType
+    make: str
+    model: str
+    color: str
+    charge: Optional[float] = None
+
+    def thaw(self) -> Vehicle:
+        """Build a mutable vehicle object from this record."""
+        kwargs = dict(regnum=self.regnum, make=self.make, model=self.model, color=self.color)
+        if self.charge is not None:
+            kwargs["charge"] = self.charge
+        return VehicleFactory.create_vehicle(vehicle_type=self.vehicle_type, **kwargs)
+
+
 #Factory class for creating vehicle instances
 
 class VehicleFactory:
@@ -147,6 +190,99 @@ class VehicleFactory:
             return vehicle_class(**kwargs)
         except KeyError as e:
             raise ValueError(f"Unknown vehicle type: {vehicle_type}")
+
+    @classmethod
+    def constructor(cls, vehicle_type: VehicleType) -> Type[Vehicle]:
+        """
+        Return the class for a vehicle type, to call with positional arguments.
+
+        Hot paths look the constructor up once and then call it as
+        constructor(regnum, make, model, color[, charge]), skipping the
+        keyword packing of create_vehicle.
+
+        Raises:
+            ValueError: If the vehicle type is unknown
+        """
+        try:
+            return cls._vehicle_map[vehicle_type]
+        except KeyError:
+            raise ValueError(f"Unknown vehicle type: {vehicle_type}")
+
+
+class VehiclePool:
+    """
+    Recycled vehicle objects and shared strings for high-churn gates.
+
+    acquire() builds a vehicle like VehicleFactory, but reuses an object
+    released by an earlier departure when one of the right type is free,
+    and interns make, model and color, so a lot full of white Toyota Axios
+    holds each of those strings once. Electric vehicles are never recycled:
+    their finished charging sessions keep pointing at them.
+
+    A released object is overwritten by a later acquire(), so code keeping
+    a vehicle after it leaves (e.g. a find_vehicle result) must copy it
+    with freeze() first. Lots do not release vehicles while anyone
+    subscribes to their events, since event payloads hold vehicles.
+    """
+
+    def __init__(self, max_free: int = 4096, max_strings: int = 65536):
+        """
+        Args:
+            max_free: Released objects kept per vehicle type; extra ones are left to the garbage collector
+            max_strings: Distinct strings interned; later ones are used as they come
+        """
+        self.max_free = max_free
+        self.max_strings = max_strings
+        self._free: Dict[type, list] = {vehicle_class: [] for vehicle_class in VehicleFactory._vehicle_map.values()
+                                        if not issubclass(vehicle_class, ElectricVehicle)}
+        self._strings: Dict[str, str] = {}
+        # Statistics (approximate when several threads share the pool)
+        self.created = 0
+        self.reused = 0
+
+    def intern(self, text: str) -> str:
+        """Return the shared copy of `text`."""
+        strings = self._strings
+        shared = strings.get(text)
+        if shared is not None:
+            return shared
+        if len(strings) >= self.max_strings:
+            return text
+        return strings.setdefault(text, text)
+
+    def acquire(self, vehicle_type: VehicleType, regnum: str, make: str, model: str, color: str) -> Vehicle:
+        """
+        Return a vehicle of the given type, recycled if one is free.
+
+        Raises:
+            ValueError: If the vehicle type is unknown
+        """
+        vehicle_class = VehicleFactory.constructor(vehicle_type)
+        intern = self.intern
+        make, model, color = intern(make), intern(model), intern(color)
+        free = self._free.get(vehicle_class)
+        if free:
+            try:
+                vehicle = free.pop()
+            except IndexError:  # another thread took the last one
+                pass
+            else:
+                vehicle.regnum = regnum
+                vehicle.make = make
+                vehicle.model = model
+                vehicle.color = color
+                self.reused += 1
+                return vehicle
+        self.created += 1
+        return vehicle_class(regnum, make, model, color)
+
+    def release(self, vehicle: Vehicle):
+        """Keep a vehicle that has left for reuse; the caller must drop every reference to it."""
+        free = self._free.get(type(vehicle))
+        if free is not None and len(free) < self.max_free:
+            free.append(vehicle)
+
+
 if __name__ == "__main__":
     car = VehicleFactory.create_vehicle(
         vehicle_type=VehicleType.CAR,
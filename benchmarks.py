@@ -0,0 +1,603 @@
+"""
+Micro-benchmarks for the parking lot model.
+
+``python -m benchmarks`` runs the core suite: every hot entry point timed
+per call across lot sizes and EV ratios, printed as a table and optionally
+saved as JSON (``--json results.json``) to compare against a later run
+(``--compare results.json``). ``--classic`` runs the older one-off
+benchmarks instead.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from controller import ParkingController
+from EVChargingManager import ChargerStatus
+from metrics import Metrics
+from parking_lot import ParkingLot, slot_request
+from profiling import profiled
+from search import VehicleSearch
+from Vehicle import VehicleFactory, VehiclePool, VehicleType
+
+
+def bench_exit_latency(sizes=(100, 1_000, 10_000, 100_000), samples=1_000):
+    """
+    Measure the average cost of removing a vehicle from a full lot.
+
+    Args:
+        sizes: Lot capacities (regular bays) to measure
+        samples: Number of removals timed per lot size
+
+    Returns:
+        Dict mapping lot size to microseconds per removal
+    """
+    results = {}
+    for size in sizes:
+        lot = ParkingLot()
+        lot.initialize(size, 0, 1)
+        for i in range(size):
+            lot.park_vehicle(f"REG{i}", "Toyota", "Axio", "White", vehicle_type=VehicleType.CAR)
+
+        # Spread removals over the whole lot, starting from the last bay
+        step = max(1, size // samples)
+        targets = [f"REG{i}" for i in range(size - 1, -1, -step)][:samples]
+        start = time.perf_counter()
+        for regnum in targets:
+            lot.remove_vehicle(regnum)
+        elapsed = time.perf_counter() - start
+        results[size] = elapsed / len(targets) * 1e6
+    return results
+
+
+def bench_vehicle_memory(count=100_000):
+    """
+    Measure the memory held by vehicle objects.
+
+    Returns:
+        Dict mapping vehicle type name to bytes per instance
+    """
+    results = {}
+    for v_type, extra in ((VehicleType.CAR, {}), (VehicleType.ELECTRIC_CAR, {"charge": 50.0})):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        vehicles = [
+            VehicleFactory.create_vehicle(vehicle_type=v_type, regnum="KDA 123A", make="Toyota",
+                                          model="Axio", color="White", **extra)
+            for i in range(count)
+        ]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # Exclude the list holding the vehicles
+        results[v_type.name] = (after - before - vehicles.__sizeof__()) / count
+    return results
+
+
+# Make, model and color of the cars in bench_vehicle_pool
+POOL_BENCH_CARS = [("Toyota", "Axio"), ("Toyota", "Probox"), ("Nissan", "Note"), ("Mazda", "Demio"),
+                   ("Subaru", "Forester"), ("Honda", "Fit")]
+POOL_BENCH_COLORS = ["White", "Silver", "Black", "Blue", "Red"]
+
+
+def bench_vehicle_pool(parked=20_000, cycles=100_000):
+    """
+    Compare a gate with and without a VehiclePool.
+
+    Make, model and color arrive as fresh strings for every car, as they do
+    when decoded from a gate's request. The lot is first filled with
+    `parked` cars (tracing memory), then churned: every cycle removes the
+    longest-parked car and parks a new one.
+
+    Returns:
+        Dict keyed "fresh" and "pooled" with vehicle objects allocated per
+        park during the churn, bytes held per parked car after the fill,
+        and microseconds per churn cycle (remove plus park)
+    """
+    def details(i):
+        make, model = POOL_BENCH_CARS[i % len(POOL_BENCH_CARS)]
+        # encode/decode makes new string objects, like a JSON decoder does
+        return (make.encode().decode(), model.encode().decode(),
+                POOL_BENCH_COLORS[i % len(POOL_BENCH_COLORS)].encode().decode())
+
+    results = {}
+    for name, pool in (("fresh", None), ("pooled", VehiclePool())):
+        controller = ParkingController(vehicle_pool=pool)
+        controller.create_lot(parked + 1, 0, 1)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(parked):
+            controller.park(f"KDA {i}", *details(i), vehicle_type=VehicleType.CAR)
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        created_before = pool.created if pool is not None else 0
+        start = time.perf_counter()
+        for i in range(parked, parked + cycles):
+            controller.remove(f"KDA {i - parked}")
+            controller.park(f"KDA {i}", *details(i), vehicle_type=VehicleType.CAR)
+        elapsed = time.perf_counter() - start
+        allocated = pool.created - created_before if pool is not None else cycles
+        results[name] = {
+            "vehicles_allocated_per_park": allocated / cycles,
+            "bytes_per_parked_car": held / parked,
+            "us_per_cycle": elapsed / cycles * 1e6,
+        }
+    return results
+
+
+def bench_park_throughput(count=1_000_000):
+    """
+    Park `count` cars into a lot with exactly that many bays.
+
+    Returns:
+        Dict with vehicles parked per second and total seconds
+    """
+    lot = ParkingLot()
+    lot.initialize(count, 0, 1)
+    start = time.perf_counter()
+    for i in range(count):
+        lot.park_vehicle(f"REG{i}", "Toyota", "Axio", "White", vehicle_type=VehicleType.CAR)
+    elapsed = time.perf_counter() - start
+    return {"vehicles_per_second": count / elapsed, "seconds": elapsed}
+
+
+def bench_gate_burst(burst=20_000, capacity=100_000):
+    """
+    Compare parking a burst of cars one at a time against park_many.
+
+    Returns:
+        Dict with seconds for each approach and the speedup of park_many
+    """
+    records = [(f"KDA {i}", "Toyota", "Probox", "White", VehicleType.CAR) for i in range(burst)]
+
+    looped = ParkingController()
+    looped.create_lot(capacity, 0, 1)
+    start = time.perf_counter()
+    for regnum, make, model, color, v_type in records:
+        looped.park(regnum, make, model, color, vehicle_type=v_type)
+    loop_seconds = time.perf_counter() - start
+
+    batched = ParkingController()
+    batched.create_lot(capacity, 0, 1)
+    start = time.perf_counter()
+    batched.park_many(records)
+    batch_seconds = time.perf_counter() - start
+    return {"park_seconds": loop_seconds, "park_many_seconds": batch_seconds,
+            "speedup": loop_seconds / batch_seconds}
+
+
+def bench_search(vehicles=100_000, repeat=20, seed=1):
+    """
+    Time VehicleSearch queries over a lot of `vehicles` parked cars.
+
+    Returns:
+        Dict mapping query name to milliseconds per query
+    """
+    rng = random.Random(seed)
+    letters = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+    plates = set()
+    while len(plates) < vehicles:
+        plates.add(f"K{rng.choice(letters)}{rng.choice(letters)} {rng.randrange(1000):03d}{rng.choice(letters)}")
+    plates = sorted(plates)
+    controller = ParkingController()
+    controller.create_lot(vehicles, 0, 1)
+    controller.park_many([(plate, *POOL_BENCH_CARS[i % len(POOL_BENCH_CARS)],
+                           POOL_BENCH_COLORS[i % len(POOL_BENCH_COLORS)], VehicleType.CAR)
+                          for i, plate in enumerate(plates)])
+    search = VehicleSearch(controller)
+    plate = plates[len(plates) // 2]
+    misread = plate[:-1] + ("B" if plate[-1] != "B" else "C")
+    queries = {
+        "exact plate": lambda: search.find(plate),
+        "prefix (first 50)": lambda: search.prefix(plate[:5]),
+        "fuzzy, 1 edit": lambda: search.fuzzy(misread, 1),
+        "fuzzy, 2 edits": lambda: search.fuzzy(misread, 2),
+        "white Probox (first 50)": lambda: search.where(color="white", model="Probox", limit=50),
+    }
+    results = {}
+    for name, query in queries.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        results[name] = (time.perf_counter() - start) / repeat * 1e3
+    return results
+
+
+def bench_status_polls(vehicles=100_000, ev_chargers=100, repeat=50):
+    """
+    Time ParkingController.get_status the way the UI polls it.
+
+    Returns:
+        Dict mapping case name to milliseconds per poll: the first render,
+        a poll with nothing changed, and a poll after one car left and one
+        arrived
+    """
+    controller = ParkingController()
+    controller.create_lot(vehicles, ev_chargers, 1)
+    controller.park_many([(f"KDA {i:06d}", "Toyota", "Axio", "White", VehicleType.CAR) for i in range(vehicles)])
+    results = {}
+    start = time.perf_counter()
+    controller.get_status()
+    results["first render"] = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    for _ in range(repeat):
+        controller.get_status()
+    results["unchanged"] = (time.perf_counter() - start) / repeat * 1e3
+    elapsed = 0.0
+    for i in range(repeat):
+        controller.remove(f"KDA {i:06d}")
+        controller.park(f"KDA {i:06d}", "Toyota", "Axio", "White", vehicle_type=VehicleType.CAR)
+        start = time.perf_counter()
+        controller.get_status()
+        elapsed += time.perf_counter() - start
+    results["after a park and a remove"] = elapsed / repeat * 1e3
+    return results
+
+
+# Vehicles sent through the gates by bench_gate_threads
+GATE_TYPE_MIX = [VehicleType.CAR] * 6 + [VehicleType.MOTORCYCLE, VehicleType.TRUCK,
+                                         VehicleType.ELECTRIC_CAR, VehicleType.ELECTRIC_BIKE]
+
+
+def check_consistency(controller):
+    """
+    Cross-check a controller's lots, allocators and charging sessions.
+
+    Returns:
+        A list of problems found; empty when every bay and charger is held
+        by at most one vehicle and all the indexes agree
+    """
+    problems = []
+    lots_by_regnum = {}
+    for lot in controller.lots.values():
+        for regnum in lot._index:
+            lots_by_regnum.setdefault(regnum, []).append(lot.name)
+        for level in lot.levels.values():
+            for kind, slots, bays in (("regular", level.slots, level.regular_bays),
+                                      ("ev", level.ev_slots, level.ev_bays)):
+                owner = [None] * len(slots)
+                indexed = 0
+                for regnum, (level_no, slot_kind, index) in lot._index.items():
+                    if level_no != level.level or slot_kind != kind:
+                        continue
+                    vehicle = slots[index]
+                    if vehicle is None or vehicle.regnum != regnum:
+                        problems.append(f"{regnum}: index points at {kind} bay {index + 1} holding {vehicle}")
+                        continue
+                    indexed += 1
+                    for bay in range(index, index + slot_request(vehicle.vehicle_type)[1]):
+                        if owner[bay] is not None:
+                            problems.append(f"{kind} bay {bay + 1} on level {level.level} given to "
+                                            f"{owner[bay]} and {regnum}")
+                        owner[bay] = regnum
+                held = sum(regnum is not None for regnum in owner)
+                if bays.free != len(slots) - held:
+                    problems.append(f"level {level.level} {kind}: allocator has {bays.free} free bays, "
+                                    f"vehicles leave {len(slots) - held}")
+                for bay, regnum in enumerate(owner):
+                    if bays.is_free(bay) != (regnum is None):
+                        problems.append(f"level {level.level} {kind} bay {bay + 1}: allocator disagrees with owner")
+                if sum(v is not None for v in slots) != indexed:
+                    problems.append(f"level {level.level} {kind}: stray vehicles in bays")
+    for regnum, lots in lots_by_regnum.items():
+        if len(lots) > 1:
+            problems.append(f"{regnum} parked in several lots: {lots}")
+
+    mgr = controller.ev_charging_mgr
+    if len(mgr.active_by_regnum) != len(mgr.sessions) or len(mgr.active_by_charger) != len(mgr.sessions):
+        problems.append("a vehicle or charger has more than one active session")
+    for charger_id, charger in mgr.chargers.items():
+        if (charger.status == ChargerStatus.OCCUPIED) != (charger_id in mgr.active_by_charger):
+            problems.append(f"charger {charger_id} is {charger.status.name} but its sessions disagree")
+    for session in mgr.sessions.values():
+        if session.vehicle.regnum not in lots_by_regnum:
+            problems.append(f"session {session.session_id} charges a vehicle that is not parked")
+    return problems
+
+
+def bench_gate_threads(threads=(1, 2, 4, 8), operations=40_000, levels=4, capacity=2_000, ev_capacity=50,
+                       seed=1):
+    """
+    Run gates as threads against one thread-safe controller.
+
+    Every gate parks and removes vehicles drawn from one shared pool of
+    registrations, so gates race for the same vehicles, the same bays and
+    the same chargers. The pool is larger than the lot, so the lot also
+    fills up and refuses vehicles. After each run the controller is
+    cross-checked with check_consistency.
+
+    Args:
+        threads: Numbers of gate threads to compare
+        operations: Park and remove calls per run, split between the gates
+        levels: Levels in the lot
+        capacity: Regular bays per level
+        ev_capacity: EV bays (and chargers) per level
+        seed: Seed for the gates' random choices
+
+    Returns:
+        Dict mapping thread count to operations per second, calls that
+        succeeded, and the problems found (an empty list when consistent)
+    """
+    pool = int(levels * (capacity + ev_capacity) * 1.5)
+    results = {}
+    for count in threads:
+        controller = ParkingController(thread_safe=True)
+        for level in range(1, levels + 1):
+            controller.create_lot(capacity, ev_capacity, level)
+        succeeded = [0] * count
+        barrier = threading.Barrier(count + 1)
+
+        def gate(number):
+            rng = random.Random(seed * 1000 + number)
+            barrier.wait()
+            done = 0
+            for _ in range(operations // count):
+                i = rng.randrange(pool)
+                regnum = f"GATE {i}"
+                if rng.random() < 0.55:
+                    result = controller.park(regnum, "Toyota", "Axio", "White",
+                                             vehicle_type=GATE_TYPE_MIX[i % len(GATE_TYPE_MIX)])
+                else:
+                    result = controller.remove(regnum)
+                done += bool(result)
+            succeeded[number] = done
+
+        gates = [threading.Thread(target=gate, args=(n,)) for n in range(count)]
+        for thread in gates:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in gates:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        results[count] = {
+            "ops_per_second": operations // count * count / elapsed,
+            "succeeded": sum(succeeded),
+            "problems": check_consistency(controller),
+        }
+    return results
+
+
+# ==============================
+# CORE SUITE
+# ==============================
+
+CORE_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+CORE_EV_RATIOS = (0.0, 0.1)
+
+
+def _is_ev(i, ev_ratio):
+    """Spread EVs evenly: vehicle i is electric when i * ev_ratio crosses a whole number."""
+    return int((i + 1) * ev_ratio) > int(i * ev_ratio)
+
+
+def _timed_phase(name, work):
+    """Run `work` with only entry point `name` profiled; return its histogram and the wall time."""
+    with profiled(Metrics(), [name]) as histograms:
+        start = time.perf_counter()
+        work()
+        seconds = time.perf_counter() - start
+    return histograms[name], seconds
+
+
+def _core_run(size, ev_ratio, status_calls):
+    """Run one size and EV ratio of the core suite; return {entry point: (histogram, seconds)}."""
+    ev_bays = sum(_is_ev(i, ev_ratio) for i in range(size))
+    types = [VehicleType.ELECTRIC_CAR if _is_ev(i, ev_ratio) else VehicleType.CAR for i in range(size)]
+    regnums = [f"KDA {i}" for i in range(size)]
+    polls = max(1, min(status_calls, 100_000 // size))
+    runs = {}
+
+    def create():
+        create_vehicle = VehicleFactory.create_vehicle
+        for regnum, v_type in zip(regnums, types):
+            create_vehicle(vehicle_type=v_type, regnum=regnum, make="Toyota", model="Axio", color="White")
+
+    runs["VehicleFactory.create_vehicle"] = _timed_phase("VehicleFactory.create_vehicle", create)
+
+    # The lot on its own: no charging sessions
+    lot = ParkingLot()
+    lot.initialize(size - ev_bays, ev_bays, 1)
+
+    def park_lot():
+        for regnum, v_type in zip(regnums, types):
+            lot.park_vehicle(regnum, "Toyota", "Axio", "White", vehicle_type=v_type)
+
+    def lot_status():
+        for _ in range(polls):
+            lot.get_status()
+
+    def remove_lot():
+        for regnum in regnums:
+            lot.remove_vehicle(regnum)
+
+    runs["ParkingLot.park_vehicle"] = _timed_phase("ParkingLot.park_vehicle", park_lot)
+    runs["ParkingLot.get_status"] = _timed_phase("ParkingLot.get_status", lot_status)
+    runs["ParkingLot.remove_vehicle"] = _timed_phase("ParkingLot.remove_vehicle", remove_lot)
+    del lot
+
+    # Through the controller: EVs start (and stop) charging sessions
+    controller = ParkingController()
+    controller.create_lot(size - ev_bays, ev_bays, 1)
+
+    def park():
+        for regnum, v_type in zip(regnums, types):
+            controller.park(regnum, "Toyota", "Axio", "White", vehicle_type=v_type)
+
+    def status():
+        for _ in range(polls):
+            controller.get_status()
+
+    def remove():
+        for regnum in regnums:
+            controller.remove(regnum)
+
+    runs["ParkingController.park"] = _timed_phase("ParkingController.park", park)
+    runs["ParkingController.get_status"] = _timed_phase("ParkingController.get_status", status)
+    runs["ParkingController.remove"] = _timed_phase("ParkingController.remove", remove)
+    return runs
+
+
+def bench_core(sizes=CORE_SIZES, ev_ratios=CORE_EV_RATIOS, status_calls=20):
+    """
+    Time every hot entry point per call, across lot sizes and EV ratios.
+
+    For each size and ratio a single-level lot gets `size` bays, that
+    share of them EV bays (with chargers when run through the controller).
+    `size` vehicles are built with the factory, parked until the lot is
+    full, the status report is rendered, and every vehicle is removed,
+    first on a bare ParkingLot and then through a ParkingController. Each
+    phase times only its own entry point with profiling.profiled(), so
+    means include one wrapper call (well under a microsecond, and the same
+    in every version).
+
+    Args:
+        sizes: Bays in the lot
+        ev_ratios: Share of bays (and vehicles) that are electric
+        status_calls: get_status calls per run at most (fewer on big lots)
+
+    Returns:
+        A list of dicts, one per entry point, size and ratio, with the
+        number of calls, calls per second, and the mean, p50, p99 and max
+        bucket of the per-call latency in microseconds
+    """
+    rows = []
+    for size in sizes:
+        for ev_ratio in ev_ratios:
+            for name, (histogram, seconds) in _core_run(size, ev_ratio, status_calls).items():
+                calls = histogram.count
+                rows.append({
+                    "operation": name,
+                    "size": size,
+                    "ev_ratio": ev_ratio,
+                    "calls": calls,
+                    "ops_per_second": calls / seconds if seconds else 0.0,
+                    "mean_us": histogram.sum / calls * 1e6 if calls else 0.0,
+                    "p50_us": histogram.quantile(0.5) * 1e6,
+                    "p99_us": histogram.quantile(0.99) * 1e6,
+                    "max_us": histogram.quantile(1.0) * 1e6,
+                })
+    return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes=CORE_SIZES, ev_ratios=CORE_EV_RATIOS):
+    """Run the core suite and wrap its rows with what is needed to compare runs."""
+    return {
+        "suite": "core",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": bench_core(sizes, ev_ratios),
+    }
+
+
+def compare(baseline, current):
+    """
+    Match the rows of two suite runs.
+
+    Returns:
+        A list of (row of current, mean latency of current / baseline) for
+        every row found in both, so values above 1 are slowdowns
+    """
+    before = {(row["operation"], row["size"], row["ev_ratio"]): row for row in baseline["results"]}
+    matched = []
+    for row in current["results"]:
+        old = before.get((row["operation"], row["size"], row["ev_ratio"]))
+        if old is not None and old["mean_us"]:
+            matched.append((row, row["mean_us"] / old["mean_us"]))
+    return matched
+
+
+def _print_rows(rows, ratios=None):
+    header = (f"{'operation':<30} {'bays':>9} {'ev':>5} {'calls':>9} {'ops/s':>12} {'mean us':>9} {'p50 us':>9} "
+              f"{'p99 us':>9}")
+    print(header + (f" {'vs base':>8}" if ratios is not None else ""))
+    for i, row in enumerate(rows):
+        line = (f"{row['operation']:<30} {row['size']:>9,} {row['ev_ratio']:>5.2f} {row['calls']:>9,} "
+                f"{row['ops_per_second']:>12,.0f} {row['mean_us']:>9.2f} {row['p50_us']:>9.2f} {row['p99_us']:>9.2f}")
+        if ratios is not None:
+            line += f" {ratios[i]:>7.2f}x"
+        print(line)
+
+
+def run_classic():
+    print("Exit latency (remove_vehicle on a full lot)")
+    for size, micros in bench_exit_latency().items():
+        print(f"{size:>8} bays: {micros:.2f} us/exit")
+
+    print("\nMemory per vehicle object")
+    for name, size in bench_vehicle_memory().items():
+        print(f"{name:>14}: {size:.0f} bytes")
+
+    print("\nGate burst (20k cars)")
+    burst = bench_gate_burst()
+    print(f"park loop: {burst['park_seconds']:.2f} s, park_many: {burst['park_many_seconds']:.2f} s "
+          f"({burst['speedup']:.1f}x)")
+
+    print("\nVehicle pool (20k parked, 100k departures and arrivals)")
+    for name, run in bench_vehicle_pool().items():
+        print(f"{name:>7}: {run['vehicles_allocated_per_park']:.3f} vehicle objects per park, "
+              f"{run['bytes_per_parked_car']:.0f} bytes per parked car, {run['us_per_cycle']:.2f} us per cycle")
+
+    print("\nVehicle search (100k parked cars)")
+    for name, millis in bench_search().items():
+        print(f"{name:>24}: {millis:.2f} ms")
+
+    print("\nStatus polls (100k parked cars)")
+    for name, millis in bench_status_polls().items():
+        print(f"{name:>26}: {millis:.3f} ms")
+
+    print("\nGate threads (shared pool, thread-safe controller)")
+    for count, run in bench_gate_threads().items():
+        status = "consistent" if not run["problems"] else f"{len(run['problems'])} problems"
+        print(f"{count:>2} gates: {run['ops_per_second']:,.0f} ops/s, {run['succeeded']} succeeded, {status}")
+
+    print("\nPark throughput (1M bays)")
+    park = bench_park_throughput()
+    print(f"{park['vehicles_per_second']:,.0f} parks/s ({park['seconds']:.1f} s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the parking lot model")
+    parser.add_argument("--sizes", default=",".join(map(str, CORE_SIZES)), help="comma-separated lot sizes in bays")
+    parser.add_argument("--ev-ratios", default=",".join(map(str, CORE_EV_RATIOS)),
+                        help="comma-separated shares of EV bays and vehicles")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--classic", action="store_true", help="run the older one-off benchmarks instead")
+    args = parser.parse_args(argv)
+    if args.classic:
+        run_classic()
+        return
+
+    run = run_suite([int(size) for size in args.sizes.split(",")],
+                    [float(ratio) for ratio in args.ev_ratios.split(",")])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(run, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        matched = compare(baseline, run)
+        print(f"Compared with {baseline.get('commit') or args.compare} (mean latency ratio; above 1 is slower)")
+        _print_rows([row for row, _ in matched], [ratio for _, ratio in matched])
+    else:
+        _print_rows(run["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+
+class Clock:
+    """Source of the current time, shared by the lot, the controller and the charging manager."""
+
+    def now(self) -> datetime:
+        raise NotImplementedError
+
+    def time(self) -> float:
+        """Current time as POSIX seconds."""
+        return self.now().timestamp()
+
+
+class SystemClock(Clock):
+    """
+    Real time that never runs backwards.
+
+    The wall clock is read once; later readings add the elapsed monotonic
+    time, so session durations stay positive even if the system clock is
+    adjusted (NTP steps, DST changes) while the process runs.
+    """
+
+    def __init__(self):
+        self._wall = datetime.now()
+        self._start = time.monotonic()
+
+    def now(self) -> datetime:
+        return self._wall + timedelta(seconds=time.monotonic() - self._start)
+
+
+class VirtualClock(Clock):
+    """Time that only moves when told to, for replays, simulations and tests."""
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._now = start or datetime(2025, 1, 1)
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance(self, delta: Union[timedelta, float]) -> datetime:
+        """Move forward by a timedelta or a number of seconds."""
+        if not isinstance(delta, timedelta):
+            delta = timedelta(seconds=delta)
+        if delta < timedelta(0):
+            raise ValueError("A clock cannot move backwards.")
+        self._now += delta
+        return self._now
+
+    def set(self, moment: datetime) -> datetime:
+        """Jump to `moment`, which must not be in the past."""
+        if moment < self._now:
+            raise ValueError("A clock cannot move backwards.")
+        self._now = moment
+        return self._now
+
+
+# Default for components that are not given a clock
+SYSTEM_CLOCK = SystemClock()
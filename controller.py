@@ -1,24 +1,260 @@
-from datetime import datetime
-from parking_lot import ParkingLot
-from EVChargingManager import EVChargingManager, ChargerStatus
-from Vehicle import VehicleFactory, VehicleType, ElectricVehicle
+import contextlib
+import gc
+from itertools import chain
+from time import perf_counter
+
+from clock import SYSTEM_CLOCK
+from parking_lot import ParkingLot, resolve_vehicle_type, EV, SPACE_NEEDED
+from EVChargingManager import EVChargingManager
+from events import EventBus
+from locks import make_lock
+from metrics import Metrics
+from results import ErrorCode, LotResult, ParkResult, RemoveResult
+from Vehicle import VehicleFactory, VehicleType
+
+DEFAULT_LOT = "Main"
+
+# Gate operations timed when metrics are DETAILED
+TIMED_OPERATIONS = ("park", "remove", "park_many", "remove_many")
+
+# Field order for records passed as tuples to park_many
+RECORD_FIELDS = ("regnum", "make", "model", "color", "vehicle_type")
+
+
+def _is_count(value):
+    """True for a non-negative int (bool excluded)."""
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _vehicle_details_ok(*details):
+    """True if every registration/make/model/color value is a non-empty string."""
+    return all(isinstance(value, str) and value for value in details)
+
+
+def _parse_record(record):
+    """
+    Normalize a park_many record.
+
+    Records are dicts with RECORD_FIELDS keys or tuples in RECORD_FIELDS
+    order; vehicle_type may be a VehicleType or its name and defaults to CAR.
+
+    Returns:
+        (regnum, make, model, color, VehicleType)
+
+    Raises:
+        ValueError: If the record is malformed
+    """
+    if isinstance(record, dict):
+        values = [record.get(name) for name in RECORD_FIELDS]
+    else:
+        values = list(record)
+        if not 4 <= len(values) <= 5:
+            raise ValueError(f"Expected {len(RECORD_FIELDS)} fields, got {len(values)}")
+        values += [None] * (5 - len(values))
+    regnum, make, model, color, vehicle_type = values
+    if not all([regnum, make, model, color]):
+        raise ValueError("Missing vehicle details")
+    if not _vehicle_details_ok(regnum, make, model, color):
+        raise ValueError("Registration number, make, model and color must be strings")
+    if vehicle_type is None:
+        vehicle_type = VehicleType.CAR
+    elif isinstance(vehicle_type, str):
+        try:
+            vehicle_type = VehicleType[vehicle_type.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown vehicle type: {vehicle_type}")
+    return regnum, make, model, color, vehicle_type
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Hold off the cyclic garbage collector for the block.
+
+    A burst allocates tens of thousands of vehicles, results and index
+    entries, none of them in reference cycles, and each collection they
+    trigger rescans all of them. Collection resumes (if it was on) at the
+    end of the block.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _record_columns(records):
+    """
+    Split a burst of well-formed park_many tuples into columns.
+
+    Each check runs over a whole column at C speed, so a clean burst is
+    validated without a Python-level step per record.
+
+    Returns:
+        (regnums, makes, models, colors, vehicle types) tuples, or None if
+        any record needs the per-record path (dicts, type names, missing or
+        non-string details)
+    """
+    if not records or set(map(type, records)) != {tuple} or set(map(len, records)) != {len(RECORD_FIELDS)}:
+        return None
+    columns = tuple(zip(*records))
+    details = columns[:4]
+    if set(map(type, chain.from_iterable(details))) != {str} or not all(map(all, details)):
+        return None
+    if set(map(type, columns[4])) != {VehicleType}:
+        return None
+    return columns
+
 
 class ParkingController:
-    def __init__(self):
-        self.lot = ParkingLot()
-        self.ev_charging_mgr = EVChargingManager()
-
-    def create_lot(self, capacity, ev_capacity, level):
-        self.lot.initialize(capacity, ev_capacity, level)
-        # Register EV chargers based on EV capacity
-        for i in range(1, ev_capacity + 1):
-            charger_id = f"EV{str(i).zfill(3)}"
-            connector_type = "CCS" if i % 2 == 0 else "Type2"  # Alternate charger types
-            max_kw = 50.0 if i % 2 == 0 else 22.0  # Different power levels
-            self.ev_charging_mgr.register_charger(charger_id, connector_type, max_kw)
-        return f"Created parking lot: {capacity} regular, {ev_capacity} EV slots on level {level}. Registered {ev_capacity} EV chargers."
-
-    def park(self, regnum, make, model, color, is_electric=None, is_motorcycle=None, vehicle_type=None):
+    """
+    Front door for gates: parks and removes vehicles across lots and runs their charging sessions.
+
+    With thread_safe=True several gates can call the controller at once.
+    A vehicle is claimed by registration number for the length of its park
+    or remove call, so two gates can never park, or remove, the same
+    vehicle twice; the lots and the charging manager lock their own state.
+    """
+
+    def __init__(self, placement=None, tariff=None, queue_policy="arrival", clock=None, thread_safe=False,
+                 metrics=None, vehicle_pool=None):
+        """
+        Args:
+            placement: PlacementPolicy used by every lot to pick a level
+            tariff: FeeStrategy used by every lot (e.g. TimeBasedFee, charged at
+                exit; see ParkingLot); None keeps the flat fees charged on entry
+            queue_policy: Order in which EVs waiting for a charger are served
+                ("arrival", "charge" or "priority")
+            clock: Time source shared by the lots and the charging manager
+                (the system clock by default; pass a VirtualClock to replay or simulate)
+            thread_safe: Make the controller, its lots and its charging manager
+                safe to share between gate threads
+            metrics: Metrics registry shared with the charging manager; a
+                disabled one by default (call metrics.set_level to turn it on)
+            vehicle_pool: VehiclePool recycling the vehicles of departed cars
+                for new arrivals; None builds a fresh object per arrival
+        """
+        self.thread_safe = thread_safe
+        self._lock = make_lock(thread_safe, reentrant=True)
+        self._claims = set()  # regnums a gate is parking or removing right now
+        self.clock = clock or SYSTEM_CLOCK
+        self.placement = placement
+        self.tariff = tariff
+        self.lots = {}  # lot name -> ParkingLot
+        self.journal = None  # StateStore set by StateStore.open, if persistence is enabled
+        self.vehicle_pool = vehicle_pool
+        # Change events from every lot and the charging manager; subscribe instead of polling get_status()
+        self.events = EventBus()
+        self.lot = self._get_lot(DEFAULT_LOT)  # default lot for single-site callers
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._register_metrics(self.metrics)
+        self.ev_charging_mgr = EVChargingManager(queue_policy=queue_policy, clock=self.clock,
+                                                 thread_safe=thread_safe, metrics=self.metrics)
+        self.ev_charging_mgr.events = self.events
+        self._status = None  # (status key, text) of the last get_status()
+        self._history_status = (-1, "")  # (charging manager version, finished-session text)
+        self._session_text = {}  # session id -> rendered get_charging_status() entry of a finished session
+
+    def _register_metrics(self, metrics):
+        self._parked_total = metrics.counter("vehicles_parked_total", "Vehicles given a bay")
+        self._refused_total = metrics.counter("park_refused_total", "Park requests refused")
+        self._removed_total = metrics.counter("vehicles_removed_total", "Vehicles that left")
+        self._latency = {operation: metrics.histogram("gate_operation_seconds", "Time spent in gate operations",
+                                                      operation=operation)
+                         for operation in TIMED_OPERATIONS}
+        metrics.gauge("vehicles_parked", "Vehicles parked in all lots",
+                      read=lambda: sum(len(lot._index) for lot in list(self.lots.values())))
+
+    def _record(self, operation, started, parked=0, refused=0, removed=0):
+        """Count a finished gate operation and record its latency if it was timed."""
+        elapsed = perf_counter() - started if started else None
+        with self._lock:  # gates finish operations concurrently in thread-safe mode
+            self._parked_total.inc(parked)
+            self._refused_total.inc(refused)
+            self._removed_total.inc(removed)
+            if elapsed is not None:
+                self._latency[operation].observe(elapsed)
+
+    def _get_lot(self, name):
+        with self._lock:
+            lot = self.lots.get(name)
+            if lot is None:
+                lot = self.lots[name] = ParkingLot(name, self.placement, self.tariff, self.clock, self.thread_safe)
+                lot.journal = self.journal
+                lot.events = self.events
+                lot.vehicle_pool = self.vehicle_pool
+            return lot
+
+    def _claim(self, regnum):
+        """Reserve a registration number for one park or remove call; False if another gate holds it."""
+        with self._lock:
+            if regnum in self._claims:
+                return False
+            self._claims.add(regnum)
+            return True
+
+    def _unclaim(self, regnums):
+        with self._lock:
+            self._claims.difference_update(regnums)
+
+    def _find_lot(self, regnum):
+        """Return the lot where a vehicle is parked, or None."""
+        for lot in self.lots.values():
+            if lot.is_parked(regnum):
+                return lot
+        return None
+
+    def create_lot(self, capacity, ev_capacity, level, lot_name=None, exit_distance=None, chargers=None):
+        """
+        Add a level to a lot, creating the lot on first use.
+
+        Existing levels and lots are kept, so one controller can serve
+        several multi-storey sites.
+
+        Args:
+            capacity: Number of regular bays on the level
+            ev_capacity: Number of EV bays (and chargers) on the level
+            level: Level number, unique within the lot
+            lot_name: Lot to add the level to (the default lot if None)
+            exit_distance: Distance from the level to the exit
+            chargers: Chargers to install on the level, at most one per EV
+                bay (one per EV bay if None); with fewer chargers than EV
+                bays, parked EVs wait in the charging queue for a free one
+        """
+        if not (_is_count(capacity) and _is_count(ev_capacity)):
+            return LotResult(False, lot_name or DEFAULT_LOT, level, error=ErrorCode.INVALID_INPUT,
+                             detail=f"Bay counts must be whole numbers of at least 0, got {capacity!r} and "
+                                    f"{ev_capacity!r}")
+        if isinstance(level, bool) or not isinstance(level, int):
+            return LotResult(False, lot_name or DEFAULT_LOT, level, error=ErrorCode.INVALID_INPUT,
+                             detail=f"Level must be a whole number, got {level!r}")
+        if lot_name is not None and not isinstance(lot_name, str):
+            return LotResult(False, DEFAULT_LOT, level, error=ErrorCode.INVALID_INPUT,
+                             detail=f"Lot name must be a string, got {lot_name!r}")
+        if chargers is None:
+            chargers = ev_capacity
+        elif isinstance(chargers, bool) or not isinstance(chargers, int) or not 0 <= chargers <= ev_capacity:
+            return LotResult(False, lot_name or DEFAULT_LOT, level, error=ErrorCode.INVALID_INPUT,
+                             detail=f"Chargers must be a whole number from 0 to {ev_capacity}, got {chargers!r}")
+        with self._lock:  # charger numbering must not interleave with another create_lot
+            lot = self._get_lot(lot_name or DEFAULT_LOT)
+            try:
+                lot.add_level(capacity, ev_capacity, level, exit_distance=exit_distance)
+            except ValueError as e:
+                return LotResult(False, lot.name, level, error=ErrorCode.LEVEL_EXISTS, detail=str(e))
+            # Register EV chargers based on EV capacity, numbered after the existing ones
+            first = len(self.ev_charging_mgr.chargers) + 1
+            for i in range(first, first + chargers):
+                charger_id = f"EV{str(i).zfill(3)}"
+                connector_type = "CCS" if i % 2 == 0 else "Type2"  # Alternate charger types
+                max_kw = 50.0 if i % 2 == 0 else 22.0  # Different power levels
+                self.ev_charging_mgr.register_charger(charger_id, connector_type, max_kw)
+        return LotResult(True, lot.name, level, capacity, ev_capacity, chargers, show_lot=len(self.lots) > 1)
+
+    def park(self, regnum, make, model, color, is_electric=None, is_motorcycle=None, vehicle_type=None,
+             lot_name=None, level=None, priority=0):
         """
         Park a vehicle in the parking lot.
         
@@ -30,102 +266,362 @@ class ParkingController:
             is_electric: (Optional) Whether the vehicle is electric
             is_motorcycle: (Optional) Whether the vehicle is a motorcycle
             vehicle_type: (Optional) Explicit VehicleType enum value
+            lot_name: (Optional) Lot to park in; the default lot if None
+            level: (Optional) Level to park on; chosen by the placement policy if None
+            priority: (Optional) Paid charging priority for EVs
+
+        Returns:
+            A ParkResult; str() of it gives the message shown to users
         """
+        if vehicle_type is None and (is_electric is None or is_motorcycle is None):
+            return ParkResult(regnum, False, error=ErrorCode.INVALID_INPUT,
+                              detail="Either vehicle_type or both is_electric and is_motorcycle must be provided")
+        if not _vehicle_details_ok(regnum, make, model, color):
+            return ParkResult(regnum if isinstance(regnum, str) else None, False, error=ErrorCode.INVALID_INPUT,
+                              detail="Registration number, make, model and color must be non-empty strings")
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            return ParkResult(regnum, False, error=ErrorCode.INVALID_INPUT,
+                              detail=f"Charging priority must be an integer, got {priority!r}")
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
+        v_type = resolve_vehicle_type(is_electric, is_motorcycle, vehicle_type)
+        if not self._claim(regnum):
+            result = ParkResult(regnum, False, v_type, error=ErrorCode.ALREADY_PARKED)
+        else:
+            try:
+                result = self._park(regnum, make, model, color, v_type, lot_name, level, priority)
+            finally:
+                self._unclaim((regnum,))
+        if metrics.enabled:
+            self._record("park", started, parked=result.ok, refused=not result.ok)
+        return result
+
+    def _park(self, regnum, make, model, color, v_type, lot_name, level, priority):
+        if self._find_lot(regnum) is not None:
+            return ParkResult(regnum, False, v_type, error=ErrorCode.ALREADY_PARKED)
+        if lot_name is not None and lot_name not in self.lots:
+            return ParkResult(regnum, False, v_type, lot_name, error=ErrorCode.UNKNOWN_LOT)
+        lot = self.lots[lot_name] if lot_name is not None else self.lot
+
+        # Build the vehicle once; the same object is parked and charged
         try:
-            # If vehicle_type is provided, determine is_electric and is_motorcycle from it
-            if vehicle_type is not None:
-                is_electric = vehicle_type in (VehicleType.ELECTRIC_CAR, VehicleType.ELECTRIC_BIKE)
-                is_motorcycle = vehicle_type in (VehicleType.MOTORCYCLE, VehicleType.ELECTRIC_BIKE)
-            elif is_electric is None or is_motorcycle is None:
-                raise ValueError("Either vehicle_type or both is_electric and is_motorcycle must be provided")
-                
-            # Park the vehicle
-            result = self.lot.park_vehicle(
-                regnum=regnum,
-                make=make,
-                model=model,
-                color=color,
-                is_electric=is_electric,
-                is_motorcycle=is_motorcycle,
-                vehicle_type=vehicle_type
-            )
-            
-            # If it's an electric vehicle, try to start a charging session
-            if is_electric:
-                ev_vehicle_type = VehicleType.ELECTRIC_BIKE if is_motorcycle else VehicleType.ELECTRIC_CAR
-                ev = VehicleFactory.create_vehicle(
-                    vehicle_type=ev_vehicle_type,
-                    regnum=regnum,
-                    make=make,
-                    model=model,
-                    color=color,
-                    charge=0.0  # Default charge level
-                )
-                # Find an available charger
-                for charger_id, charger in self.ev_charging_mgr.chargers.items():
-                    if charger.status == ChargerStatus.AVAILABLE:
-                        session_id = f"SESS_{regnum}"
-                        self.ev_charging_mgr.start_session(session_id, charger_id, ev)
-                        return f"{result} and started charging at {charger_id}"
-                return f"{result} (No charging stations available)"
-                
+            if self.vehicle_pool is not None:
+                vehicle = self.vehicle_pool.acquire(v_type, regnum, make, model, color)
+            else:
+                vehicle = VehicleFactory.constructor(v_type)(regnum, make, model, color)
+        except ValueError as e:
+            return ParkResult(regnum, False, error=ErrorCode.INVALID_INPUT, detail=str(e))
+        result = lot.park(vehicle, level=level)
+        if not result.ok:
+            # Never published, so nobody else holds it
+            if self.vehicle_pool is not None:
+                self.vehicle_pool.release(vehicle)
             return result
-            
-        except Exception as e:
-            return f"Error parking vehicle: {e}"
+
+        # If the EV got a bay, try to start a charging session
+        if result.kind == EV:
+            self._start_charging(result, vehicle, priority)
+        return result
+
+    def _start_charging(self, result, vehicle, priority=0):
+        """Start a session on the best free charger, or queue for one, and record it on `result`."""
+        try:
+            session = self.ev_charging_mgr.request_charging(vehicle, priority=priority)
+        except RuntimeError:
+            result.charging = False  # no chargers at all
+            return
+        if session is None:
+            result.charging = False
+            result.queued = True
+            return
+        result.session_id = session.session_id
+        result.charger_id = session.charger_id
+        result.charging = True
 
     def remove(self, regnum):
-        # First check if the vehicle is in a charging session
-        for session_id, session in self.ev_charging_mgr.sessions.items():
-            if session.vehicle.regnum == regnum:
-                self.ev_charging_mgr.stop_session(session_id, kwh_used=10.0)  # Example: 10kWh used
-                break
-        return self.lot.remove_vehicle(regnum)
+        """
+        Remove a vehicle, stopping its charging session first.
+
+        Returns:
+            A RemoveResult; str() of it gives the message shown to users
+        """
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
+        if not self._claim(regnum):
+            # Another gate is parking or removing it, so it is not parked here to remove
+            result = RemoveResult(regnum, False, error=ErrorCode.NOT_FOUND)
+        else:
+            try:
+                result = self._remove(regnum)
+            finally:
+                self._unclaim((regnum,))
+        if metrics.enabled:
+            self._record("remove", started, removed=result.ok)
+        return result
+
+    def _remove(self, regnum):
+        lot = self._find_lot(regnum)
+        if lot is None:
+            return RemoveResult(regnum, False, error=ErrorCode.NOT_FOUND)
+        session = self._stop_charging(regnum)
+        result = lot.remove_vehicle(regnum)
+        self._record_session(result, session)
+        return result
+
+    def _stop_charging(self, regnum):
+        """Stop the vehicle's charging session, if any, and return it."""
+        self.ev_charging_mgr.cancel_waiting(regnum)
+        session = self.ev_charging_mgr.get_active_session(regnum)
+        if session is not None:
+            self.ev_charging_mgr.stop_session(session.session_id)  # billed on delivered energy
+        return session
+
+    @staticmethod
+    def _record_session(result, session):
+        if session is not None:
+            result.session_id = session.session_id
+            result.charger_id = session.charger_id
+            result.kwh_used = session.kwh_used
+            result.charging_cost = session.cost
+
+    def park_many(self, records, lot_name=None):
+        """
+        Park a burst of vehicles, e.g. plate reads from gates after an event.
+
+        Records are validated up front, column by column when the burst is
+        made of well-formed tuples, bays are allocated in one pass per
+        level, and each car gets a single vehicle object that is reused for
+        its charging session.
+
+        Args:
+            records: Iterable of dicts or tuples (see RECORD_FIELDS)
+            lot_name: Lot to park in; the default lot if None
+
+        Returns:
+            A list of ParkResult, one per record, in input order
+        """
+        with _gc_paused():
+            return self._park_many(records, lot_name)
+
+    def _park_many(self, records, lot_name):
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
+        lot = self.lots.get(lot_name) if lot_name is not None else self.lot
+        if type(records) is not list:
+            records = list(records)
+        pool = self.vehicle_pool
+        with self._lock:
+            parked = [other._index for other in self.lots.values()]
+            claims = self._claims
+            columns = _record_columns(records) if lot is not None else None
+            seen = set(columns[0]) if columns is not None else None
+            if (seen is not None and len(seen) == len(records) and seen.isdisjoint(claims)
+                    and all(index.keys().isdisjoint(seen) for index in parked)):
+                # Clean burst: every record is new and valid, so build all the vehicles in one pass
+                results = [None] * len(records)
+                positions = range(len(records))
+                vehicles = self._build_vehicles(*columns)
+            else:
+                results, positions, vehicles, seen = self._check_records(records, lot, lot_name, parked)
+            # The whole batch is claimed at once, so other gates cannot park these meanwhile
+            claims.update(seen)
+
+        try:
+            if vehicles:
+                placed = lot.parked_results(vehicles, lot.place_many(vehicles))
+                for position, vehicle, result in zip(positions, vehicles, placed):
+                    if result is None:
+                        result = lot.refusal(vehicle)
+                        if pool is not None:
+                            pool.release(vehicle)
+                    elif result.kind == EV:
+                        self._start_charging(result, vehicle)
+                    results[position] = result
+        finally:
+            self._unclaim(seen)
+        if metrics.enabled:
+            parked = sum(result.ok for result in results)
+            self._record("park_many", started, parked=parked, refused=len(results) - parked)
+        return results
+
+    def _build_vehicles(self, regnums, makes, models, colors, v_types):
+        """Build the vehicles for columns of park_many details, from the pool if there is one."""
+        if self.vehicle_pool is not None:
+            return list(map(self.vehicle_pool.acquire, v_types, regnums, makes, models, colors))
+        vehicle_map = VehicleFactory._vehicle_map
+        if v_types.count(v_types[0]) == len(v_types):
+            # One type throughout: call its constructor straight from map()
+            return list(map(vehicle_map[v_types[0]], regnums, makes, models, colors))
+        return [vehicle_map[v_type](regnum, make, model, color)
+                for regnum, make, model, color, v_type in zip(regnums, makes, models, colors, v_types)]
+
+    def _check_records(self, records, lot, lot_name, parked):
+        """
+        Validate park_many records one by one; called with the lock held.
+
+        Returns:
+            (results with None where a vehicle still has to be placed,
+            positions of those vehicles in results, the vehicles, and the
+            set of their registration numbers)
+        """
+        results = []
+        positions = []
+        vehicles = []
+        seen = set()
+        vehicle_map = VehicleFactory._vehicle_map
+        pool = self.vehicle_pool
+        claims = self._claims
+        for record in records:
+            # Fast path for well-formed tuples; anything else is normalized
+            if (type(record) is tuple and len(record) == 5 and type(record[4]) is VehicleType and all(record)
+                    and type(record[0]) is str and type(record[1]) is str and type(record[2]) is str
+                    and type(record[3]) is str):
+                regnum, make, model, color, v_type = record
+            else:
+                try:
+                    regnum, make, model, color, v_type = _parse_record(record)
+                except (ValueError, TypeError) as e:
+                    results.append(ParkResult(None, False, error=ErrorCode.INVALID_INPUT, detail=str(e)))
+                    continue
+            if lot is None:
+                results.append(ParkResult(regnum, False, v_type, lot_name, error=ErrorCode.UNKNOWN_LOT))
+            elif regnum in seen or regnum in claims or any(regnum in index for index in parked):
+                results.append(ParkResult(regnum, False, v_type, error=ErrorCode.ALREADY_PARKED))
+            else:
+                seen.add(regnum)
+                if pool is not None:
+                    vehicle = pool.acquire(v_type, regnum, make, model, color)
+                else:
+                    vehicle = vehicle_map[v_type](regnum, make, model, color)
+                positions.append(len(results))
+                vehicles.append(vehicle)
+                results.append(None)
+        return results, positions, vehicles, seen
+
+    def remove_many(self, regnums):
+        """
+        Remove many vehicles at once, stopping their charging sessions.
+
+        Returns:
+            A list of RemoveResult, one per registration number, in input order
+        """
+        metrics = self.metrics
+        started = perf_counter() if metrics.detailed else 0.0
+        by_lot = {}  # lot name -> results for vehicles parked there
+        results = []
+        claimed = []
+        try:
+            for regnum in regnums:
+                lot = None
+                if self._claim(regnum):
+                    claimed.append(regnum)
+                    lot = self._find_lot(regnum)
+                if lot is None:
+                    results.append(RemoveResult(regnum, False, error=ErrorCode.NOT_FOUND))
+                    continue
+                result = RemoveResult(regnum, True, lot=lot.name)
+                results.append(result)
+                self._record_session(result, self._stop_charging(regnum))
+                by_lot.setdefault(lot.name, []).append(result)
+            self._release_lots(by_lot)
+        finally:
+            self._unclaim(claimed)
+        if metrics.enabled:
+            self._record("remove_many", started, removed=sum(result.ok for result in results))
+        return results
+
+    def _release_lots(self, by_lot):
+        """Free the bays of claimed vehicles lot by lot and fill in their RemoveResults."""
+        for name, lot_results in by_lot.items():
+            lot = self.lots[name]
+            locations = [lot.locate(result.regnum) for result in lot_results]
+            arrivals = [lot.arrival_time(result.regnum) for result in lot_results]
+            vehicles = lot.release_many([result.regnum for result in lot_results])
+            for result, (level, kind, index), vehicle in zip(lot_results, locations, vehicles):
+                result.vehicle_type = vehicle.vehicle_type
+                result.level = level
+                result.kind = kind
+                result.slot = index + 1
+                result.span = 1 if kind == EV else SPACE_NEEDED.get(vehicle.vehicle_type, 1)
+            # Price the whole batch in one pass when the lot charges at exit
+            fees = lot.exit_fees([result.vehicle_type for result in lot_results], arrivals)
+            if fees is not None:
+                for result, fee in zip(lot_results, fees):
+                    result.fee = fee
+            for vehicle in vehicles:
+                lot.recycle(vehicle)
 
     def get_status(self):
-        status = self.lot.get_status()
-        status += "\n\nEV Charging Status:\n"
-        
-        # Add charging station status
-        for charger_id, charger in self.ev_charging_mgr.chargers.items():
-            status += f"{charger_id}: {charger.status.name} ({charger.connector_type}, {charger.max_kw}kW)"
-            # Find if this charger has an active session
-            for session in self.ev_charging_mgr.sessions.values():
-                if session.charger_id == charger_id and not session.end_time:
-                    status += f" - Charging {session.vehicle.regnum}"
-            status += "\n"
-            
-        # Add waiting vehicles if any
-        waiting = [
-            v.regnum for v in self.lot.get_parked_vehicles() 
-            if isinstance(v, ElectricVehicle) and 
-               v.regnum not in [s.vehicle.regnum for s in self.ev_charging_mgr.sessions.values()
-                               if not s.end_time]
-        ]
-        
-        if waiting:
-            status += "\nVehicles waiting to charge:\n"
-            for regnum in waiting:
-                status += f"- {regnum}\n"
-                
+        """
+        Return the lots' status followed by every charger and the vehicles waiting to charge.
+
+        Built from the cached fragments of the lots (see ParkingLot.get_status)
+        and the charging manager (see EVChargingManager.charger_status); a
+        poll with no change since the last one returns the same string.
+        """
+        mgr = self.ev_charging_mgr
+        key = (tuple((name, lot.status_version()) for name, lot in self.lots.items()), mgr.version)
+        cached = self._status
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if len(self.lots) == 1:
+            status = self.lot.get_status()
+        else:
+            status = "\n\n".join(f"=== Lot {name} ===\n{lot.get_status()}" for name, lot in self.lots.items())
+        status = f"{status}\n\nEV Charging Status:\n{mgr.charger_status()}"
+        self._status = (key, status)
         return status
-        
+
+    @staticmethod
+    def _session_entry(session, now, power=None):
+        """Render one session for get_charging_status; `power` is only used while it charges."""
+        duration = ((session.end_time or now) - session.start_time).total_seconds() / 60  # in minutes
+        entry = (
+            f"Session {session.session_id}:\n"
+            f"  Vehicle: {session.vehicle.regnum}\n"
+            f"  Charger: {session.charger_id}\n"
+            f"  Started: {session.start_time}\n"
+            f"  Duration: {duration:.1f} minutes\n"
+        )
+        if session.end_time:
+            return (f"{entry}  Status: Completed\n"
+                    f"  Energy used: {session.kwh_used:.2f} kWh\n"
+                    f"  Cost: {session.cost} KES\n")
+        return f"{entry}  Status: Charging\n  Power: {power:.1f} kW\n"
+
+    def _finished_sessions(self):
+        """Text of the finished sessions in the charging history, re-joined only after a change."""
+        mgr = self.ev_charging_mgr
+        version = mgr.version
+        if self._history_status[0] == version:
+            return self._history_status[1]
+        entries = self._session_text
+        parts = []
+        for session in list(mgr.history):
+            entry = entries.get(session.session_id)
+            if entry is None:
+                entry = entries[session.session_id] = self._session_entry(session, None)
+            parts.append(entry)
+        if len(entries) > 2 * len(parts):
+            # Sessions that fell out of the history's memory are never shown again
+            self._session_text = {session.session_id: entries[session.session_id] for session in list(mgr.history)
+                                  if session.session_id in entries}
+        text = "".join(parts)
+        self._history_status = (version, text)
+        return text
+
     def get_charging_status(self):
-        """Get detailed charging status for all charging stations and sessions."""
-        result = ""
-        for session_id, session in self.ev_charging_mgr.sessions.items():
-            duration = (datetime.now() - session.start_time).total_seconds() / 60  # in minutes
-            result += (
-                f"Session {session_id}:\n"
-                f"  Vehicle: {session.vehicle.regnum}\n"
-                f"  Charger: {session.charger_id}\n"
-                f"  Started: {session.start_time}\n"
-                f"  Duration: {duration:.1f} minutes\n"
-            )
-            if session.end_time:
-                result += f"  Status: Completed\n"
-                result += f"  Energy used: {session.kwh_used:.2f} kWh\n"
-                result += f"  Cost: {session.cost} KES\n"
-            else:
-                result += "  Status: Charging\n"
+        """
+        Get detailed charging status for all charging stations and sessions.
+
+        Active sessions are rendered on every call, since their duration and
+        power change with time; finished sessions are rendered once and
+        their text is reused.
+        """
+        mgr = self.ev_charging_mgr
+        now = self.clock.now()  # one reading for the whole report
+        parts = [self._session_entry(session, now, mgr.power.power(session, now))
+                 for session in list(mgr.sessions.values())]
+        parts.append(self._finished_sessions())
+        result = "".join(parts)
         return result if result else "No active charging sessions."
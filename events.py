@@ -0,0 +1,246 @@
+"""
+Change events published by ParkingLot and EVChargingManager.
+
+Instead of polling get_status(), a consumer subscribes to an EventBus and
+receives one small Event per change: a vehicle parked or removed, a
+charger occupied or released, a session started or ended. Every
+subscription has its own bounded buffer, so publishing never waits on a
+consumer unless the consumer asked for backpressure, and then only for a
+bounded time.
+"""
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Slotted dataclasses where the interpreter supports them (3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Event kinds
+LOT_RESET = "lot_reset"
+LEVEL_ADDED = "level_added"
+PARKED = "parked"
+REMOVED = "removed"
+CHARGE_UPDATED = "charge_updated"
+CHARGER_ADDED = "charger_added"
+CHARGER_OCCUPIED = "charger_occupied"
+CHARGER_RELEASED = "charger_released"
+SESSION_STARTED = "session_started"
+SESSION_ENDED = "session_ended"
+QUEUED = "queued"
+WAIT_CANCELLED = "wait_cancelled"
+
+# What a subscriber does when its buffer is full
+DROP_OLDEST = "drop_oldest"  # evict the oldest buffered event
+DROP_NEWEST = "drop_newest"  # discard the event being published
+BLOCK = "block"  # make the publisher wait up to block_timeout, then drop the new event
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+@dataclass(**_SLOTS)
+class Event:
+    # Increases by one per published event. Events from one lot, or from the
+    # charging manager, arrive in seq order; events from two lots published
+    # by different threads at the same moment may arrive swapped.
+    seq: int
+    kind: str
+    time: datetime
+    lot: Optional[str] = None
+    regnum: Optional[str] = None
+    level: Optional[int] = None
+    slot_kind: Optional[str] = None  # "regular" or "ev"
+    slot: Optional[int] = None  # 1-based slot number on the level
+    vehicle: Any = None
+    charger_id: Optional[str] = None
+    session_id: Optional[str] = None
+    kwh: Optional[float] = None
+
+
+class Subscription:
+    """
+    A consumer's bounded buffer of events.
+
+    Filled by EventBus.publish from whichever thread made the change and
+    emptied by the consumer with get() or drain(). When the buffer is
+    full, events are dropped according to the overflow policy and counted
+    in `dropped`; a consumer keeping an incremental view should rebuild it
+    when `dropped` grows.
+    """
+
+    def __init__(self, bus, kinds=None, maxsize=1024, policy=DROP_OLDEST, block_timeout=0.05):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        if maxsize < 1:
+            raise ValueError("A subscription must buffer at least one event.")
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._bus = bus
+        self._buffer = deque()
+        self._ready = threading.Condition(threading.Lock())
+        self.closed = False
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def offer(self, event: Event) -> bool:
+        """Buffer an event; return False if it was dropped."""
+        with self._ready:
+            buffer = self._buffer
+            if len(buffer) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    buffer.popleft()
+                    self.dropped += 1
+                elif self.policy == BLOCK and self._ready.wait_for(
+                        lambda: len(buffer) < self.maxsize or self.closed, self.block_timeout):
+                    if self.closed:
+                        return False
+                else:
+                    self.dropped += 1
+                    return False
+            buffer.append(event)
+            self._ready.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Return the next event, waiting up to `timeout` seconds (forever if None); None if none came."""
+        with self._ready:
+            if not self._ready.wait_for(lambda: self._buffer or self.closed, timeout) or not self._buffer:
+                return None
+            event = self._buffer.popleft()
+            self._ready.notify_all()  # room for a blocked publisher
+            return event
+
+    def drain(self, limit: Optional[int] = None) -> List[Event]:
+        """Return the buffered events (up to `limit`) without waiting."""
+        with self._ready:
+            buffer = self._buffer
+            count = len(buffer) if limit is None else min(limit, len(buffer))
+            events = [buffer.popleft() for _ in range(count)]
+            if events:
+                self._ready.notify_all()
+            return events
+
+    def close(self):
+        """Stop receiving events and wake anyone waiting on this subscription."""
+        self._bus.unsubscribe(self)
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+
+class EventBus:
+    """
+    Fan-out of change events to any number of subscriptions.
+
+    Publishing with no subscribers returns before an Event is even built,
+    so an idle bus costs the park path one attribute check.
+    """
+
+    def __init__(self):
+        self.seq = 0  # sequence number of the last published event
+        self._lock = threading.Lock()
+        self._subscriptions = ()  # replaced, never mutated, so publish can iterate without the lock
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(self, kinds: Optional[Iterable[str]] = None, maxsize: int = 1024, policy: str = DROP_OLDEST,
+                  block_timeout: float = 0.05) -> Subscription:
+        """
+        Start receiving events.
+
+        Args:
+            kinds: Event kinds to receive, or None for all
+            maxsize: Events buffered before the overflow policy applies
+            policy: DROP_OLDEST, DROP_NEWEST or BLOCK
+            block_timeout: Longest a publisher waits for room under BLOCK, in seconds
+
+        Returns:
+            The Subscription to read events from
+        """
+        subscription = Subscription(self, kinds, maxsize, policy, block_timeout)
+        with self._lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def publish(self, kind: str, time: datetime, **fields) -> Optional[Event]:
+        """Send an event to every subscription interested in `kind`; return it, or None if nobody listens."""
+        subscriptions = self._subscriptions
+        if not subscriptions:
+            return None
+        with self._lock:
+            self.seq += 1
+            event = Event(self.seq, kind, time, **fields)
+        for subscription in subscriptions:
+            if subscription.kinds is None or kind in subscription.kinds:
+                subscription.offer(event)
+        return event
+
+
+class OccupancyView:
+    """
+    Parked vehicles and their charging state, kept current from events.
+
+    apply() folds buffered events into `rows` (regnum -> dict), costing
+    O(events) instead of a full status rebuild. If the subscription
+    dropped events, the view rebuilds itself from the controller.
+    """
+
+    def __init__(self, controller, maxsize=10_000):
+        self.controller = controller
+        self.subscription = controller.events.subscribe(maxsize=maxsize)
+        self.rows: Dict[str, dict] = {}
+        self.resyncs = 0
+        self._dropped = 0
+        self.resync()
+
+    def resync(self):
+        """Rebuild every row from the controller and discard buffered events."""
+        self.subscription.drain()
+        self._dropped = self.subscription.dropped
+        mgr = self.controller.ev_charging_mgr
+        rows = {}
+        for lot in self.controller.lots.values():
+            for regnum, (level, kind, index) in lot._index.items():
+                session = mgr.active_by_regnum.get(regnum)
+                rows[regnum] = {"lot": lot.name, "level": level, "slot_kind": kind, "slot": index + 1,
+                                "vehicle": lot.levels[level].vehicle_at(kind, index),
+                                "charger_id": session.charger_id if session else None,
+                                "queued": mgr.is_waiting(regnum)}
+        self.rows = rows
+        self.resyncs += 1
+
+    def apply(self) -> int:
+        """Fold buffered events into the rows; return how many were applied."""
+        events = self.subscription.drain()
+        if self.subscription.dropped != self._dropped:
+            self.resync()
+            return 0
+        rows = self.rows
+        for event in events:
+            kind = event.kind
+            if kind == PARKED:
+                rows[event.regnum] = {"lot": event.lot, "level": event.level, "slot_kind": event.slot_kind,
+                                      "slot": event.slot, "vehicle": event.vehicle, "charger_id": None,
+                                      "queued": False}
+            elif kind == REMOVED:
+                rows.pop(event.regnum, None)
+            elif kind in (SESSION_STARTED, SESSION_ENDED, QUEUED, WAIT_CANCELLED):
+                row = rows.get(event.regnum)
+                if row is not None:
+                    row["charger_id"] = event.charger_id if kind == SESSION_STARTED else None
+                    row["queued"] = kind == QUEUED
+            elif kind == LOT_RESET:
+                for regnum in [r for r, row in rows.items() if row["lot"] == event.lot]:
+                    del rows[regnum]
+        return len(events)
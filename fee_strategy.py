@@ -1,11 +1,173 @@
+from bisect import bisect_right
+from datetime import datetime
+
+from Vehicle import VehicleType
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; price_many falls back to a Python loop
+    np = None
+
+MINUTES_PER_DAY = 24 * 60
+
+
 class FeeStrategy:
-    def calculate_fee(self):
+    # Flat strategies charge on entry; time-based ones need the stay and charge on exit
+    charged_at_exit = False
+
+    def calculate_fee(self, entry=None, exit=None, vehicle_type=None):
         raise NotImplementedError
 
 class RegularFee(FeeStrategy):
-    def calculate_fee(self):
+    def calculate_fee(self, entry=None, exit=None, vehicle_type=None):
         return 100  # Example: flat fee
 
 class ElectricFee(FeeStrategy):
-    def calculate_fee(self):
+    def calculate_fee(self, entry=None, exit=None, vehicle_type=None):
         return 50  # Discounted EV fee
+
+
+def minute_stamp(moment):
+    """Minutes since 0001-01-01 00:00 for a naive datetime (calendar time, no DST shifts)."""
+    return moment.toordinal() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute + (
+        moment.second + moment.microsecond / 1e6) / 60
+
+
+def _parse_time(value):
+    """Accept "HH:MM" or a minute of the day."""
+    if isinstance(value, str):
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    return int(value)
+
+
+class TariffSchedule:
+    """
+    Time-of-day tariff compiled into prefix sums.
+
+    The day is split into bands, each with an hourly rate; a band runs until
+    the next one starts, and the last band wraps past midnight (night rates).
+    Compiling turns the bands into breakpoints and the cumulative cost at
+    each, so the cost of any stay is a couple of binary searches instead of
+    a minute-by-minute walk. Each calendar day of a stay is capped at
+    `daily_cap`.
+    """
+
+    def __init__(self, bands, daily_cap=None, grace_minutes=0, multipliers=None):
+        """
+        Args:
+            bands: (start, rate_per_hour) pairs; start is "HH:MM" or minute of day
+            daily_cap: Maximum charged per calendar day, or None
+            grace_minutes: Stays this short are free
+            multipliers: VehicleType -> factor applied to the final fee
+        """
+        if not bands:
+            raise ValueError("A tariff needs at least one band.")
+        parsed = sorted((_parse_time(start), float(rate)) for start, rate in bands)
+        if any(not 0 <= start < MINUTES_PER_DAY for start, _ in parsed):
+            raise ValueError("Band start times must fall within the day.")
+        # The band active at midnight is the last one of the previous day
+        if parsed[0][0] != 0:
+            parsed.insert(0, (0, parsed[-1][1]))
+        self.breaks = [start for start, _ in parsed]
+        self.rates = [rate / 60 for _, rate in parsed]  # per minute
+        self.cumulative = [0.0]
+        for i in range(1, len(parsed)):
+            self.cumulative.append(self.cumulative[-1] + self.rates[i - 1] * (self.breaks[i] - self.breaks[i - 1]))
+        self.day_cost = self._cost_until(MINUTES_PER_DAY)
+        self.daily_cap = daily_cap
+        self.grace_minutes = grace_minutes
+        self.multipliers = dict(DEFAULT_MULTIPLIERS if multipliers is None else multipliers)
+
+    def _cost_until(self, minute):
+        """Cost from midnight up to `minute` of the same day."""
+        i = bisect_right(self.breaks, minute) - 1
+        return self.cumulative[i] + self.rates[i] * (minute - self.breaks[i])
+
+    def _cap(self, cost):
+        return cost if self.daily_cap is None else min(cost, self.daily_cap)
+
+    def price_minutes(self, start, end, vehicle_type=None):
+        """Fee for a stay between two minute stamps (see minute_stamp)."""
+        return round(self._stay_cost(start, end) * self.multipliers.get(vehicle_type, 1.0), 2)
+
+    def _stay_cost(self, start, end):
+        if end - start <= self.grace_minutes:
+            return 0.0
+        first_day, first_minute = divmod(start, MINUTES_PER_DAY)
+        last_day, last_minute = divmod(end, MINUTES_PER_DAY)
+        if first_day == last_day:
+            cost = self._cap(self._cost_until(last_minute) - self._cost_until(first_minute))
+        else:
+            cost = (self._cap(self.day_cost - self._cost_until(first_minute))
+                    + (last_day - first_day - 1) * self._cap(self.day_cost)
+                    + self._cap(self._cost_until(last_minute)))
+        return cost
+
+    def price(self, entry, exit, vehicle_type=None):
+        """Fee for a stay between two datetimes."""
+        return self.price_minutes(minute_stamp(entry), minute_stamp(exit), vehicle_type)
+
+    def price_many(self, entries, exits, vehicle_types=None):
+        """
+        Price many stays at once, e.g. to re-price a day's exits after a tariff change.
+
+        Args:
+            entries: Entry datetimes or minute stamps
+            exits: Exit datetimes or minute stamps, aligned with entries
+            vehicle_types: Optional VehicleType per stay
+
+        Returns:
+            A list of fees aligned with the inputs
+        """
+        starts = [minute_stamp(t) if isinstance(t, datetime) else t for t in entries]
+        ends = [minute_stamp(t) if isinstance(t, datetime) else t for t in exits]
+        if vehicle_types is None:
+            factors = [1.0] * len(starts)
+        else:
+            factors = [self.multipliers.get(v_type, 1.0) for v_type in vehicle_types]
+        if np is None:
+            return [round(self._stay_cost(s, e) * f, 2) for s, e, f in zip(starts, ends, factors)]
+
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        breaks = np.asarray(self.breaks, dtype=np.float64)
+        rates = np.asarray(self.rates)
+        cumulative = np.asarray(self.cumulative)
+
+        def cost_until(minute):
+            i = np.searchsorted(breaks, minute, side="right") - 1
+            return cumulative[i] + rates[i] * (minute - breaks[i])
+
+        cap = np.inf if self.daily_cap is None else self.daily_cap
+        first_day, first_minute = np.divmod(starts, MINUTES_PER_DAY)
+        last_day, last_minute = np.divmod(ends, MINUTES_PER_DAY)
+        same_day = np.minimum(cost_until(last_minute) - cost_until(first_minute), cap)
+        spanning = (np.minimum(self.day_cost - cost_until(first_minute), cap)
+                    + np.maximum(last_day - first_day - 1, 0) * min(self.day_cost, cap)
+                    + np.minimum(cost_until(last_minute), cap))
+        cost = np.where(first_day == last_day, same_day, spanning)
+        cost = np.where(ends - starts <= self.grace_minutes, 0.0, cost)
+        return np.round(cost * np.asarray(factors), 2).tolist()
+
+
+# Larger vehicles pay for the bays they take; EVs keep their discount
+DEFAULT_MULTIPLIERS = {
+    VehicleType.BUS: 2.0,
+    VehicleType.TRUCK: 3.0,
+    VehicleType.ELECTRIC_CAR: 0.5,
+    VehicleType.ELECTRIC_BIKE: 0.5,
+}
+
+
+class TimeBasedFee(FeeStrategy):
+    """Charges at exit according to a TariffSchedule."""
+    charged_at_exit = True
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+
+    def calculate_fee(self, entry=None, exit=None, vehicle_type=None):
+        if entry is None or exit is None:
+            raise ValueError("Time-based fees need entry and exit times.")
+        return self.schedule.price(entry, exit, vehicle_type)
@@ -0,0 +1,22 @@
+import functools
+import threading
+from contextlib import nullcontext
+
+# Stand-in for a lock when thread safety is off; entering it costs next to nothing
+NO_LOCK = nullcontext()
+
+
+def make_lock(thread_safe, reentrant=False):
+    """Return a real lock if `thread_safe`, else the shared no-op NO_LOCK."""
+    if not thread_safe:
+        return NO_LOCK
+    return threading.RLock() if reentrant else threading.Lock()
+
+
+def synchronized(method):
+    """Run a method while holding the instance's `_lock`."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -1,7 +1,65 @@
-from ui import ParkingUI
-import tkinter as tk
+import argparse
+import asyncio
+import logging
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Parking Lot Manager")
+    parser.add_argument("--serve", action="store_true",
+                        help="run headless as a network service for gate controllers instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="interface the service listens on")
+    parser.add_argument("--port", type=int, default=8707, help="TCP port of the service")
+    parser.add_argument("--levels", type=int, default=1, help="levels created at start-up (service only)")
+    parser.add_argument("--capacity", type=int, default=0, help="regular bays per level at start-up")
+    parser.add_argument("--ev-capacity", type=int, default=0, help="EV bays (and chargers) per level at start-up")
+    parser.add_argument("--chargers", type=int, default=None,
+                        help="chargers per level at start-up, if fewer than the EV bays (EVs then queue for one)")
+    parser.add_argument("--state", help="directory for the journal and snapshots; state survives restarts")
+    parser.add_argument("--metrics", choices=("off", "basic", "detailed"), default="off",
+                        help="record counters (basic) and per-operation latency histograms (detailed)")
+    parser.add_argument("--metrics-file", help="Prometheus text file the service rewrites every 15 s")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="level of the parking.* change log on stderr (e.g. INFO shows every session)")
+    return parser.parse_args(argv)
+
+
+def run_service(args):
+    from controller import ParkingController
+    from metrics import Metrics
+    from service import serve
+
+    controller = ParkingController(metrics=Metrics(args.metrics))
+    store = None
+    if args.state:
+        from persistence import StateStore
+        store = StateStore(args.state)
+        store.open(controller)
+    if args.capacity or args.ev_capacity:
+        for level in range(1, args.levels + 1):
+            if level not in controller.lot.levels:
+                controller.create_lot(args.capacity, args.ev_capacity, level, chargers=args.chargers)
+    try:
+        asyncio.run(serve(controller, args.host, args.port, args.metrics_file))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+
+
+def run_gui():
+    import tkinter as tk
+    from ui import ParkingUI
 
-if __name__ == "__main__":
     root = tk.Tk()
     app = ParkingUI(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(message)s")
+    if args.serve:
+        run_service(args)
+    else:
+        run_gui()
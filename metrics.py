@@ -0,0 +1,278 @@
+"""
+Counters, gauges and latency histograms, exported in the Prometheus text format.
+
+A Metrics registry is shared by the components of one controller. Its
+level decides what is recorded:
+
+    OFF       nothing; instrumented code pays one attribute check
+    BASIC     counters and gauges
+    DETAILED  counters, gauges and a latency histogram per operation
+
+Instruments are created once, up front, so the instrumented paths only
+add to numbers they already hold. Gauges may read their value from a
+callback when the registry is rendered, which keeps them off the hot
+path entirely.
+
+Readable change records go to the standard logging module instead (the
+"parking.*" loggers), so where they end up, and whether they are
+formatted at all, is decided by the logging configuration.
+"""
+import functools
+import logging
+import os
+import tempfile
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+OFF = 0
+BASIC = 1
+DETAILED = 2
+LEVELS = {"off": OFF, "basic": BASIC, "detailed": DETAILED}
+
+# Upper bounds of the latency buckets, in seconds (5 us to 1 s)
+LATENCY_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0)
+
+
+class Counter:
+    """A value that only goes up."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def samples(self, name: str, labels: str):
+        yield f"{name}{labels}", self.value
+
+
+class Gauge:
+    """A value that goes up and down, set directly or read from a callback at export."""
+
+    __slots__ = ("value", "read")
+
+    def __init__(self, read: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.read = read
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def samples(self, name: str, labels: str):
+        yield f"{name}{labels}", self.read() if self.read is not None else self.value
+
+
+class Histogram:
+    """Observations counted into fixed buckets, plus their sum and count."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self, name: str, labels: str):
+        inner = labels[1:-1] + "," if labels else ""
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            yield f'{name}_bucket{{{inner}le="{bound:g}"}}', seen
+        yield f'{name}_bucket{{{inner}le="+Inf"}}', self.count
+        yield f"{name}_sum{labels}", self.sum
+        yield f"{name}_count{labels}", self.count
+
+
+class timer:
+    """
+    Context manager timing its block into a histogram.
+
+        with timer(histogram):
+            lot.get_status()
+    """
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.started)
+        return False
+
+
+def timed(histogram: Histogram):
+    """Decorator timing every call of the function into a histogram, including calls that raise."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - started)
+        wrapper.timed = func  # the undecorated function
+        return wrapper
+    return decorate
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Metrics:
+    """
+    Registry of named instruments, gated by a recording level.
+
+    Instrumented code checks `enabled` (or `detailed` for timings) before
+    recording, so a registry at OFF costs one attribute read per call.
+    Updates are plain additions: under a thread-safe controller they run
+    inside the owning component's lock; otherwise they assume one thread.
+    """
+
+    def __init__(self, level: int = OFF, namespace: str = "parking"):
+        """
+        Args:
+            level: OFF, BASIC or DETAILED (or its name)
+            namespace: Prefix of every exported metric name
+        """
+        self.namespace = namespace
+        # name -> (type, help, {rendered labels -> instrument})
+        self._families: Dict[str, Tuple[str, str, Dict[str, object]]] = {}
+        self.enabled = self.detailed = False
+        self.set_level(level)
+
+    def set_level(self, level):
+        """Change what is recorded; instruments keep the values they already hold."""
+        if isinstance(level, str):
+            if level not in LEVELS:
+                raise ValueError(f"Unknown metrics level: {level}")
+            level = LEVELS[level]
+        self.level = level
+        self.enabled = level >= BASIC
+        self.detailed = level >= DETAILED
+
+    def _instrument(self, kind: str, name: str, help_text: str, labels: Dict[str, str], make):
+        name = f"{self.namespace}_{name}" if self.namespace else name
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, help_text, {})
+        elif family[0] != kind:
+            raise ValueError(f"Metric {name} is already a {family[0]}.")
+        key = _labels(labels)
+        instrument = family[2].get(key)
+        if instrument is None:
+            instrument = family[2][key] = make()
+        return instrument
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        """Return the counter with this name and labels, creating it if needed."""
+        return self._instrument("counter", name, help_text, labels, Counter)
+
+    def gauge(self, name: str, help_text: str, read: Optional[Callable[[], float]] = None, **labels) -> Gauge:
+        """
+        Return the gauge with this name and labels, creating it if needed.
+
+        Args:
+            name: Metric name, without the namespace
+            help_text: One-line description for the export
+            read: Callback returning the current value at export, instead of set()
+            **labels: Label values distinguishing this gauge within its family
+        """
+        gauge = self._instrument("gauge", name, help_text, labels, Gauge)
+        if read is not None:
+            gauge.read = read
+        return gauge
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        """Return the histogram with this name and labels, creating it if needed."""
+        return self._instrument("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        """Return every instrument in the Prometheus text exposition format."""
+        lines = []
+        for name, (kind, help_text, instruments) in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, instrument in instruments.items():
+                for sample, value in instrument.samples(name, labels):
+                    lines.append(f"{sample} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Write the export to a file, replacing it atomically.
+
+        Suits the textfile collector of the Prometheus node exporter, which
+        must never see a half-written file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(self.render())
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """
+    Log a structured change record, if the logger is enabled for `level`.
+
+    The message reads "event key=value ..."; the fields are also attached
+    to the record as `record.fields` for handlers that emit JSON.
+    """
+    if logger.isEnabledFor(level):
+        text = " ".join(f"{key}={value}" for key, value in fields.items())
+        logger.log(level, "%s %s", event, text, extra={"event": event, "fields": fields})
@@ -0,0 +1,141 @@
+import math
+from array import array
+from itertools import compress
+from typing import Dict, List, Optional, Tuple
+
+from Vehicle import ElectricVehicle, VehicleType
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; plain array columns are used without it
+    np = None
+
+
+class ColumnarOccupancy:
+    """
+    Column-oriented copy of the lot's occupancy, one row per bay.
+
+    Each attribute lives in its own typed `array` column (vehicle type code,
+    interned make/model/color ids, level, arrival time, state of charge), so
+    analytics such as "how many red Toyotas are on level 3" run as a single
+    pass over a few compact columns instead of walking vehicle objects. When
+    NumPy is installed the columns are viewed as ndarrays without copying and
+    queries are fully vectorized.
+    """
+
+    def __init__(self, rows: int, level: int = 0):
+        self.rows = rows
+        self.vehicle_type = array("b", [0]) * rows  # VehicleType.value, 0 = empty bay
+        self.make = array("i", [0]) * rows
+        self.model = array("i", [0]) * rows
+        self.color = array("i", [0]) * rows
+        self.level = array("i", [level]) * rows
+        self.arrival = array("d", [0.0]) * rows
+        self.charge = array("d", [math.nan]) * rows
+        # Interned strings; id 0 is reserved for "no value"
+        self._ids: Dict[str, int] = {}
+        self._strings: List[Optional[str]] = [None]
+        self._np = None
+        if np is not None:
+            self._np = {
+                name: np.frombuffer(getattr(self, name), dtype=dtype)
+                for name, dtype in (("vehicle_type", np.int8), ("make", np.int32),
+                                    ("model", np.int32), ("color", np.int32),
+                                    ("level", np.int32), ("arrival", np.float64),
+                                    ("charge", np.float64))
+            }
+
+    def intern(self, value: str) -> int:
+        """Return the id for a string, assigning a new one if needed."""
+        key = value.lower()
+        sid = self._ids.get(key)
+        if sid is None:
+            sid = self._ids[key] = len(self._strings)
+            self._strings.append(value)
+        return sid
+
+    def put(self, row: int, vehicle, arrival: float) -> None:
+        """Record `vehicle` as parked in bay `row`."""
+        self.vehicle_type[row] = vehicle.vehicle_type.value
+        self.make[row] = self.intern(vehicle.make)
+        self.model[row] = self.intern(vehicle.model)
+        self.color[row] = self.intern(vehicle.color)
+        self.arrival[row] = arrival
+        self.charge[row] = vehicle.charge if isinstance(vehicle, ElectricVehicle) else math.nan
+
+    def clear(self, row: int) -> None:
+        self.vehicle_type[row] = 0
+        self.make[row] = self.model[row] = self.color[row] = 0
+        self.arrival[row] = 0.0
+        self.charge[row] = math.nan
+
+    def update_charge(self, row: int, charge: float) -> None:
+        self.charge[row] = charge
+
+    def _criteria(self, vehicle_type=None, make=None, model=None, color=None, level=None):
+        """Translate query filters into (column name, code) pairs."""
+        criteria = []
+        if vehicle_type is not None:
+            criteria.append(("vehicle_type", vehicle_type.value))
+        for name, value in (("make", make), ("model", model), ("color", color)):
+            if value is not None:
+                # Unknown strings get id -1, which matches no row
+                criteria.append((name, self._ids.get(value.lower(), -1)))
+        if level is not None:
+            criteria.append(("level", level))
+        return criteria
+
+    def _mask(self, criteria):
+        """Boolean row mask for occupied bays matching every criterion."""
+        if self._np is not None:
+            cols = self._np
+            mask = cols["vehicle_type"] != 0
+            for name, code in criteria:
+                mask &= cols[name] == code
+            return mask
+        mask = [code != 0 for code in self.vehicle_type]
+        for name, code in criteria:
+            mask = [m and v == code for m, v in zip(mask, getattr(self, name))]
+        return mask
+
+    def count(self, **filters) -> int:
+        """
+        Count parked vehicles matching all filters.
+
+        Filters: vehicle_type (VehicleType), make, model, color (case
+        insensitive) and level.
+        """
+        mask = self._mask(self._criteria(**filters))
+        if self._np is not None:
+            return int(np.count_nonzero(mask))
+        return sum(mask)
+
+    def rows_matching(self, **filters) -> List[int]:
+        """Return the bay rows of parked vehicles matching all filters."""
+        mask = self._mask(self._criteria(**filters))
+        if self._np is not None:
+            return np.flatnonzero(mask).tolist()
+        return list(compress(range(self.rows), mask))
+
+    def total(self, column: str, **filters) -> Tuple[float, int]:
+        """
+        Sum a numeric column ("charge" or "arrival") over matching vehicles.
+
+        Returns:
+            (sum, number of values). Rows without a value (charge of a
+            non-electric vehicle) are ignored.
+        """
+        if column not in ("charge", "arrival"):
+            raise ValueError(f"Cannot aggregate column {column!r}.")
+        mask = self._mask(self._criteria(**filters))
+        if self._np is not None:
+            values = self._np[column][mask]
+            values = values[~np.isnan(values)]
+            return float(values.sum()), int(values.size)
+        values = [v for v in compress(getattr(self, column), mask) if not math.isnan(v)]
+        return sum(values), len(values)
+
+    def mean(self, column: str, **filters) -> Optional[float]:
+        """Average a numeric column over matching vehicles, or None if none match."""
+        total, n = self.total(column, **filters)
+        return total / n if n else None
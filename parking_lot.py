@@ -1,26 +1,391 @@
-from Vehicle import VehicleFactory, VehicleType, Truck, Bus
+from Vehicle import VehicleFactory, VehicleType
+from itertools import chain, repeat
+
+from clock import SYSTEM_CLOCK
+from events import LEVEL_ADDED, LOT_RESET, PARKED, REMOVED, CHARGE_UPDATED
 from fee_strategy import RegularFee, ElectricFee
+from locks import make_lock
+from occupancy_store import ColumnarOccupancy
+from placement import LevelSelector, NearestToExit
+from results import ErrorCode, ParkResult, RemoveResult
+from slot_allocator import SlotAllocator
 
-class ParkingLot:
-    _instance = None
+# Index kinds used by ParkingLot._index
+REGULAR = "regular"
+EV = "ev"
+
+# Bays taken by vehicles larger than a car
+SPACE_NEEDED = {VehicleType.BUS: 2, VehicleType.TRUCK: 3}
+
+# (slot kind, span) requests the level selector has to answer
+PLACEMENT_GROUPS = ((REGULAR, 1), (REGULAR, 2), (REGULAR, 3), (EV, 1))
+
+
+def resolve_vehicle_type(is_electric=False, is_motorcycle=False, vehicle_type=None):
+    """Return vehicle_type, or derive it from the legacy is_electric/is_motorcycle flags."""
+    if vehicle_type is not None:
+        return vehicle_type
+    if is_electric:
+        return VehicleType.ELECTRIC_BIKE if is_motorcycle else VehicleType.ELECTRIC_CAR
+    return VehicleType.MOTORCYCLE if is_motorcycle else VehicleType.CAR
+
+
+def slot_request(v_type):
+    """Return (slot kind, number of bays) needed by a vehicle type."""
+    if v_type in (VehicleType.ELECTRIC_CAR, VehicleType.ELECTRIC_BIKE):
+        return EV, 1
+    return REGULAR, SPACE_NEEDED.get(v_type, 1)
+
+
+# Same answers keyed by vehicle class, for batch paths (class hashing is cheaper than Enum hashing)
+_SLOT_REQUEST_BY_CLASS = {cls: slot_request(v_type) for v_type, cls in VehicleFactory._vehicle_map.items()}
+
+# Label of each slot kind in get_status()
+_STATUS_LABELS = {REGULAR: "Regular", EV: "EV"}
+
+
+def _status_line(kind, vehicle):
+    """One get_status() line for a bay, or None if the bay is empty."""
+    if vehicle is None:
+        return None
+    return f"{_STATUS_LABELS[kind]}: {vehicle.regnum} ({vehicle.color} {vehicle.make} {vehicle.model})"
+
+
+class ParkedVehicles:
+    """
+    Live, read-only view of the vehicles parked in a lot.
+
+    Iterating walks the slot lists directly, so no intermediate list is
+    built; use list(view) when a copy is needed.
+    """
+
+    def __init__(self, lot):
+        self._lot = lot
+
+    def __len__(self):
+        return len(self._lot._index)
+
+    def __iter__(self):
+        for level in self._lot.levels.values():
+            for v in level.slots:
+                if v is not None:
+                    yield v
+            for v in level.ev_slots:
+                if v is not None:
+                    yield v
 
-    def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(ParkingLot, cls).__new__(cls)
-        return cls._instance
+    def __contains__(self, vehicle):
+        return self._lot.find_vehicle(vehicle.regnum) is vehicle
 
-    def initialize(self, capacity, ev_capacity, level):
+
+class ParkingLevel:
+    """
+    One level of a parking lot.
+
+    Each level owns its bays and slot allocators, so slot numbers are only
+    unique within a level. Slot numbers are stable: slots[i] is bay i + 1
+    for the life of the level. A bus or truck is stored in its first bay,
+    the rest stay None.
+
+    Every change to the bays bumps `version`. Once status_text() has been
+    called, the level also keeps one rendered line per bay and marks the
+    bays that change, so the next status_text() re-renders only those.
+    """
+
+    def __init__(self, capacity, ev_capacity, level, exit_distance=None, columnar=False, clock=None,
+                 thread_safe=False):
+        """
+        Args:
+            capacity: Number of regular bays
+            ev_capacity: Number of EV bays
+            level: Level number
+            exit_distance: Distance to the exit used by NearestToExit
+                (defaults to the number of floors away from the ground)
+            columnar: Also keep a ColumnarOccupancy store (self.columns) for
+                vectorized analytics; rows are regular bays then EV bays
+            clock: Time source for arrival times (the system clock by default)
+            thread_safe: Guard the bays with self.lock
+        """
+        self.clock = clock or SYSTEM_CLOCK
+        # Held while the level's bays, allocators or columns change
+        self.lock = make_lock(thread_safe)
         self.capacity = capacity
         self.ev_capacity = ev_capacity
         self.level = level
-        self.slots = []
-        self.ev_slots = []
+        self.exit_distance = abs(level) if exit_distance is None else exit_distance
+        self.slots = [None] * capacity
+        self.ev_slots = [None] * ev_capacity
+        self.regular_bays = SlotAllocator(capacity)
+        self.ev_bays = SlotAllocator(ev_capacity)
+        self.columns = ColumnarOccupancy(capacity + ev_capacity, level) if columnar else None
+        self.position = None  # set by the owning ParkingLot
+        self.version = 0  # bumped by every change to the bays
+        self._lines = None  # slot kind -> status line per bay, built by the first status_text()
+        self._dirty = None  # slot kind -> indexes of bays changed since their lines were rendered
+        self._text = None  # (version, text) of the last status_text()
+
+    def bays(self, kind):
+        return self.ev_bays if kind == EV else self.regular_bays
+
+    def fits(self, kind, span):
+        """True if the level has a free run of `span` bays of this kind."""
+        return self.bays(kind).largest_free_run >= span
+
+    def load(self):
+        """Share of the level's bays that are occupied."""
+        total = self.capacity + self.ev_capacity
+        if not total:
+            return 1.0
+        return 1.0 - (self.regular_bays.free + self.ev_bays.free) / total
+
+    def vehicle_at(self, kind, index):
+        return self.ev_slots[index] if kind == EV else self.slots[index]
+
+    def row(self, kind, index):
+        """Row of a bay in the columnar store."""
+        return self.capacity + index if kind == EV else index
+
+    def _touch(self, kind, indexes):
+        """Record that the bays at `indexes` changed."""
+        self.version += 1
+        if self._dirty is not None:
+            self._dirty[kind].update(indexes)
+
+    def status_text(self):
+        """
+        Return one line per parked vehicle, regular bays first, in slot order.
+
+        Unchanged since the last call: the same string, in O(1). Otherwise
+        only the lines of the bays that changed are rendered again before
+        the lines are joined.
+        """
+        with self.lock:
+            cached = self._text
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            lines = self._lines
+            if lines is None:
+                lines = self._lines = {REGULAR: [_status_line(REGULAR, v) for v in self.slots],
+                                       EV: [_status_line(EV, v) for v in self.ev_slots]}
+                self._dirty = {REGULAR: set(), EV: set()}
+            else:
+                for kind, indexes in self._dirty.items():
+                    kind_lines = lines[kind]
+                    slots = self.ev_slots if kind == EV else self.slots
+                    for index in indexes:
+                        kind_lines[index] = _status_line(kind, slots[index])
+                    indexes.clear()
+            text = "\n".join(filter(None, chain(lines[REGULAR], lines[EV])))
+            self._text = (self.version, text)
+            return text
+
+    def place(self, vehicle, kind, span):
+        """Put a vehicle in the lowest free run of bays; return its slot index or None."""
+        index = self.bays(kind).allocate(span)
+        if index is None:
+            return None
+        if kind == EV:
+            self.ev_slots[index] = vehicle
+        else:
+            self.slots[index] = vehicle
+        if self.columns is not None:
+            self.columns.put(self.row(kind, index), vehicle, self.clock.time())
+        self._touch(kind, (index,))
+        return index
+
+    def place_many(self, vehicles, kind):
+        """
+        Put single-bay vehicles in the lowest free bays, in one allocator pass.
+
+        Returns the slot indexes given to the leading vehicles; the list is
+        shorter than `vehicles` when the level runs out of bays.
+        """
+        indexes = self.bays(kind).allocate_many(len(vehicles))
+        slots = self.ev_slots if kind == EV else self.slots
+        arrival = self.clock.time()
+        if indexes and indexes[-1] - indexes[0] == len(indexes) - 1:
+            # Indexes come lowest first, so a contiguous run is one slice assignment
+            slots[indexes[0]:indexes[-1] + 1] = vehicles[:len(indexes)]
+        else:
+            for vehicle, index in zip(vehicles, indexes):
+                slots[index] = vehicle
+        if self.columns is not None:
+            for vehicle, index in zip(vehicles, indexes):
+                self.columns.put(self.row(kind, index), vehicle, arrival)
+        if indexes:
+            self._touch(kind, indexes)
+        return indexes
+
+    def vacate(self, kind, index, span):
+        """Free the bays held by the vehicle at `index` and return it."""
+        vehicle = self.vehicle_at(kind, index)
+        if kind == EV:
+            self.ev_slots[index] = None
+        else:
+            self.slots[index] = None
+        self.bays(kind).release(index, span)
+        if self.columns is not None:
+            self.columns.clear(self.row(kind, index))
+        self._touch(kind, (index,))
+        return vehicle
+
+    def occupy_many(self, kind, placements):
+        """
+        Put vehicles back at known slots, e.g. when restoring saved state.
+
+        Args:
+            kind: Slot kind shared by all placements
+            placements: (slot index, vehicle, arrival datetime) tuples
+        """
+        slots = self.ev_slots if kind == EV else self.slots
+        taken = []
+        for index, vehicle, _ in placements:
+            span = _SLOT_REQUEST_BY_CLASS[type(vehicle)][1]
+            if span == 1:
+                taken.append(index)
+            else:
+                taken.extend(range(index, index + span))
+        self.bays(kind).occupy_many(taken)
+        for index, vehicle, _ in placements:
+            slots[index] = vehicle
+        if self.columns is not None:
+            for index, vehicle, arrival in placements:
+                self.columns.put(self.row(kind, index), vehicle, arrival.timestamp())
+        self._touch(kind, [index for index, _, _ in placements])
+
+    def vacate_many(self, kind, runs):
+        """Free several (index, span) runs of one slot kind in one allocator pass."""
+        slots = self.ev_slots if kind == EV else self.slots
+        freed = []
+        for index, span in runs:
+            slots[index] = None
+            freed.extend(range(index, index + span))
+            if self.columns is not None:
+                self.columns.clear(self.row(kind, index))
+        self.bays(kind).release_many(freed)
+        self._touch(kind, [index for index, _ in runs])
+
+
+class ParkingLot:
+    """
+    A parking site made of one or more levels.
+
+    Lots are ordinary objects, so one process can host many of them. When
+    no level is requested, the placement policy picks one through a
+    LevelSelector in O(1), and keeps it current in O(log levels) per change.
+
+    With thread_safe=True several gates can share a lot. Each level has its
+    own lock for its bays, and a lot lock guards only the registration
+    index, the level selector and the journal, so gates parking on
+    different levels do not wait for each other's allocator work. The lot
+    lock is always taken before a level lock, never the other way round.
+    """
+
+    def __init__(self, name="Main", placement=None, tariff=None, clock=None, thread_safe=False):
+        """
+        Args:
+            name: Name of the lot
+            placement: PlacementPolicy used to pick a level (NearestToExit by default)
+            tariff: FeeStrategy for every vehicle; strategies with
+                charged_at_exit (e.g. TimeBasedFee) price the stay at exit,
+                others are charged on entry per bay. None keeps the flat
+                regular and EV fees charged on entry
+            clock: Time source for arrivals and exit fees (the system clock by default)
+            thread_safe: Lock shared state so several threads can use the lot
+        """
+        self.name = name
+        self.thread_safe = thread_safe
+        self._lock = make_lock(thread_safe, reentrant=True)
+        self.clock = clock or SYSTEM_CLOCK
+        self.placement = placement or NearestToExit()
+        self.tariff = tariff
+        self.journal = None  # StateStore recording changes, if persistence is enabled
+        self.events = None  # EventBus told about changes, if anyone subscribes
         self.factory = VehicleFactory()
+        self.vehicle_pool = None  # VehiclePool building vehicles and taking them back, if pooling is enabled
+        self._reset()
+
+    def _reset(self):
+        self.levels = {}  # level number -> ParkingLevel, in the order they were added
+        self._by_position = []
+        # regnum -> (level number, slot kind, slot index) for constant-time lookups
+        self._index = {}
+        self._arrivals = {}  # regnum -> arrival datetime, for fees charged at exit
+        self._claims = set()  # regnums a gate is parking right now
+        self._selector = LevelSelector(self.placement, [], PLACEMENT_GROUPS)
+        self._status = None  # (status_version(), text) of the last get_status()
+
+    def initialize(self, capacity, ev_capacity, level, columnar=False):
+        """Reset the lot to a single empty level (see add_level for arguments)."""
+        with self._lock:
+            self._reset()
+            if self.journal is not None:
+                self.journal.lot_reset(self)
+            self._emit(LOT_RESET)
+            self.add_level(capacity, ev_capacity, level, columnar=columnar)
+
+    def add_level(self, capacity, ev_capacity, level, exit_distance=None, columnar=False):
+        """
+        Add an empty level to the lot.
 
-    def park_vehicle(self, regnum, make, model, color, is_electric=False, is_motorcycle=False, vehicle_type=None):
+        Args:
+            capacity: Number of regular bays
+            ev_capacity: Number of EV bays
+            level: Level number, unique within the lot
+            exit_distance: Distance to the exit used by NearestToExit
+            columnar: Keep a columnar occupancy store for the level
+
+        Raises:
+            ValueError: If the level already exists
+        """
+        with self._lock:
+            if level in self.levels:
+                raise ValueError(f"Level {level} already exists in lot {self.name}.")
+            new_level = ParkingLevel(capacity, ev_capacity, level, exit_distance, columnar, self.clock,
+                                     self.thread_safe)
+            new_level.position = len(self.levels)
+            self.levels[level] = new_level
+            self._by_position.append(new_level)
+            self._selector = LevelSelector(self.placement, self._by_position, PLACEMENT_GROUPS)
+            if self.journal is not None:
+                self.journal.level_added(self, new_level)
+            self._emit(LEVEL_ADDED, level=level)
+            return new_level
+
+    @property
+    def charges_at_exit(self):
+        """True if fees are worked out from the stay when a vehicle leaves."""
+        return self.tariff is not None and self.tariff.charged_at_exit
+
+    @property
+    def capacity(self):
+        return sum(level.capacity for level in self.levels.values())
+
+    @property
+    def ev_capacity(self):
+        return sum(level.ev_capacity for level in self.levels.values())
+
+    def is_parked(self, regnum):
+        """Return True if a vehicle with this registration number is parked."""
+        return regnum in self._index
+
+    def locate(self, regnum):
+        """Return (level number, slot kind, slot index) for a parked vehicle, or None."""
+        return self._index.get(regnum)
+
+    def find_vehicle(self, regnum):
+        """Return the parked vehicle with this registration number, or None."""
+        location = self._index.get(regnum)
+        if location is None:
+            return None
+        level, kind, index = location
+        return self.levels[level].vehicle_at(kind, index)
+
+    def park_vehicle(self, regnum, make, model, color, is_electric=False, is_motorcycle=False,
+                     vehicle_type=None, level=None):
         """
         Park a vehicle in the parking lot.
-        
+
         Args:
             regnum: Vehicle registration number
             make: Vehicle make
@@ -29,84 +394,472 @@ class ParkingLot:
             is_electric: Whether the vehicle is electric (for backward compatibility)
             is_motorcycle: Whether the vehicle is a motorcycle (for backward compatibility)
             vehicle_type: Explicit vehicle type (overrides is_electric and is_motorcycle)
+            level: Level number to park on, or None to let the placement policy choose
         """
-        if vehicle_type is None:
-            # Backward compatibility with old parameters
-            if is_electric:
-                v_type = VehicleType.ELECTRIC_BIKE if is_motorcycle else VehicleType.ELECTRIC_CAR
-            else:
-                v_type = VehicleType.MOTORCYCLE if is_motorcycle else VehicleType.CAR
+        v_type = resolve_vehicle_type(is_electric, is_motorcycle, vehicle_type)
+        if regnum in self._index:
+            return ParkResult(regnum, False, v_type, self.name, error=ErrorCode.ALREADY_PARKED)
+        if level is not None and level not in self.levels:
+            return ParkResult(regnum, False, v_type, self.name, level=level, error=ErrorCode.UNKNOWN_LEVEL)
+
+        # Create the appropriate vehicle using the factory, or recycle one
+        if self.vehicle_pool is not None:
+            vehicle = self.vehicle_pool.acquire(v_type, regnum, make, model, color)
         else:
-            v_type = vehicle_type
-
-        # Create the appropriate vehicle using the factory
-        vehicle = self.factory.create_vehicle(
-            vehicle_type=v_type,
-            regnum=regnum,
-            make=make,
-            model=model,
-            color=color
-        )
-        # Determine the appropriate slot and fee based on vehicle type
-        if v_type in (VehicleType.ELECTRIC_CAR, VehicleType.ELECTRIC_BIKE):
-            if len(self.ev_slots) < self.ev_capacity:
-                self.ev_slots.append(vehicle)
-                fee = ElectricFee().calculate_fee()
-                return f"{v_type.name.replace('_', ' ')} {regnum} parked in EV slot {len(self.ev_slots)} (Fee: ${fee})"
-            else:
-                return "No available EV slots."
+            vehicle = self.factory.create_vehicle(
+                vehicle_type=v_type,
+                regnum=regnum,
+                make=make,
+                model=model,
+                color=color
+            )
+        return self.park(vehicle, level)
+
+    def park(self, vehicle, level=None):
+        """
+        Park an already-built vehicle object.
+
+        Args:
+            vehicle: Vehicle to park
+            level: Level number to park on, or None to let the placement policy choose
+
+        Returns:
+            A ParkResult with the slot and fee, or the reason it was refused
+        """
+        regnum = vehicle.regnum
+        v_type = vehicle.vehicle_type
+        with self._lock:
+            if regnum in self._index or regnum in self._claims:
+                return ParkResult(regnum, False, v_type, self.name, error=ErrorCode.ALREADY_PARKED)
+            if level is not None and level not in self.levels:
+                return ParkResult(regnum, False, v_type, self.name, level=level, error=ErrorCode.UNKNOWN_LEVEL)
+            # Claim the registration so a second gate cannot park the same vehicle meanwhile
+            self._claims.add(regnum)
+        try:
+            placed = self.place(vehicle, level)
+        finally:
+            with self._lock:
+                self._claims.discard(regnum)
+        if placed is None:
+            candidates = [self.levels[level]] if level is not None else list(self.levels.values())
+            return self.refusal(vehicle, candidates)
+
+        return self.parked_result(vehicle, *placed)
+
+    def parked_result(self, vehicle, target, kind, index):
+        """Build the ParkResult for a vehicle placed at `index` on level `target`."""
+        v_type = vehicle.vehicle_type
+        space_needed = slot_request(v_type)[1]
+        if self.charges_at_exit:
+            fee = None  # worked out from the stay at exit
+        elif self.tariff is not None:
+            fee = self.tariff.calculate_fee(vehicle_type=v_type) * space_needed
+        elif kind == EV:
+            fee = ElectricFee().calculate_fee()
         else:
-            # For non-EV vehicles, check if they can fit in regular slots
-            # Buses and trucks might take more space
-            space_needed = 1  # Default space for cars and motorcycles
-            if v_type == VehicleType.BUS:
-                space_needed = 2
-            elif v_type == VehicleType.TRUCK:
-                space_needed = 3
-                
-            if len(self.slots) + space_needed <= self.capacity:
-                self.slots.append(vehicle)
-                # Add placeholders for larger vehicles
-                for _ in range(space_needed - 1):
-                    self.slots.append(None)
-                fee = RegularFee().calculate_fee() * space_needed
-                return f"{v_type.name} {regnum} parked in slot {len(self.slots) - space_needed + 1} (Fee: ${fee})"
+            fee = RegularFee().calculate_fee() * space_needed
+        return ParkResult(vehicle.regnum, True, v_type, self.name, target.level, kind, index + 1, space_needed, fee,
+                          show_level=len(self.levels) > 1)
+
+    def parked_results(self, vehicles, placements):
+        """
+        Build the parked_result() of every vehicle in a burst.
+
+        The type, span and fee depend only on the vehicle class and slot
+        kind, so they are worked out once per pair instead of per vehicle.
+
+        Returns:
+            A list aligned with `vehicles` holding a ParkResult, or None
+            where the placement is None
+        """
+        name = self.name
+        terms = {}  # (vehicle class, slot kind) -> (vehicle type, span, fee)
+        results = []
+        append = results.append
+        for vehicle, placed in zip(vehicles, placements):
+            if placed is None:
+                append(None)
+                continue
+            target, kind, index = placed
+            key = (type(vehicle), kind)
+            known = terms.get(key)
+            if known is None:
+                result = self.parked_result(vehicle, target, kind, index)
+                terms[key] = (result.vehicle_type, result.span, result.fee)
+                append(result)
+                continue
+            v_type, span, fee = known
+            append(ParkResult(vehicle.regnum, True, v_type, name, target.level, kind, index + 1, span, fee))
+        if len(self.levels) > 1:
+            # Set afterwards: passing it by keyword above costs more than this pass
+            for result in results:
+                if result is not None:
+                    result.show_level = True
+        return results
+
+    def place(self, vehicle, level=None):
+        """
+        Put a vehicle in the best free bays without building a result.
+
+        The caller must make sure the vehicle is not parked yet and that
+        `level`, if given, exists.
+
+        Returns:
+            (ParkingLevel, slot kind, slot index), or None if it does not fit
+        """
+        kind, space_needed = slot_request(vehicle.vehicle_type)
+        if level is not None:
+            target = self.levels[level]
+            with target.lock:
+                index = target.place(vehicle, kind, space_needed)
+            if index is None:
+                return None
+        else:
+            while True:
+                with self._lock:
+                    position = self._selector.choose(kind, space_needed)
+                if position is None:
+                    return None
+                target = self._by_position[position]
+                with target.lock:
+                    index = target.place(vehicle, kind, space_needed)
+                if index is not None:
+                    break
+                # Another gate took the last run first: refresh the level and choose again
+                with self._lock:
+                    self._selector.update(position)
+        with self._lock:
+            self._index[vehicle.regnum] = (target.level, kind, index)
+            arrival = self._arrivals[vehicle.regnum] = self.clock.now()
+            self._selector.update(target.position)
+            if self.journal is not None:
+                self.journal.parked(self, target.level, kind, index, vehicle, arrival)
+            self._emit(PARKED, arrival, regnum=vehicle.regnum, level=target.level, slot_kind=kind, slot=index + 1,
+                       vehicle=vehicle)
+        return target, kind, index
+
+    def place_many(self, vehicles):
+        """
+        Place a burst of vehicles at once.
+
+        Single-bay vehicles are handed out level by level, with one allocator
+        pass and one selector update per level instead of one per vehicle.
+        Buses and trucks go through place().
+
+        Returns:
+            A list aligned with `vehicles` holding (ParkingLevel, slot kind,
+            slot index), or None for vehicles that did not fit or were
+            already parked
+        """
+        with self._lock:
+            results = [None] * len(vehicles)
+            pending = {REGULAR: [], EV: []}
+            index = self._index
+            arrivals = self._arrivals
+            claims = self._claims
+            arrived = self.clock.now()
+            regnums = [vehicle.regnum for vehicle in vehicles]
+            classes = list(map(type, vehicles))
+            fresh = set(regnums)
+            if (vehicles and len(fresh) == len(regnums) and index.keys().isdisjoint(fresh) and fresh.isdisjoint(claims)
+                    and classes.count(classes[0]) == len(classes) and _SLOT_REQUEST_BY_CLASS[classes[0]][1] == 1):
+                # All new and all one single-bay class: no per-vehicle checks needed
+                pending[_SLOT_REQUEST_BY_CLASS[classes[0]][0]] = range(len(vehicles))
             else:
-                return f"Not enough space for {v_type.name.lower()}. {self.capacity - len(self.slots)} regular spots left, need {space_needed}."
+                seen = set()
+                for i, vehicle in enumerate(vehicles):
+                    regnum = regnums[i]
+                    if regnum in index or regnum in seen or regnum in claims:
+                        continue
+                    seen.add(regnum)
+                    kind, space_needed = _SLOT_REQUEST_BY_CLASS[classes[i]]
+                    if space_needed == 1:
+                        pending[kind].append(i)
+                    else:
+                        results[i] = self.place(vehicle)
+
+            for kind, waiting in pending.items():
+                while waiting:
+                    position = self._selector.choose(kind, 1)
+                    if position is None:
+                        break
+                    target = self._by_position[position]
+                    vehicles_on_level = list(map(vehicles.__getitem__, waiting))
+                    with target.lock:
+                        indexes = target.place_many(vehicles_on_level, kind)
+                    level_no = target.level
+                    placed = list(map(regnums.__getitem__, waiting[:len(indexes)]))
+                    index.update(zip(placed, zip(repeat(level_no), repeat(kind), indexes)))
+                    arrivals.update(zip(placed, repeat(arrived)))
+                    placements = zip(repeat(target), repeat(kind), indexes)
+                    first = waiting[0]
+                    if waiting[-1] - first == len(waiting) - 1:
+                        # Positions only ever increase, so this is a contiguous run of results
+                        results[first:first + len(indexes)] = placements
+                    else:
+                        for i, placement in zip(waiting, placements):
+                            results[i] = placement
+                    waiting = waiting[len(indexes):]
+                    self._selector.update(target.position)
+                    if self.journal is not None:
+                        for vehicle, slot in zip(vehicles_on_level, indexes):
+                            self.journal.parked(self, level_no, kind, slot, vehicle, arrived)
+                    if self.events is not None and self.events.active:
+                        for vehicle, slot in zip(vehicles_on_level, indexes):
+                            self._emit(PARKED, arrived, regnum=vehicle.regnum, level=level_no, slot_kind=kind,
+                                       slot=slot + 1, vehicle=vehicle)
+            return results
+
+    def refusal(self, vehicle, levels=None):
+        """Build the ParkResult explaining why none of `levels` (default: all) could take the vehicle."""
+        if levels is None:
+            levels = list(self.levels.values())
+        v_type = vehicle.vehicle_type
+        kind, space_needed = slot_request(v_type)
+        result = ParkResult(vehicle.regnum, False, v_type, self.name, kind=kind, span=space_needed)
+        if kind == EV:
+            result.error = ErrorCode.NO_EV_SLOT
+            return result
+        result.free_bays = sum(level.regular_bays.free for level in levels)
+        result.largest_free_run = max((level.regular_bays.largest_free_run for level in levels), default=0)
+        # Enough bays in total, but not next to each other?
+        result.error = ErrorCode.NO_CONTIGUOUS_SPACE if result.free_bays >= space_needed else ErrorCode.NO_SPACE
+        return result
 
     def remove_vehicle(self, regnum):
-        # First check EV slots
-        for i, v in enumerate(self.ev_slots):
-            if v is not None and v.regnum == regnum:
-                self.ev_slots[i] = None
-                return f"EV {regnum} removed."
-                
-        # Then check regular slots
-        for i, v in enumerate(self.slots):
-            if v is not None and v.regnum == regnum:
-                # Remove the vehicle and any placeholders
-                space_freed = 1
-                if isinstance(v, (Truck, Bus)):
-                    space_freed = 3 if isinstance(v, Truck) else 2
-                
-                # Clear the vehicle and its placeholders
-                for j in range(i, min(i + space_freed, len(self.slots))):
-                    self.slots[j] = None
-                
-                # Clean up any None placeholders
-                self.slots = [v for v in self.slots if v is not None]
-                return f"{type(v).__name__} {regnum} removed and {space_freed} spot(s) freed."
-                
-        return "Vehicle not found."
+        """Remove a vehicle and return a RemoveResult describing the bays freed."""
+        released = self._release(regnum)
+        if released is None:
+            return RemoveResult(regnum, False, lot=self.name, error=ErrorCode.NOT_FOUND)
+        v, (level_no, kind, index), arrived = released
+        v_type = v.vehicle_type
+        result = RemoveResult(regnum, True, v_type, self.name, level_no, kind, index + 1, slot_request(v_type)[1])
+        if self.charges_at_exit:
+            result.fee = self.tariff.calculate_fee(arrived, self.clock.now(), v_type)
+        self.recycle(v)
+        return result
+
+    def recycle(self, vehicle):
+        """Hand a vehicle that has left to the pool, unless event subscribers may still hold it."""
+        pool = self.vehicle_pool
+        if pool is not None and not (self.events is not None and self.events.active):
+            pool.release(vehicle)
+
+    def arrival_time(self, regnum):
+        """Return when a parked vehicle arrived, or None."""
+        return self._arrivals.get(regnum)
+
+    def exit_fees(self, vehicle_types, arrivals, exit_time=None):
+        """
+        Price several exits at once with the lot's tariff.
+
+        Args:
+            vehicle_types: VehicleType of each leaving vehicle
+            arrivals: Arrival datetimes, aligned with vehicle_types
+            exit_time: When they leave (now if None)
+
+        Returns:
+            A list of fees, or None if the lot charges flat fees on entry
+        """
+        if not self.charges_at_exit:
+            return None
+        exit_time = exit_time or self.clock.now()
+        schedule = getattr(self.tariff, "schedule", None)
+        if schedule is not None:
+            return schedule.price_many(arrivals, [exit_time] * len(arrivals), vehicle_types)
+        return [self.tariff.calculate_fee(arrived, exit_time, v_type)
+                for v_type, arrived in zip(vehicle_types, arrivals)]
+
+    def release(self, regnum):
+        """Free a vehicle's bays without building a result; return the vehicle or None."""
+        released = self._release(regnum)
+        return released[0] if released is not None else None
+
+    def _release(self, regnum):
+        """Free a vehicle's bays; return (vehicle, location, arrival) or None if it is not parked."""
+        with self._lock:
+            # Popping the index entry is what claims the removal, so two
+            # gates removing the same vehicle cannot both free its bays
+            location = self._index.pop(regnum, None)
+            if location is None:
+                return None
+            arrived = self._arrivals.pop(regnum, None)
+            if self.journal is not None:
+                self.journal.removed(self, regnum)
+            self._emit(REMOVED, regnum=regnum, level=location[0], slot_kind=location[1], slot=location[2] + 1)
+        level_no, kind, index = location
+        level = self.levels[level_no]
+        with level.lock:
+            v = level.vehicle_at(kind, index)
+            level.vacate(kind, index, _SLOT_REQUEST_BY_CLASS[type(v)][1])
+        with self._lock:
+            self._selector.update(level.position)
+        return v, location, arrived
+
+    def release_many(self, regnums):
+        """
+        Free the bays of many vehicles at once.
+
+        Returns:
+            A list aligned with `regnums` holding the removed vehicle, or
+            None for vehicles that were not parked
+        """
+        with self._lock:
+            removed = []
+            runs = {}  # (level number, slot kind) -> [(index, span)]
+            emit = self.events is not None and self.events.active
+            for regnum in regnums:
+                location = self._index.pop(regnum, None)
+                if location is None:
+                    removed.append(None)
+                    continue
+                self._arrivals.pop(regnum, None)
+                level_no, kind, index = location
+                if emit:
+                    self._emit(REMOVED, regnum=regnum, level=level_no, slot_kind=kind, slot=index + 1)
+                v = self.levels[level_no].vehicle_at(kind, index)
+                runs.setdefault((level_no, kind), []).append((index, _SLOT_REQUEST_BY_CLASS[type(v)][1]))
+                removed.append(v)
+            for (level_no, kind), level_runs in runs.items():
+                level = self.levels[level_no]
+                with level.lock:
+                    level.vacate_many(kind, level_runs)
+                self._selector.update(level.position)
+            if self.journal is not None:
+                for regnum, v in zip(regnums, removed):
+                    if v is not None:
+                        self.journal.removed(self, regnum)
+            return removed
+
+    def restore(self, level, placements):
+        """
+        Put vehicles back at known slots of a level without journaling them.
+
+        Used when rebuilding state from a snapshot or a journal.
+
+        Args:
+            level: Level number
+            placements: (slot kind, slot index, vehicle, arrival datetime) tuples
+        """
+        with self._lock:
+            target = self.levels[level]
+            index, arrivals = self._index, self._arrivals
+            by_kind = {REGULAR: [], EV: []}
+            for kind, slot, vehicle, arrival in placements:
+                regnum = vehicle.regnum
+                if regnum in index:
+                    raise ValueError(f"Vehicle {regnum} is already parked.")
+                index[regnum] = (level, kind, slot)
+                arrivals[regnum] = arrival
+                by_kind[kind].append((slot, vehicle, arrival))
+            with target.lock:
+                for kind, kind_placements in by_kind.items():
+                    if kind_placements:
+                        target.occupy_many(kind, kind_placements)
+            self._selector.update(target.position)
+
+    def update_charge(self, regnum, charge):
+        """Record a new state of charge for a parked EV."""
+        with self._lock:
+            location = self._index.get(regnum)
+            if location is None:
+                raise ValueError(f"Vehicle {regnum} is not parked.")
+            level_no, kind, index = location
+            level = self.levels[level_no]
+            with level.lock:
+                vehicle = level.vehicle_at(kind, index)
+                vehicle.charge = charge
+                if level.columns is not None:
+                    level.columns.update_charge(level.row(kind, index), vehicle.charge)
+            if self.journal is not None:
+                self.journal.charge_updated(self, regnum, vehicle.charge)
+            self._emit(CHARGE_UPDATED, regnum=regnum, level=level_no, slot_kind=kind, slot=index + 1,
+                       vehicle=vehicle)
+
+    def _emit(self, kind, time=None, **fields):
+        """Publish a change event, if anyone is listening."""
+        events = self.events
+        if events is not None and events.active:
+            events.publish(kind, time or self.clock.now(), lot=self.name, **fields)
+
+    def _column_stores(self, level=None):
+        levels = self.levels.values() if level is None else [self.levels[level]]
+        stores = [lvl.columns for lvl in levels]
+        if any(store is None for store in stores):
+            raise RuntimeError("Columnar store is not enabled on every level queried.")
+        return stores
+
+    def count_where(self, **filters):
+        """
+        Count parked vehicles matching all filters, using the columnar stores.
+
+        Filters: vehicle_type, make, model, color and level (see ColumnarOccupancy.count).
+        """
+        return sum(store.count(**filters) for store in self._column_stores(filters.get("level")))
+
+    def mean_where(self, column, **filters):
+        """Average "charge" or "arrival" over matching vehicles, or None if none match."""
+        total = n = 0
+        for store in self._column_stores(filters.get("level")):
+            store_total, store_n = store.total(column, **filters)
+            total += store_total
+            n += store_n
+        return total / n if n else None
+
+    def get_fragmentation(self, level=None):
+        """
+        Report how scattered the free regular bays are.
+
+        Args:
+            level: Level number, or None for the level with the largest free run
+
+        Returns:
+            Dict with the number of free bays, the longest contiguous free run
+            and the fragmentation ratio (0.0 = all free bays contiguous)
+        """
+        if level is None:
+            bays = max((lvl.regular_bays for lvl in self.levels.values()),
+                       key=lambda b: b.largest_free_run)
+        else:
+            bays = self.levels[level].regular_bays
+        return {
+            "free_bays": bays.free,
+            "largest_free_run": bays.largest_free_run,
+            "fragmentation": round(bays.fragmentation(), 3),
+        }
+
+    def status_version(self):
+        """
+        Return a token that changes whenever get_status() would change.
+
+        Costs O(levels), not O(vehicles); the levels themselves are part of
+        the token, so a re-initialized lot never matches an old one.
+        """
+        return tuple((level, level.version) for level in self._by_position)
 
     def get_status(self):
+        """
+        Return one line per parked vehicle, under a header per level when there are several.
+
+        Repeated polls with nothing parked or removed in between return the
+        cached string; otherwise each changed level renders only its
+        changed bays (see ParkingLevel.status_text).
+        """
+        version = self.status_version()
+        cached = self._status
+        if cached is not None and cached[0] == version:
+            return cached[1]
         status = ["--- Parking Lot Status ---"]
-        for v in self.slots:
-            status.append(f"Regular: {v.regnum} ({v.color} {v.make} {v.model})")
-        for v in self.ev_slots:
-            status.append(f"EV: {v.regnum} ({v.color} {v.make} {v.model})")
-        return "\n".join(status)
-        
+        for level, _ in version:
+            if len(version) > 1:
+                status.append(f"Level {level.level}:")
+            text = level.status_text()
+            if text:
+                status.append(text)
+        text = "\n".join(status)
+        self._status = (version, text)
+        return text
+
     def get_parked_vehicles(self):
-        """Return a list of all parked vehicles (both regular and EV)."""
-        return self.slots + self.ev_slots
+        """Return a live view of all parked vehicles (both regular and EV)."""
+        return ParkedVehicles(self)
@@ -0,0 +1,416 @@
+"""
+Durable lot and charging state.
+
+Every change to a ParkingLot or the EVChargingManager is appended to a
+write-ahead journal (one JSON array per line). Records are buffered and
+written with a single fsync per group (group commit). Periodic snapshots
+capture the whole state compactly and let the journal start over, so a
+restart loads the latest snapshot and replays only the journal tail.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime
+
+from EVChargingManager import WaitingVehicle
+from Vehicle import VehicleFactory
+
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FILE = "journal.log"
+SNAPSHOT_VERSION = 1
+
+# Columns of the parked-vehicle table in a snapshot level
+VEHICLE_COLUMNS = ("kind", "index", "type", "regnum", "make", "model", "color", "charge", "arrival")
+
+
+def _vehicle_fields(vehicle):
+    return [vehicle.vehicle_type.name, vehicle.regnum, vehicle.make, vehicle.model, vehicle.color,
+            getattr(vehicle, "charge", None)]
+
+
+# Vehicle classes by type name, to rebuild vehicles without going through the Enum
+_CLASS_BY_NAME = {v_type.name: cls for v_type, cls in VehicleFactory._vehicle_map.items()}
+
+
+def _build_vehicle(type_name, regnum, make, model, color, charge):
+    if charge is None:
+        return _CLASS_BY_NAME[type_name](regnum, make, model, color)
+    return _CLASS_BY_NAME[type_name](regnum, make, model, color, charge)
+
+
+class StateStore:
+    """
+    Write-ahead journal plus snapshots for one ParkingController.
+
+    A record is durable once its group is committed: when `group_size`
+    records are buffered, once the oldest buffered record has waited
+    `group_interval` seconds, or on an explicit commit(), snapshot() or
+    close(). A flusher thread enforces the deadline, so records written
+    just before a quiet spell are not left in memory. Replaying is
+    idempotent, so records that a snapshot already covers are harmless.
+
+    Records may arrive from several gate threads; they are numbered and
+    buffered under the store's own lock. A snapshot of a thread-safe
+    controller holds every lot lock and the charging manager's lock, so
+    the state it saves matches the journal up to its sequence number.
+    """
+
+    def __init__(self, directory, group_size=256, group_interval=0.05, snapshot_every=None):
+        """
+        Args:
+            directory: Folder holding the snapshot and the journal
+            group_size: Records written per fsync at most
+            group_interval: Longest time, in seconds, a record waits for its group
+            snapshot_every: Take a snapshot after this many records (None: only on request)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.snapshot_every = snapshot_every
+        self.controller = None
+        self.seq = 0  # sequence number of the last record
+        self._buffer = []
+        self._since_snapshot = 0
+        self._synced_at = time.monotonic()
+        self._file = None
+        self._lock = threading.RLock()
+        self._pending = threading.Condition(self._lock)  # notified when the buffer fills or the store closes
+        self._flusher = None
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.directory, JOURNAL_FILE)
+
+    def open(self, controller):
+        """
+        Rebuild saved state into a controller, then journal its changes.
+
+        Args:
+            controller: A freshly built ParkingController; saved lots, levels
+                and chargers are created on it
+
+        Returns:
+            The controller
+        """
+        self.controller = controller
+        self._load_snapshot()
+        self._replay_journal()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(target=self._flush_due, name="journal-flusher", daemon=True)
+        self._flusher.start()
+        mgr = controller.ev_charging_mgr
+        mgr.journal = self
+        for lot in controller.lots.values():
+            lot.journal = self
+        controller.journal = self
+        return controller
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self.commit()
+                self._file.close()
+                self._file = None
+                self._pending.notify_all()
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join()
+
+    # ==============================
+    # JOURNAL
+    # ==============================
+
+    def _write(self, entry):
+        with self._lock:
+            self.seq += 1
+            entry.insert(0, self.seq)
+            self._buffer.append(json.dumps(entry, separators=(",", ":")))
+            if len(self._buffer) >= self.group_size or time.monotonic() - self._synced_at >= self.group_interval:
+                self.commit()
+            elif len(self._buffer) == 1:
+                self._pending.notify()  # start the flusher's clock for this group
+            self._since_snapshot += 1
+            due = self.snapshot_every is not None and self._since_snapshot >= self.snapshot_every
+        if due:
+            self._try_snapshot()
+
+    def commit(self):
+        """Write buffered records and fsync them as one group."""
+        with self._lock:
+            if self._buffer:
+                self._file.write("\n".join(self._buffer) + "\n")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._buffer.clear()
+            self._synced_at = time.monotonic()
+
+    def _flush_due(self):
+        """Flusher thread: commit each group once it has waited `group_interval`, until the store closes."""
+        with self._pending:
+            while self._file is not None:
+                if not self._buffer:
+                    self._pending.wait()
+                    continue
+                remaining = self._synced_at + self.group_interval - time.monotonic()
+                if remaining > 0:
+                    self._pending.wait(remaining)
+                else:
+                    self.commit()
+
+    # Hooks called by ParkingLot and EVChargingManager after each change
+
+    def lot_reset(self, lot):
+        self._write(["reset", lot.name])
+
+    def level_added(self, lot, level):
+        self._write(["level", lot.name, level.level, level.capacity, level.ev_capacity, level.exit_distance,
+                     level.columns is not None])
+
+    def parked(self, lot, level, kind, index, vehicle, arrival):
+        self._write(["park", lot.name, level, kind, index, *_vehicle_fields(vehicle), arrival.isoformat()])
+
+    def removed(self, lot, regnum):
+        self._write(["remove", lot.name, regnum])
+
+    def charge_updated(self, lot, regnum, charge):
+        self._write(["charge", lot.name, regnum, charge])
+
+    def charger_registered(self, charger):
+        self._write(["charger", charger.charger_id, charger.connector_type, charger.max_kw])
+
+    def session_started(self, session):
+        self._write(["start", session.session_id, session.charger_id, *_vehicle_fields(session.vehicle),
+                     session.start_time.isoformat(), session.priority])
+
+    def session_stopped(self, session):
+        self._write(["stop", session.session_id, session.kwh_used, session.end_time.isoformat()])
+
+    def vehicle_queued(self, waiting):
+        self._write(["wait", *_vehicle_fields(waiting.vehicle), waiting.connector_type, waiting.priority,
+                     waiting.enqueued_at.isoformat()])
+
+    def wait_cancelled(self, regnum):
+        self._write(["cancel", regnum])
+
+    # ==============================
+    # SNAPSHOTS
+    # ==============================
+
+    def _state_locks(self):
+        """Locks that freeze the controller's state, in the order they must be taken."""
+        controller = self.controller
+        if not getattr(controller, "thread_safe", False):
+            return []
+        return [lot._lock for lot in list(controller.lots.values())] + [controller.ev_charging_mgr._lock]
+
+    def _try_snapshot(self):
+        """
+        Take a snapshot that fell due while journaling, if the state can be frozen right away.
+
+        The journaling thread may already hold a lot or manager lock, so
+        waiting for the others could deadlock with a gate that holds one of
+        them; if any is busy the snapshot is left for a later record.
+        """
+        acquired = []
+        try:
+            for lock in self._state_locks():
+                if not lock.acquire(blocking=False):
+                    return
+                acquired.append(lock)
+            with self._lock:
+                self._snapshot()
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def snapshot(self):
+        """
+        Save the whole state and start the journal over.
+
+        The snapshot is written to a temporary file, fsynced and renamed into
+        place, so a crash leaves either the old or the new snapshot. Call it
+        from a thread that holds no lot or manager lock.
+        """
+        with ExitStack() as stack:
+            for lock in self._state_locks():
+                stack.enter_context(lock)
+            stack.enter_context(self._lock)
+            self._snapshot()
+
+    def _snapshot(self):
+        self.commit()
+        controller = self.controller
+        mgr = controller.ev_charging_mgr
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "seq": self.seq,
+            "lots": [self._lot_state(lot) for lot in controller.lots.values()],
+            # Use counts exclude active sessions, which count again when they are reopened
+            "chargers": [[c.charger_id, c.connector_type, c.max_kw, c.use_count - (c.charger_id in mgr.active_by_charger)]
+                         for c in mgr.chargers.values()],
+            "sessions": [[s.session_id, s.charger_id, *_vehicle_fields(s.vehicle), s.start_time.isoformat(),
+                          s.priority] for s in mgr.sessions.values()],
+            "waiting": [[*_vehicle_fields(w.vehicle), w.connector_type, w.priority, w.enqueued_at.isoformat()]
+                        for w in mgr.waiting_vehicles()],
+        }
+        temp = self.snapshot_path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(state, separators=(",", ":")))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.snapshot_path)
+        # Everything journaled so far is in the snapshot now
+        self._file.truncate(0)
+        self._since_snapshot = 0
+
+    @staticmethod
+    def _lot_state(lot):
+        """
+        Parked vehicles are stored column by column, which loads much faster than one row each.
+
+        Vehicles come from the registration index rather than the bays: a
+        gate updates the index and the journal together, while its bays may
+        be taken a moment before or freed a moment after.
+        """
+        arrivals = lot._arrivals
+        now = lot.clock.now()
+        by_level = {level_no: {name: [] for name in VEHICLE_COLUMNS} for level_no in lot.levels}
+        for regnum, (level_no, kind, index) in lot._index.items():
+            v = lot.levels[level_no].vehicle_at(kind, index)
+            columns = by_level[level_no]
+            columns["kind"].append(kind)
+            columns["index"].append(index)
+            for name, value in zip(VEHICLE_COLUMNS[2:8], _vehicle_fields(v)):
+                columns[name].append(value)
+            columns["arrival"].append(arrivals.get(regnum, now).isoformat())
+        levels = []
+        for level in lot.levels.values():
+            columns = by_level[level.level]
+            levels.append({
+                "level": level.level, "capacity": level.capacity, "ev_capacity": level.ev_capacity,
+                "exit_distance": level.exit_distance, "columnar": level.columns is not None,
+                "vehicles": columns,
+            })
+        return {"name": lot.name, "levels": levels}
+
+    # ==============================
+    # RECOVERY
+    # ==============================
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {state.get('version')}")
+        controller = self.controller
+        mgr = controller.ev_charging_mgr
+        parse = datetime.fromisoformat
+        for lot_state in state["lots"]:
+            lot = controller._get_lot(lot_state["name"])
+            for level_state in lot_state["levels"]:
+                level = level_state["level"]
+                if level not in lot.levels:
+                    lot.add_level(level_state["capacity"], level_state["ev_capacity"], level,
+                                  level_state["exit_distance"], level_state["columnar"])
+                columns = level_state["vehicles"]
+                classes = [_CLASS_BY_NAME[name] for name in columns["type"]]
+                vehicles = [cls(regnum, make, model, color) if charge is None
+                            else cls(regnum, make, model, color, charge)
+                            for cls, regnum, make, model, color, charge in zip(
+                                classes, columns["regnum"], columns["make"], columns["model"],
+                                columns["color"], columns["charge"])]
+                lot.restore(level, zip(columns["kind"], columns["index"], vehicles,
+                                       map(parse, columns["arrival"])))
+        for charger_id, connector_type, max_kw, use_count in state["chargers"]:
+            if charger_id not in mgr.chargers:
+                mgr.restore_charger(charger_id, connector_type, max_kw, use_count)
+        for session_id, charger_id, *fields, start_time, priority in state["sessions"]:
+            mgr.restore_session(session_id, charger_id, self._vehicle(fields), parse(start_time), priority)
+        for *fields, connector_type, priority, enqueued_at in state["waiting"]:
+            mgr.restore_waiting(WaitingVehicle(self._vehicle(fields), parse(enqueued_at), connector_type, priority))
+        self.seq = state["seq"]
+
+    def _vehicle(self, fields):
+        """The parked vehicle with this registration, so lot and session share one object."""
+        regnum = fields[1]
+        for lot in self.controller.lots.values():
+            vehicle = lot.find_vehicle(regnum)
+            if vehicle is not None:
+                return vehicle
+        return _build_vehicle(*fields)
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn write at the tail: the group was never committed
+                seq, event, *fields = entry
+                if seq <= self.seq:
+                    continue
+                getattr(self, "_apply_" + event)(*fields)
+                self.seq = seq
+
+    def _apply_reset(self, lot_name):
+        self.controller._get_lot(lot_name)._reset()
+
+    def _apply_level(self, lot_name, level, capacity, ev_capacity, exit_distance, columnar):
+        lot = self.controller._get_lot(lot_name)
+        if level not in lot.levels:
+            lot.add_level(capacity, ev_capacity, level, exit_distance, columnar)
+
+    def _apply_park(self, lot_name, level, kind, index, *rest):
+        *fields, arrival = rest
+        lot = self.controller._get_lot(lot_name)
+        if not lot.is_parked(fields[1]):
+            lot.restore(level, [(kind, index, _build_vehicle(*fields), datetime.fromisoformat(arrival))])
+
+    def _apply_remove(self, lot_name, regnum):
+        lot = self.controller._get_lot(lot_name)
+        if lot.is_parked(regnum):
+            lot.release(regnum)
+
+    def _apply_charge(self, lot_name, regnum, charge):
+        lot = self.controller._get_lot(lot_name)
+        if lot.is_parked(regnum):
+            lot.update_charge(regnum, charge)
+
+    def _apply_charger(self, charger_id, connector_type, max_kw):
+        mgr = self.controller.ev_charging_mgr
+        if charger_id not in mgr.chargers:
+            mgr.restore_charger(charger_id, connector_type, max_kw)
+
+    def _apply_start(self, session_id, charger_id, *rest):
+        *fields, start_time, priority = rest
+        mgr = self.controller.ev_charging_mgr
+        if session_id not in mgr.sessions:
+            mgr.restore_session(session_id, charger_id, self._vehicle(fields),
+                                datetime.fromisoformat(start_time), priority)
+
+    def _apply_stop(self, session_id, kwh_used, end_time):
+        mgr = self.controller.ev_charging_mgr
+        if session_id in mgr.sessions:
+            mgr.restore_stop(session_id, kwh_used, datetime.fromisoformat(end_time))
+
+    def _apply_wait(self, *rest):
+        *fields, connector_type, priority, enqueued_at = rest
+        mgr = self.controller.ev_charging_mgr
+        regnum = fields[1]
+        if not mgr.is_waiting(regnum) and mgr.get_active_session(regnum) is None:
+            mgr.restore_waiting(WaitingVehicle(self._vehicle(fields), datetime.fromisoformat(enqueued_at),
+                                               connector_type, priority))
+
+    def _apply_cancel(self, regnum):
+        self.controller.ev_charging_mgr.restore_cancel(regnum)
@@ -0,0 +1,86 @@
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+
+class PlacementPolicy:
+    """Ranks levels for an arriving vehicle; the level with the lowest key wins."""
+
+    def key(self, level) -> float:
+        raise NotImplementedError
+
+
+class NearestToExit(PlacementPolicy):
+    def key(self, level) -> float:
+        return level.exit_distance
+
+
+class LeastLoaded(PlacementPolicy):
+    def key(self, level) -> float:
+        return level.load()
+
+
+_NONE = (math.inf, -1)
+
+
+class _MinTree:
+    """Segment tree over level positions holding (key, position) minima."""
+
+    def __init__(self, count: int):
+        size = 1
+        while size < count:
+            size *= 2
+        self._size = size
+        self._nodes = [_NONE] * (2 * size)
+
+    def update(self, position: int, value: Tuple[float, int]) -> None:
+        node = self._size + position
+        nodes = self._nodes
+        nodes[node] = value
+        node //= 2
+        while node:
+            left, right = nodes[2 * node], nodes[2 * node + 1]
+            nodes[node] = left if left <= right else right
+            node //= 2
+
+    def best(self) -> Optional[int]:
+        key, position = self._nodes[1]
+        return None if key == math.inf else position
+
+
+class LevelSelector:
+    """
+    Picks a level for each kind of request in O(1).
+
+    One min-tree is kept per (slot kind, span) group. A level's leaf holds
+    its policy key while it has a free run long enough for that group, and
+    infinity otherwise, so the root is always the preferred level that can
+    take the vehicle. A change on one level costs O(log levels) per group.
+    """
+
+    def __init__(self, policy: PlacementPolicy, levels: Sequence, groups: Sequence[Tuple[str, int]]):
+        """
+        Args:
+            policy: Ranking applied to eligible levels
+            levels: Levels in position order; each needs fits(kind, span)
+            groups: (slot kind, span) pairs that will be requested
+        """
+        self.policy = policy
+        self._levels = list(levels)
+        self._trees: Dict[Tuple[str, int], _MinTree] = {
+            group: _MinTree(len(self._levels)) for group in groups
+        }
+        for position in range(len(self._levels)):
+            self.update(position)
+
+    def update(self, position: int) -> None:
+        """Refresh a level after its occupancy changed."""
+        level = self._levels[position]
+        key = self.policy.key(level)
+        for (kind, span), tree in self._trees.items():
+            tree.update(position, (key, position) if level.fits(kind, span) else _NONE)
+
+    def choose(self, kind: str, span: int = 1) -> Optional[int]:
+        """Return the position of the preferred level with room, or None."""
+        tree = self._trees.get((kind, span))
+        return tree.best() if tree is not None else None
+
@@ -0,0 +1,79 @@
+"""
+Opt-in per-call timing of the model's hot entry points.
+
+    metrics = Metrics()
+    with profiled(metrics):
+        ...run traffic...
+    print(metrics.render())
+
+Inside the block every entry point in ENTRY_POINTS is wrapped so each call
+is timed into the "call_seconds" histogram, labelled with the entry
+point's name. The wrappers are installed on the classes and removed on
+exit, so code outside the block runs the plain methods and pays nothing.
+Installation patches classes, so do not enter profiled() from two
+threads at once.
+"""
+import contextlib
+from typing import Dict, Iterable, Optional
+
+from controller import ParkingController
+from metrics import Histogram, Metrics, timed
+from parking_lot import ParkingLot
+from Vehicle import VehicleFactory, VehiclePool
+
+# Name -> (class, attribute) of every method profiled() can time. The
+# controller builds vehicles with VehicleFactory.constructor (or a
+# VehiclePool) and hands them to ParkingLot.park or place_many, so those
+# are timed as well as the keyword-style park_vehicle and create_vehicle.
+ENTRY_POINTS = {
+    "ParkingLot.park_vehicle": (ParkingLot, "park_vehicle"),
+    "ParkingLot.park": (ParkingLot, "park"),
+    "ParkingLot.place_many": (ParkingLot, "place_many"),
+    "ParkingLot.remove_vehicle": (ParkingLot, "remove_vehicle"),
+    "ParkingLot.get_status": (ParkingLot, "get_status"),
+    "VehicleFactory.create_vehicle": (VehicleFactory, "create_vehicle"),
+    "VehicleFactory.constructor": (VehicleFactory, "constructor"),
+    "VehiclePool.acquire": (VehiclePool, "acquire"),
+    "ParkingController.park": (ParkingController, "park"),
+    "ParkingController.park_many": (ParkingController, "park_many"),
+    "ParkingController.remove": (ParkingController, "remove"),
+    "ParkingController.get_status": (ParkingController, "get_status"),
+}
+
+# Four buckets per doubling from 0.1 us to about 13 s, so quantiles are
+# within 19% even for sub-microsecond calls
+CALL_BUCKETS = tuple(1e-7 * 2 ** (i / 4) for i in range(108))
+
+
+@contextlib.contextmanager
+def profiled(metrics: Metrics, names: Optional[Iterable[str]] = None):
+    """
+    Time calls to the hot entry points for the duration of the block.
+
+    Args:
+        metrics: Registry receiving one "call_seconds" histogram per entry point
+        names: Entry points to time (keys of ENTRY_POINTS), or None for all
+
+    Yields:
+        Dict mapping entry point name to its Histogram
+    """
+    histograms: Dict[str, Histogram] = {}
+    installed = []  # (class, attribute, original class attribute)
+    try:
+        for name in (ENTRY_POINTS if names is None else names):
+            cls, attribute = ENTRY_POINTS[name]
+            original = cls.__dict__[attribute]
+            histogram = histograms[name] = metrics.histogram("call_seconds", "Time per call of a hot entry point",
+                                                             CALL_BUCKETS, entry_point=name)
+            if isinstance(original, classmethod):
+                wrapped = classmethod(timed(histogram)(original.__func__))
+            elif isinstance(original, staticmethod):
+                wrapped = staticmethod(timed(histogram)(original.__func__))
+            else:
+                wrapped = timed(histogram)(original)
+            setattr(cls, attribute, wrapped)
+            installed.append((cls, attribute, original))
+        yield histograms
+    finally:
+        for cls, attribute, original in reversed(installed):
+            setattr(cls, attribute, original)
@@ -0,0 +1,145 @@
+import sys
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Optional
+
+from Vehicle import VehicleType
+
+# Slotted dataclasses where the interpreter supports them (3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class ErrorCode(Enum):
+    INVALID_INPUT = auto()
+    ALREADY_PARKED = auto()
+    UNKNOWN_LOT = auto()
+    UNKNOWN_LEVEL = auto()
+    LEVEL_EXISTS = auto()
+    NO_SPACE = auto()
+    NO_CONTIGUOUS_SPACE = auto()
+    NO_EV_SLOT = auto()
+    NOT_FOUND = auto()
+
+
+# ==============================
+# RESULT RECORDS
+# ==============================
+#
+# Controller and lot operations return these records instead of formatted
+# strings. Callers read the fields directly; str() renders the message the
+# UI shows, and is only computed when something is displayed.
+
+@dataclass(**_SLOTS)
+class ParkResult:
+    regnum: Optional[str]
+    ok: bool
+    vehicle_type: Optional[VehicleType] = None
+    lot: Optional[str] = None
+    level: Optional[int] = None
+    kind: Optional[str] = None  # "regular" or "ev"
+    slot: Optional[int] = None  # 1-based slot number on the level
+    span: int = 1  # bays taken
+    fee: Optional[float] = None  # None when the lot charges at exit
+    charger_id: Optional[str] = None
+    session_id: Optional[str] = None
+    charging: Optional[bool] = None  # EVs parked via the controller: whether charging started
+    queued: bool = False  # EV waiting for a charger to free up
+    error: Optional[ErrorCode] = None
+    free_bays: Optional[int] = None  # set when refused for lack of space
+    largest_free_run: Optional[int] = None
+    detail: Optional[str] = None
+    show_level: bool = False  # mention the level when the lot has several
+
+    def __bool__(self):
+        return self.ok
+
+    def __str__(self):
+        if not self.ok:
+            return self._error_message()
+        where = f" on level {self.level}" if self.show_level else ""
+        fee = "Fee charged at exit" if self.fee is None else f"Fee: ${self.fee}"
+        if self.kind == "ev":
+            message = (f"{self.vehicle_type.name.replace('_', ' ')} {self.regnum} parked in "
+                       f"EV slot {self.slot}{where} ({fee})")
+        else:
+            message = f"{self.vehicle_type.name} {self.regnum} parked in slot {self.slot}{where} ({fee})"
+        if self.charging is True:
+            message += f" and started charging at {self.charger_id}"
+        elif self.queued:
+            message += " (All chargers busy; queued for charging)"
+        elif self.charging is False:
+            message += " (No charging stations available)"
+        return message
+
+    def _error_message(self):
+        code = self.error
+        type_name = self.vehicle_type.name.lower() if self.vehicle_type else "vehicle"
+        if code == ErrorCode.ALREADY_PARKED:
+            return f"Vehicle {self.regnum} is already parked."
+        if code == ErrorCode.UNKNOWN_LOT:
+            return f"Lot {self.lot} does not exist."
+        if code == ErrorCode.UNKNOWN_LEVEL:
+            return f"Level {self.level} does not exist."
+        if code == ErrorCode.NO_EV_SLOT:
+            return "No available EV slots."
+        if code == ErrorCode.NO_CONTIGUOUS_SPACE:
+            return (f"Not enough contiguous space for {type_name}. {self.free_bays} regular spots left, "
+                    f"largest free run is {self.largest_free_run}, need {self.span}.")
+        if code == ErrorCode.NO_SPACE:
+            return f"Not enough space for {type_name}. {self.free_bays} regular spots left, need {self.span}."
+        return f"Error parking vehicle: {self.detail}"
+
+
+@dataclass(**_SLOTS)
+class RemoveResult:
+    regnum: str
+    ok: bool
+    vehicle_type: Optional[VehicleType] = None
+    lot: Optional[str] = None
+    level: Optional[int] = None
+    kind: Optional[str] = None
+    slot: Optional[int] = None
+    span: int = 1
+    fee: Optional[float] = None  # parking fee, for lots that charge at exit
+    charger_id: Optional[str] = None
+    session_id: Optional[str] = None
+    kwh_used: Optional[float] = None
+    charging_cost: Optional[float] = None
+    error: Optional[ErrorCode] = None
+
+    def __bool__(self):
+        return self.ok
+
+    def __str__(self):
+        if not self.ok:
+            return "Vehicle not found."
+        if self.kind == "ev":
+            message = f"EV {self.regnum} removed."
+        else:
+            message = f"{self.vehicle_type.name.title()} {self.regnum} removed and {self.span} spot(s) freed."
+        if self.fee is not None:
+            message += f" Fee: ${self.fee}"
+        return message
+
+
+@dataclass(**_SLOTS)
+class LotResult:
+    ok: bool
+    lot: str
+    level: int
+    capacity: int = 0
+    ev_capacity: int = 0
+    chargers: int = 0
+    show_lot: bool = False  # mention the lot when the controller has several
+    error: Optional[ErrorCode] = None
+    detail: Optional[str] = None
+
+    def __bool__(self):
+        return self.ok
+
+    def __str__(self):
+        if not self.ok:
+            return f"Error creating lot: {self.detail}"
+        where = f" in lot {self.lot}" if self.show_lot else ""
+        return (f"Created parking lot: {self.capacity} regular, {self.ev_capacity} EV slots on level "
+                f"{self.level}{where}. Registered {self.chargers} EV chargers.")
@@ -0,0 +1,371 @@
+"""
+Search over parked vehicles: plate prefix, fuzzy plate and attributes.
+
+Attendants ask "where is KDA 12?" or "all white Probox". A VehicleSearch
+answers from indexes instead of scanning every bay:
+
+    plates     sorted list of normalized registration numbers; a prefix is
+               a bisect, and fuzzy matching walks the list as an implicit
+               trie, dropping whole prefixes once they are too far away
+    bigrams    inverted index (two-character substring -> plates); a fuzzy
+               query only walks the plates sharing enough bigrams with it
+    make, model, color, vehicle type
+               inverted indexes (value -> registration numbers); a query
+               intersects the matching sets, smallest first
+
+The indexes follow the lots through their change events, so they are
+updated incrementally: each query first folds in the parks and removals
+published since the last one. Subscribing makes lots publish events,
+which also stops them recycling vehicles into a VehiclePool.
+"""
+import re
+import sys
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import chain
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from events import EventBus, LOT_RESET, PARKED, REMOVED
+from Vehicle import Vehicle, VehicleType
+
+# Slotted dataclasses where the interpreter supports them (3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+_NOT_PLATE = re.compile(r"[^0-9A-Z]")
+
+# Sorts after every character a normalized plate can hold
+_PAST_PREFIX = "\x7f"
+
+
+def normalize_plate(regnum: str) -> str:
+    """Upper-case a registration number and drop spaces and punctuation ("kda-12 3" -> "KDA123")."""
+    return _NOT_PLATE.sub("", regnum.upper())
+
+
+def _bigrams(key: str) -> List[str]:
+    """Two-character substrings of a plate key, in order, repeats included."""
+    return [key[i:i + 2] for i in range(len(key) - 1)]
+
+
+def _normalize_value(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+@dataclass(**_SLOTS)
+class Match:
+    regnum: str
+    lot: str
+    level: int
+    kind: str  # "regular" or "ev"
+    slot: int  # 1-based slot number on the level
+    vehicle: Vehicle
+    distance: int = 0  # edit distance from the searched plate (fuzzy matches only)
+
+
+class VehicleSearch:
+    """
+    Plate and attribute indexes over every vehicle parked in a controller (or one lot).
+
+    Queries are safe to run from any thread; they hold the search's own
+    lock, never the lots' locks.
+    """
+
+    def __init__(self, source, maxsize: int = 100_000):
+        """
+        Args:
+            source: ParkingController, or a single ParkingLot
+            maxsize: Events buffered between queries; if more arrive, the
+                next query rebuilds the indexes from the lots
+        """
+        self.source = source
+        if getattr(source, "events", None) is None:
+            source.events = EventBus()  # a bare lot publishes nothing until given a bus
+        self.subscription = source.events.subscribe((PARKED, REMOVED, LOT_RESET), maxsize=maxsize)
+        self.resyncs = 0
+        self._lock = threading.RLock()
+        self._dropped = 0
+        self.resync()
+
+    def _lots(self) -> dict:
+        lots = getattr(self.source, "lots", None)
+        return lots if lots is not None else {self.source.name: self.source}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        """Stop following the lots."""
+        self.subscription.close()
+
+    # ==============================
+    # MAINTENANCE
+    # ==============================
+
+    def resync(self):
+        """Rebuild every index from the lots and discard buffered events."""
+        with self._lock:
+            self.subscription.drain()
+            self._dropped = self.subscription.dropped
+            # regnum -> (lot name, vehicle, plate key, make, model, color)
+            self._entries: Dict[str, Tuple[str, Vehicle, str, str, str, str]] = {}
+            self._plates: Dict[str, List[str]] = {}  # plate key -> regnums
+            self._make: Dict[str, Set[str]] = {}
+            self._model: Dict[str, Set[str]] = {}
+            self._color: Dict[str, Set[str]] = {}
+            self._type: Dict[VehicleType, Set[str]] = {}
+            self._keys: List[str] = []
+            self._bigrams: Dict[str, Set[str]] = {}  # bigram -> plate keys containing it
+            for lot in list(self._lots().values()):
+                with lot._lock:
+                    parked = [lot.levels[level].vehicle_at(kind, index)
+                              for level, kind, index in lot._index.values()]
+                for vehicle in parked:
+                    self._add(lot.name, vehicle, sort=False)
+            self._keys.sort()
+            self.resyncs += 1
+
+    def refresh(self) -> int:
+        """Fold the changes published since the last query into the indexes; return how many."""
+        with self._lock:
+            events = self.subscription.drain()
+            if self.subscription.dropped != self._dropped:
+                self.resync()
+                return 0
+            for event in events:
+                kind = event.kind
+                if kind == PARKED:
+                    self._add(event.lot, event.vehicle)
+                elif kind == REMOVED:
+                    entry = self._entries.get(event.regnum)
+                    if entry is not None and entry[0] == event.lot:
+                        self._remove(event.regnum)
+                elif kind == LOT_RESET:
+                    for regnum in [r for r, entry in self._entries.items() if entry[0] == event.lot]:
+                        self._remove(regnum)
+            return len(events)
+
+    def _add(self, lot_name: str, vehicle: Vehicle, sort: bool = True):
+        regnum = vehicle.regnum
+        if regnum in self._entries:
+            self._remove(regnum)
+        key = normalize_plate(regnum)
+        make, model, color = (_normalize_value(vehicle.make), _normalize_value(vehicle.model),
+                              _normalize_value(vehicle.color))
+        self._entries[regnum] = (lot_name, vehicle, key, make, model, color)
+        regnums = self._plates.get(key)
+        if regnums is None:
+            self._plates[key] = [regnum]
+            if sort:
+                insort(self._keys, key)
+            else:
+                self._keys.append(key)
+            for gram in _bigrams(key):
+                keys = self._bigrams.get(gram)
+                if keys is None:
+                    keys = self._bigrams[gram] = set()
+                keys.add(key)
+        else:
+            regnums.append(regnum)
+        for index, value in ((self._make, make), (self._model, model), (self._color, color),
+                             (self._type, vehicle.vehicle_type)):
+            members = index.get(value)
+            if members is None:
+                members = index[value] = set()
+            members.add(regnum)
+
+    def _remove(self, regnum: str):
+        _, vehicle, key, make, model, color = self._entries.pop(regnum)
+        regnums = self._plates[key]
+        regnums.remove(regnum)
+        if not regnums:
+            del self._plates[key]
+            del self._keys[bisect_left(self._keys, key)]
+            for gram in _bigrams(key):
+                keys = self._bigrams.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._bigrams[gram]
+        for index, value in ((self._make, make), (self._model, model), (self._color, color),
+                             (self._type, vehicle.vehicle_type)):
+            members = index[value]
+            members.discard(regnum)
+            if not members:
+                del index[value]
+
+    # ==============================
+    # QUERIES
+    # ==============================
+
+    def _matches(self, regnums, distances=None, limit=None) -> List[Match]:
+        """Locate vehicles for the results; vehicles that left since the last refresh are skipped."""
+        lots = self._lots()
+        matches = []
+        for regnum in regnums:
+            entry = self._entries.get(regnum)
+            lot = lots.get(entry[0]) if entry is not None else None
+            location = lot.locate(regnum) if lot is not None else None
+            if location is None:
+                continue
+            level, kind, index = location
+            matches.append(Match(regnum, lot.name, level, kind, index + 1, entry[1],
+                                 distances[regnum] if distances else 0))
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+    def find(self, regnum: str) -> Optional[Match]:
+        """Return the vehicle whose plate matches exactly (ignoring case, spaces and punctuation), or None."""
+        with self._lock:
+            self.refresh()
+            matches = self._matches(self._plates.get(normalize_plate(regnum), ()), limit=1)
+            return matches[0] if matches else None
+
+    def prefix(self, text: str, limit: Optional[int] = 50) -> List[Match]:
+        """
+        Return vehicles whose plate starts with `text`, in plate order.
+
+        Args:
+            text: Start of the plate; case, spaces and punctuation are ignored
+            limit: Most matches to return, or None for all
+        """
+        with self._lock:
+            self.refresh()
+            prefix = normalize_plate(text)
+            keys = self._keys
+            regnums = []
+            for position in range(bisect_left(keys, prefix), len(keys)):
+                key = keys[position]
+                if not key.startswith(prefix):
+                    break
+                regnums.extend(self._plates[key])
+                if limit is not None and len(regnums) >= limit:
+                    break
+            return self._matches(regnums, limit=limit)
+
+    def fuzzy(self, text: str, max_distance: int = 1, limit: Optional[int] = 20) -> List[Match]:
+        """
+        Return vehicles whose plate is within `max_distance` edits of `text`.
+
+        Tolerates ANPR misreads: a wrong, missing or extra character each
+        count as one edit. Matches come closest first, then in plate order.
+
+        Args:
+            text: Plate as read; case, spaces and punctuation are ignored
+            max_distance: Most edits (Levenshtein distance) allowed
+            limit: Most matches to return, or None for all
+        """
+        with self._lock:
+            self.refresh()
+            found = self._within(normalize_plate(text), max_distance)
+            found.sort(key=lambda hit: (hit[1], hit[0]))
+            distances = {}
+            for key, distance in found:
+                for regnum in self._plates[key]:
+                    distances[regnum] = distance
+            return self._matches(distances, distances, limit)
+
+    def _within(self, query: str, max_distance: int) -> List[Tuple[str, int]]:
+        """
+        Return (plate key, distance) for every key within `max_distance` edits of `query`.
+
+        Each edit destroys at most two of the query's bigrams, so a key
+        within the bound shares at least len(query) - 1 - 2 * max_distance
+        of them (counted with repeats). Counting shared bigrams over the
+        postings of the query's bigrams leaves a few candidates, and only
+        those are walked. Short queries or wide bounds, where the count
+        proves nothing, walk every key.
+        """
+        need = len(query) - 1 - 2 * max_distance
+        if need <= 0:
+            return self._walk(self._keys, query, max_distance)
+        bigrams = self._bigrams
+        shared = Counter(chain.from_iterable(bigrams.get(gram, ()) for gram in _bigrams(query)))
+        return self._walk(sorted(key for key, count in shared.items() if count >= need), query, max_distance)
+
+    @staticmethod
+    def _walk(keys: List[str], query: str, max_distance: int) -> List[Tuple[str, int]]:
+        """
+        Return (key, distance) for every key of the sorted list `keys` within `max_distance` edits of `query`.
+
+        Sorted keys are walked as an implicit trie: each key reuses the
+        edit-distance rows of the prefix it shares with the previous key,
+        and once every entry of a row exceeds the bound, all keys with that
+        prefix are skipped with one bisect.
+        """
+        width = len(query)
+        rows = [list(range(width + 1))]  # rows[d]: distances from key[:d] to each prefix of the query
+        previous = ""
+        found = []
+        position = 0
+        while position < len(keys):
+            key = keys[position]
+            shared = 0
+            limit = min(len(previous), len(key), len(rows) - 1)
+            while shared < limit and previous[shared] == key[shared]:
+                shared += 1
+            del rows[shared + 1:]
+            pruned = False
+            for depth in range(shared, len(key)):
+                char = key[depth]
+                above = rows[-1]
+                row = [above[0] + 1]
+                for j in range(1, width + 1):
+                    cost = above[j - 1] + (query[j - 1] != char)
+                    if above[j] + 1 < cost:
+                        cost = above[j] + 1
+                    if row[j - 1] + 1 < cost:
+                        cost = row[j - 1] + 1
+                    row.append(cost)
+                rows.append(row)
+                if min(row) > max_distance:
+                    # No key starting with key[:depth + 1] can come within the bound
+                    previous = key[:depth + 1]
+                    position = bisect_left(keys, previous + _PAST_PREFIX, position)
+                    pruned = True
+                    break
+            if pruned:
+                continue
+            if rows[-1][width] <= max_distance:
+                found.append((key, rows[-1][width]))
+            previous = key
+            position += 1
+        return found
+
+    def where(self, make: Optional[str] = None, model: Optional[str] = None, color: Optional[str] = None,
+              vehicle_type: Optional[VehicleType] = None, limit: Optional[int] = None) -> List[Match]:
+        """
+        Return vehicles matching every given attribute, e.g. where(color="white", model="Probox").
+
+        Text attributes ignore case and extra spaces. With no attribute
+        given, every parked vehicle matches.
+        """
+        with self._lock:
+            self.refresh()
+            wanted = []
+            for index, value in ((self._make, make), (self._model, model), (self._color, color)):
+                if value is not None:
+                    wanted.append(index.get(_normalize_value(value), set()))
+            if vehicle_type is not None:
+                wanted.append(self._type.get(vehicle_type, set()))
+            if not wanted:
+                return self._matches(sorted(self._entries), limit=limit)
+            wanted.sort(key=len)
+            regnums = wanted[0].intersection(*wanted[1:])
+            return self._matches(sorted(regnums), limit=limit)
+
+    def lookup(self, text: str, max_distance: int = 1, limit: int = 20) -> List[Match]:
+        """
+        Answer an attendant's plate query: the exact plate, then plates
+        starting with the text, then near misses.
+        """
+        with self._lock:
+            matches = self.prefix(text, limit)
+            if len(matches) < limit:
+                seen = {match.regnum for match in matches}
+                matches += [match for match in self.fuzzy(text, max_distance, limit) if match.regnum not in seen]
+            exact = normalize_plate(text)
+            matches.sort(key=lambda match: normalize_plate(match.regnum) != exact)
+            return matches[:limit]
@@ -0,0 +1,473 @@
+"""
+Network front end for a ParkingController.
+
+Gate controllers connect over TCP and exchange one JSON object per line.
+Each request names an operation and its arguments, and may carry an "id"
+that is echoed back:
+
+    {"id": 1, "op": "park", "regnum": "KDA 123A", "make": "Toyota",
+     "model": "Axio", "color": "White", "vehicle_type": "CAR"}
+
+Changes (park, remove, park_many, remove_many, create_lot) go through one
+writer task, which applies them in arrival order and answers a whole batch
+after a single journal commit. Reads (status, charging, find, search, stats) are
+answered straight away from the state as of the last applied batch
+(once the gate's own earlier changes are applied);
+rendered reports are cached per state version, so polling gates do not
+rebuild them. "metrics" returns the controller's metrics in the Prometheus
+text format, which the service can also write to a file periodically. Replies on a connection come back in request order, and a
+gate may pipeline several requests without waiting.
+
+Run headless with ``python main.py --serve``; ``python service.py`` starts
+a local service and measures it with the bundled load generator.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import fields
+from enum import Enum
+
+from controller import ParkingController
+from search import VehicleSearch
+from simulation import percentiles
+from Vehicle import VehicleType
+
+log = logging.getLogger("parking.service")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8707
+
+WRITE_OPS = ("park", "remove", "park_many", "remove_many", "create_lot")
+READ_OPS = ("status", "charging", "find", "search", "stats", "metrics")
+
+
+def result_dict(result):
+    """Flatten a result record into JSON-ready fields plus the message users see."""
+    data = {"message": str(result)}
+    for f in fields(result):
+        value = getattr(result, f.name)
+        data[f.name] = value.name if isinstance(value, Enum) else value
+    return data
+
+
+def _error(code, detail=None):
+    return {"ok": False, "error": code, "detail": detail}
+
+
+def _vehicle_type(name):
+    try:
+        return VehicleType[(name or "CAR").upper()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Unknown vehicle type: {name}")
+
+
+def _integer(request, name, default):
+    """Return an integer field of a request, or its default if absent."""
+    value = request.get(name, default)
+    if value is None or isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    return value
+
+
+def _text(request, name):
+    """Return an optional string field of a request."""
+    value = request.get(name)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{name} must be a string, got {value!r}")
+    return value
+
+
+class ParkingService:
+    """
+    asyncio server exposing one ParkingController to many gates.
+
+    Only the writer task mutates the controller, so the controller needs no
+    locks; reads run on the same event loop between writer batches and so
+    always see a consistent state.
+    """
+
+    def __init__(self, controller=None, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=256, max_pending=10_000,
+                 metrics_path=None, metrics_interval=15.0):
+        """
+        Args:
+            controller: ParkingController to serve (a new one if None)
+            host: Interface to listen on
+            port: TCP port (0 picks a free one; see self.port after start())
+            max_batch: Changes applied per writer batch at most
+            max_pending: Changes queued before readers wait (backpressure)
+            metrics_path: File to export the controller's metrics to, or None
+            metrics_interval: Seconds between metrics exports
+        """
+        self.controller = controller or ParkingController()
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.version = 0  # bumped after every batch of changes
+        self.requests = 0
+        self.writes = 0
+        self.max_pending = max_pending
+        self._queue = None  # (request, reply future) waiting for the writer
+        self._cache = {}  # report name -> (version, text)
+        self._search = None  # VehicleSearch, built by the first search request
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self._server = None
+        self._writer_task = None
+        self._metrics_task = None
+
+    async def start(self):
+        """Start listening and the writer task."""
+        self._queue = asyncio.Queue(self.max_pending)
+        self._writer_task = asyncio.ensure_future(self._writer())
+        if self.metrics_path:
+            self._metrics_task = asyncio.ensure_future(self._export_metrics())
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in (self._writer_task, self._metrics_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        journal = self.controller.journal
+        if journal is not None:
+            journal.commit()
+        if self.metrics_path:
+            self.controller.metrics.write(self.metrics_path)
+
+    async def _export_metrics(self):
+        """Rewrite the metrics file every metrics_interval seconds, between writer batches."""
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.controller.metrics.write(self.metrics_path)
+
+    # ==============================
+    # WRITES
+    # ==============================
+
+    async def _writer(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            replies = [self._apply(request) for request, _ in batch]
+            # One durable commit acknowledges the whole batch
+            journal = self.controller.journal
+            if journal is not None:
+                try:
+                    journal.commit()
+                except Exception:
+                    log.exception("Journal commit failed; %d changes are not durable", len(batch))
+                    replies = [_error("INTERNAL_ERROR", "changes could not be saved")] * len(batch)
+            self.version += 1
+            self.writes += len(batch)
+            for (request, future), reply in zip(batch, replies):
+                if not future.cancelled():
+                    future.set_result((request, reply))
+
+    def _apply(self, request):
+        op = request["op"]
+        controller = self.controller
+        try:
+            if op == "park":
+                return result_dict(controller.park(
+                    request["regnum"], request["make"], request["model"], request["color"],
+                    vehicle_type=_vehicle_type(request.get("vehicle_type")), lot_name=request.get("lot"),
+                    level=request.get("level"), priority=_integer(request, "priority", 0)))
+            if op == "remove":
+                return result_dict(controller.remove(request["regnum"]))
+            if op == "park_many":
+                records = [(r["regnum"], r["make"], r["model"], r["color"], _vehicle_type(r.get("vehicle_type")))
+                           for r in request["vehicles"]]
+                results = controller.park_many(records, lot_name=request.get("lot"))
+                return {"ok": True, "results": [result_dict(result) for result in results]}
+            if op == "remove_many":
+                results = controller.remove_many(request["regnums"])
+                return {"ok": True, "results": [result_dict(result) for result in results]}
+            if op == "create_lot":
+                return result_dict(controller.create_lot(
+                    request["capacity"], request["ev_capacity"], request["level"], lot_name=request.get("lot"),
+                    exit_distance=request.get("exit_distance"), chargers=request.get("chargers")))
+        except (KeyError, TypeError, ValueError) as e:
+            return _error("INVALID_INPUT", str(e))
+        except Exception:
+            # Never let one request take down the writer
+            log.exception("Failed to apply %s request", op)
+            return _error("INTERNAL_ERROR", op)
+        return _error("UNKNOWN_OP", op)
+
+    # ==============================
+    # READS
+    # ==============================
+
+    def _cached(self, name, render):
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != self.version:
+            cached = self._cache[name] = (self.version, render())
+        return cached[1]
+
+    def _read(self, request):
+        """Answer a read; malformed arguments get an INVALID_INPUT reply instead of raising."""
+        try:
+            return self._answer(request)
+        except (KeyError, TypeError, ValueError) as e:
+            return _error("INVALID_INPUT", str(e))
+        except Exception:
+            # Never let one request close the gate's connection
+            log.exception("Failed to answer %s request", request.get("op"))
+            return _error("INTERNAL_ERROR", request.get("op"))
+
+    def _answer(self, request):
+        op = request["op"]
+        controller = self.controller
+        if op == "status":
+            return {"ok": True, "version": self.version, "status": self._cached("status", controller.get_status)}
+        if op == "charging":
+            # Durations and power change with time, so this report is always fresh
+            return {"ok": True, "version": self.version, "charging": controller.get_charging_status()}
+        if op == "find":
+            regnum = _text(request, "regnum")
+            for lot in controller.lots.values():
+                location = lot.locate(regnum)
+                if location is not None:
+                    level, kind, index = location
+                    return {"ok": True, "regnum": regnum, "lot": lot.name, "level": level, "kind": kind,
+                            "slot": index + 1}
+            return _error("NOT_FOUND", regnum)
+        if op == "search":
+            return self._run_search(request)
+        if op == "metrics":
+            return {"ok": True, "metrics": controller.metrics.render()}
+        mgr = controller.ev_charging_mgr
+        levels = [level for lot in controller.lots.values() for level in lot.levels.values()]
+        return {
+            "ok": True,
+            "version": self.version,
+            "parked": sum(len(lot._index) for lot in controller.lots.values()),
+            "free_bays": sum(level.regular_bays.free for level in levels),
+            "free_ev_bays": sum(level.ev_bays.free for level in levels),
+            "sessions": len(mgr.sessions),
+            "waiting": sum(len(queue) for queue in mgr.queues.values()),
+            "requests": self.requests,
+            "writes": self.writes,
+        }
+
+    def _run_search(self, request):
+        """
+        Answer {"op": "search", "plate": ...} by plate (exact, prefix, then near
+        misses), or by attributes: any of "make", "model", "color", "vehicle_type".
+        """
+        if self._search is None:
+            self._search = VehicleSearch(self.controller)
+        limit = _integer(request, "limit", 50)
+        max_distance = _integer(request, "max_distance", 1)
+        if limit < 1 or max_distance < 0:
+            raise ValueError("limit must be positive and max_distance not negative")
+        plate = _text(request, "plate")
+        if plate:
+            matches = self._search.lookup(plate, max_distance, limit)
+        else:
+            vehicle_type = request.get("vehicle_type")
+            if vehicle_type is not None:
+                vehicle_type = _vehicle_type(vehicle_type)
+            matches = self._search.where(_text(request, "make"), _text(request, "model"), _text(request, "color"),
+                                         vehicle_type, limit)
+        return {"ok": True, "matches": [
+            {"regnum": m.regnum, "lot": m.lot, "level": m.level, "kind": m.kind, "slot": m.slot,
+             "vehicle_type": m.vehicle.vehicle_type.name, "make": m.vehicle.make, "model": m.vehicle.model,
+             "color": m.vehicle.color, "distance": m.distance}
+            for m in matches]}
+
+    # ==============================
+    # CONNECTIONS
+    # ==============================
+
+    def _submit(self, line, after=None):
+        """
+        Turn one request line into a future holding (request, reply).
+
+        Args:
+            line: The request as received
+            after: Future of the connection's latest change, if still pending;
+                reads wait for it, so a gate always sees its own changes
+
+        Returns:
+            The future, and the request if it still has to go to the writer
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            request = json.loads(line)
+            op = request["op"]
+        except (ValueError, KeyError, TypeError):
+            future.set_result(({}, _error("INVALID_JSON")))
+            return future, None
+        self.requests += 1
+        if op in WRITE_OPS:
+            return future, request
+        if op not in READ_OPS:
+            future.set_result((request, _error("UNKNOWN_OP", op)))
+        elif after is not None and not after.done():
+            after.add_done_callback(lambda _: future.cancelled() or future.set_result((request, self._read(request))))
+        else:
+            future.set_result((request, self._read(request)))
+        return future, None
+
+    async def _serve_client(self, reader, writer):
+        replies = asyncio.Queue()
+        responder = asyncio.ensure_future(self._respond(replies, writer))
+        last_write = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                future, write = self._submit(line, last_write)
+                await replies.put(future)
+                if write is not None:
+                    last_write = future
+                    await self._queue.put((write, future))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await replies.put(None)
+            await responder
+            writer.close()
+
+    @staticmethod
+    async def _respond(replies, writer):
+        """Write replies in request order as they become ready."""
+        while True:
+            future = await replies.get()
+            if future is None:
+                break
+            try:
+                request, reply = await future
+            except asyncio.CancelledError:
+                break  # the service is stopping
+            if isinstance(request, dict) and "id" in request:
+                reply = {"id": request["id"], **reply}
+            writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+            if replies.empty():
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    break
+
+
+async def serve(controller=None, host=DEFAULT_HOST, port=DEFAULT_PORT, metrics_path=None):
+    """Serve a controller until cancelled."""
+    service = ParkingService(controller, host, port, metrics_path=metrics_path)
+    await service.start()
+    print(f"Parking service listening on {service.host}:{service.port}")
+    try:
+        await service.serve_forever()
+    finally:
+        await service.stop()
+
+
+# ==============================
+# LOAD GENERATOR
+# ==============================
+
+async def load_test(host=DEFAULT_HOST, port=DEFAULT_PORT, connections=32, requests=20_000, pipeline=1,
+                    read_ratio=0.2, vehicles=5_000, seed=1):
+    """
+    Drive a running service with simulated gates and measure it.
+
+    Each connection is a gate sending a mix of parks, removes and reads for
+    vehicles drawn from a shared pool, keeping `pipeline` requests in flight.
+
+    Args:
+        host: Service host
+        port: Service port
+        connections: Concurrent gate connections
+        requests: Requests sent in total
+        pipeline: Requests each gate keeps in flight
+        read_ratio: Share of requests that are reads ("find" or "stats")
+        vehicles: Size of the registration pool shared by the gates
+        seed: Seed for the request mix
+
+    Returns:
+        Dict with requests per second, latency percentiles in milliseconds
+        and the number of replies with ok=False
+    """
+    latencies = []
+    failures = 0
+    per_connection = requests // connections
+
+    def make_request(rng):
+        regnum = f"LOAD {rng.randrange(vehicles)}"
+        draw = rng.random()
+        if draw < read_ratio:
+            return {"op": "find", "regnum": regnum} if draw < read_ratio / 2 else {"op": "stats"}
+        if draw < read_ratio + (1 - read_ratio) * 0.55:
+            return {"op": "park", "regnum": regnum, "make": "Toyota", "model": "Axio", "color": "White",
+                    "vehicle_type": rng.choice(("CAR", "CAR", "CAR", "MOTORCYCLE", "ELECTRIC_CAR"))}
+        return {"op": "remove", "regnum": regnum}
+
+    async def gate(number):
+        nonlocal failures
+        rng = random.Random(seed * 1000 + number)
+        reader, writer = await asyncio.open_connection(host, port)
+        sent_at = {}
+        sent = received = 0
+        while received < per_connection:
+            while sent < per_connection and sent - received < pipeline:
+                request = make_request(rng)
+                request["id"] = sent
+                sent_at[sent] = time.perf_counter()
+                writer.write(json.dumps(request).encode() + b"\n")
+                sent += 1
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append((time.perf_counter() - sent_at.pop(reply["id"])) * 1e3)
+            failures += not reply.get("ok")
+            received += 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(gate(n) for n in range(connections)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "latency_ms": percentiles(latencies, (50, 99, 99.9)),
+        "not_ok": failures,
+    }
+
+
+async def _self_test(levels=2, capacity=2_000, ev_capacity=20, **load):
+    service = ParkingService(port=0)
+    for level in range(1, levels + 1):
+        service.controller.create_lot(capacity, ev_capacity, level)
+    await service.start()
+    try:
+        return await load_test(port=service.port, **load)
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    for depth in (1, 8):
+        report = asyncio.run(_self_test(pipeline=depth))
+        latency = report["latency_ms"]
+        print(f"pipeline {depth}: {report['requests_per_second']:,.0f} req/s, p50 {latency['p50']:.2f} ms, "
+              f"p99 {latency['p99']:.2f} ms, p99.9 {latency['p99.9']:.2f} ms "
+              f"({report['not_ok']} refused or not found)")
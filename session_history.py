@@ -0,0 +1,176 @@
+import sqlite3
+from collections import deque
+from datetime import datetime
+from typing import Iterator, Optional
+
+from Vehicle import VehicleFactory, VehicleType
+
+
+class SessionHistory:
+    """
+    Store for completed charging sessions.
+
+    The most recent sessions are kept in a fixed-size in-memory ring buffer.
+    When a database path is given, every session is also appended to a
+    SQLite table indexed by start time, so older sessions can be queried by
+    time range without loading the whole history into memory.
+    """
+
+    COMMIT_EVERY = 100
+    # Session numbers reserved per write of the issued counter; a restart skips the rest of a block
+    ID_BLOCK = 100
+
+    def __init__(self, path: Optional[str] = None, recent: int = 1000):
+        """
+        Args:
+            path: SQLite database file, or None to keep only the ring buffer
+            recent: Number of sessions kept in memory
+        """
+        self.recent = deque(maxlen=recent)
+        self._db = None
+        self._pending = 0
+        self._reserved = 0  # highest session number the database has reserved
+        if path is not None:
+            # Gate threads append through the charging manager, which serializes the calls
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " session_id TEXT UNIQUE NOT NULL,"
+                " charger_id TEXT NOT NULL,"
+                " regnum TEXT NOT NULL,"
+                " vehicle_type TEXT NOT NULL,"
+                " make TEXT, model TEXT, color TEXT, charge REAL,"
+                " start_time TEXT NOT NULL,"
+                " end_time TEXT,"
+                " kwh_used REAL, rate_per_kwh REAL, cost REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)")
+            # Highest session number ever handed out, stopped or not
+            self._db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._db.commit()
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def next_sequence(self) -> int:
+        """Return a session number not yet issued, to a stored session or to one still active."""
+        if self._db is None:
+            return 1
+        row = self._db.execute("SELECT value FROM counters WHERE name = 'session'").fetchone()
+        if row is not None:
+            self._reserved = row[0]
+            return row[0] + 1
+        # Database from before the counter: continue after the highest stored id
+        last = 0
+        for (session_id,) in self._db.execute("SELECT session_id FROM sessions"):
+            suffix = session_id.rsplit("_", 1)[-1]
+            if suffix.isdigit():
+                last = max(last, int(suffix))
+        return last + 1
+
+    def reserve(self, sequence: int) -> None:
+        """
+        Record that session number `sequence` has been issued.
+
+        Numbers are reserved ID_BLOCK at a time, so the counter is written
+        once per block rather than once per session.
+        """
+        if self._db is None or sequence <= self._reserved:
+            return
+        self._reserved = sequence + self.ID_BLOCK - 1
+        self._db.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('session', ?)", (self._reserved,))
+        self._db.commit()
+
+    def append(self, session) -> None:
+        """
+        Record a completed session; the oldest in-memory entry is evicted if full.
+
+        Raises:
+            ValueError: If the database already holds a different session with this id
+        """
+        if self._db is not None:
+            v = session.vehicle
+            try:
+                self._db.execute(
+                    "INSERT INTO sessions (session_id, charger_id, regnum, vehicle_type, make, model, color,"
+                    " charge, start_time, end_time, kwh_used, rate_per_kwh, cost)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session.session_id, session.charger_id, v.regnum, v.vehicle_type.name, v.make, v.model,
+                     v.color, v.charge, _iso(session.start_time), _iso(session.end_time),
+                     session.kwh_used, session.rate_per_kwh, session.cost),
+                )
+            except sqlite3.IntegrityError:
+                # Replaying a journal after a crash may append a stored session again; anything else is a clash
+                stored = self._db.execute("SELECT charger_id, start_time FROM sessions WHERE session_id = ?",
+                                          (session.session_id,)).fetchone()
+                if stored != (session.charger_id, _iso(session.start_time)):
+                    raise ValueError(f"Session {session.session_id} is already stored for another charge.")
+            else:
+                self._pending += 1
+        self.recent.append(session)
+        if self._pending >= self.COMMIT_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit appended sessions to disk."""
+        if self._db is not None and self._pending:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def query(self, start: datetime, end: datetime) -> Iterator:
+        """
+        Yield sessions that started in [start, end), oldest first.
+
+        Rows are read from disk one at a time, so large ranges do not have
+        to fit in memory. Without a database only the in-memory sessions
+        are searched.
+        """
+        if self._db is None:
+            for session in self.recent:
+                if start <= session.start_time < end:
+                    yield session
+            return
+
+        # Imported here to avoid a circular import with EVChargingManager
+        from EVChargingManager import ChargingSession
+
+        self.flush()
+        cursor = self._db.execute(
+            "SELECT session_id, charger_id, regnum, vehicle_type, make, model, color, charge,"
+            " start_time, end_time, kwh_used, rate_per_kwh, cost"
+            " FROM sessions WHERE start_time >= ? AND start_time < ? ORDER BY start_time",
+            (_iso(start), _iso(end)),
+        )
+        for (session_id, charger_id, regnum, vehicle_type, make, model, color, charge,
+             start_time, end_time, kwh_used, rate_per_kwh, cost) in cursor:
+            vehicle = VehicleFactory.create_vehicle(
+                vehicle_type=VehicleType[vehicle_type],
+                regnum=regnum,
+                make=make,
+                model=model,
+                color=color,
+                charge=charge,
+            )
+            yield ChargingSession(
+                session_id, charger_id, vehicle,
+                start_time=datetime.fromisoformat(start_time),
+                end_time=datetime.fromisoformat(end_time) if end_time else None,
+                kwh_used=kwh_used,
+                rate_per_kwh=rate_per_kwh,
+                cost=cost,
+            )
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    # Fixed-width timestamps so string order matches time order in SQLite
+    return value.isoformat(timespec="microseconds") if value else None
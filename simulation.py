@@ -0,0 +1,221 @@
+"""
+Discrete-event simulation of a parking site.
+
+Drives a ParkingController with synthetic traffic: Poisson arrivals, a
+configurable vehicle-type mix and EV ratio, and random dwell times. Events
+run on a virtual timeline kept in a heap, and the controller reads its time
+from a VirtualClock that follows that timeline, so a simulated week takes
+seconds while session durations, energy and fees come out in simulated time.
+
+Run with ``python simulation.py``.
+"""
+import heapq
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from clock import VirtualClock
+from controller import ParkingController
+from Vehicle import VehicleType
+
+ARRIVAL = 0
+DEPARTURE = 1
+
+DEFAULT_TYPE_MIX = {
+    VehicleType.CAR: 0.75,
+    VehicleType.MOTORCYCLE: 0.12,
+    VehicleType.TRUCK: 0.08,
+    VehicleType.BUS: 0.05,
+}
+
+# Electric counterparts drawn for an ev_ratio share of cars and motorcycles
+ELECTRIC_VERSION = {VehicleType.CAR: VehicleType.ELECTRIC_CAR, VehicleType.MOTORCYCLE: VehicleType.ELECTRIC_BIKE}
+
+
+@dataclass
+class SimulationConfig:
+    hours: float = 7 * 24
+    arrivals_per_hour: float = 60.0
+    type_mix: Dict[VehicleType, float] = field(default_factory=lambda: dict(DEFAULT_TYPE_MIX))
+    ev_ratio: float = 0.2  # share of cars and motorcycles that are electric
+    mean_dwell_minutes: float = 120.0
+    dwell: str = "exponential"  # "exponential" or "lognormal"
+    dwell_sigma: float = 0.8  # shape of the lognormal dwell distribution
+    levels: int = 2
+    capacity: int = 100  # regular bays per level
+    ev_capacity: int = 10  # EV bays per level
+    chargers: Optional[int] = 6  # chargers per level (None: one per EV bay); EVs queue for the rest
+    seed: int = 1
+
+
+@dataclass
+class SimulationReport:
+    simulated_hours: float
+    wall_seconds: float
+    arrivals: int
+    parked: int
+    refused: int
+    departures: int
+    ev_arrivals: int
+    ev_queued: int
+    max_queue: int
+    charger_utilization: float  # busy charger-hours / available charger-hours
+    energy_kwh: float  # delivered by finished charging sessions
+    occupancy: float  # mean share of regular and EV bays in use
+    park_latency_us: Dict[str, float]
+    remove_latency_us: Dict[str, float]
+
+    @property
+    def refusal_rate(self):
+        return self.refused / self.arrivals if self.arrivals else 0.0
+
+    @property
+    def throughput_per_hour(self):
+        """Vehicles parked per simulated hour."""
+        return self.parked / self.simulated_hours if self.simulated_hours else 0.0
+
+    def __str__(self):
+        return "\n".join([
+            f"Simulated {self.simulated_hours:.0f} h in {self.wall_seconds:.2f} s",
+            f"Arrivals: {self.arrivals} ({self.ev_arrivals} EVs), parked: {self.parked}, "
+            f"refused: {self.refused} ({self.refusal_rate:.1%}), departures: {self.departures}",
+            f"Throughput: {self.throughput_per_hour:.1f} vehicles/h, mean occupancy: {self.occupancy:.1%}",
+            f"Charger utilization: {self.charger_utilization:.1%}, EVs queued: {self.ev_queued} "
+            f"(longest queue {self.max_queue}), energy delivered: {self.energy_kwh:.0f} kWh",
+            f"park latency: p50 {self.park_latency_us['p50']:.1f} us, p99 {self.park_latency_us['p99']:.1f} us",
+            f"remove latency: p50 {self.remove_latency_us['p50']:.1f} us, "
+            f"p99 {self.remove_latency_us['p99']:.1f} us",
+        ])
+
+
+def percentiles(samples: List[float], points=(50, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles of `samples` as {"p50": ..., "p99": ...}."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{p}": 0.0 for p in points}
+    return {f"p{p}": ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+            for p in points}
+
+
+class Simulation:
+    """
+    Runs one SimulationConfig against a fresh ParkingController.
+
+    Arrivals and departures are (time, sequence, kind, regnum) entries in a
+    heap; each arrival schedules the next one and, if the vehicle got a bay,
+    its departure. Occupancy and busy chargers only change at events, so
+    their time averages are integrated exactly between events.
+    """
+
+    def __init__(self, config: SimulationConfig = None):
+        self.config = config or SimulationConfig()
+        self.random = random.Random(self.config.seed)
+        self.clock = VirtualClock()
+        self.controller = ParkingController(clock=self.clock)
+        for level in range(1, self.config.levels + 1):
+            self.controller.create_lot(self.config.capacity, self.config.ev_capacity, level,
+                                       chargers=self.config.chargers)
+        types, weights = zip(*self.config.type_mix.items())
+        self._types = types
+        self._weights = weights
+
+    def _vehicle_type(self):
+        v_type = self.random.choices(self._types, self._weights)[0]
+        if v_type in ELECTRIC_VERSION and self.random.random() < self.config.ev_ratio:
+            return ELECTRIC_VERSION[v_type]
+        return v_type
+
+    def _dwell_hours(self):
+        mean = self.config.mean_dwell_minutes / 60
+        if self.config.dwell == "lognormal":
+            sigma = self.config.dwell_sigma
+            # Choose mu so the distribution keeps the configured mean
+            return self.random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        return self.random.expovariate(1 / mean)
+
+    def run(self) -> SimulationReport:
+        config = self.config
+        controller = self.controller
+        lot = controller.lot
+        mgr = controller.ev_charging_mgr
+        total_bays = lot.capacity + lot.ev_capacity
+        chargers = len(mgr.chargers)
+
+        events = []
+        seq = 0
+        heapq.heappush(events, (self.random.expovariate(config.arrivals_per_hour), seq, ARRIVAL, None))
+        counts = dict(arrivals=0, parked=0, refused=0, departures=0, ev_arrivals=0, ev_queued=0)
+        park_latency, remove_latency = [], []
+        busy_area = occupied_area = 0.0
+        max_queue = 0
+        energy_kwh = 0.0  # billed by every stopped session (the manager's history keeps only the latest)
+        now = 0.0
+        epoch = self.clock.now()
+        wall_start = time.perf_counter()
+
+        while events and events[0][0] <= config.hours:
+            at, _, kind, regnum = heapq.heappop(events)
+            busy_area += len(mgr.sessions) * (at - now)
+            occupied_area += (total_bays - self._free_bays(lot)) * (at - now)
+            now = at
+            self.clock.set(epoch + timedelta(hours=at))
+
+            if kind == DEPARTURE:
+                start = time.perf_counter()
+                removed = controller.remove(regnum)
+                remove_latency.append((time.perf_counter() - start) * 1e6)
+                if removed.kwh_used is not None:
+                    energy_kwh += removed.kwh_used
+                counts["departures"] += 1
+                continue
+
+            seq += 1
+            heapq.heappush(events, (now + self.random.expovariate(config.arrivals_per_hour), seq, ARRIVAL, None))
+            counts["arrivals"] += 1
+            regnum = f"SIM{counts['arrivals']:07d}"
+            v_type = self._vehicle_type()
+            start = time.perf_counter()
+            result = controller.park(regnum, "Toyota", "Axio", "White", vehicle_type=v_type)
+            park_latency.append((time.perf_counter() - start) * 1e6)
+            if v_type in ELECTRIC_VERSION.values():
+                counts["ev_arrivals"] += 1
+            if not result:
+                counts["refused"] += 1
+                continue
+            counts["parked"] += 1
+            if result.queued:
+                counts["ev_queued"] += 1
+                max_queue = max(max_queue, sum(len(queue) for queue in mgr.queues.values()))
+            seq += 1
+            heapq.heappush(events, (now + self._dwell_hours(), seq, DEPARTURE, regnum))
+
+        # Close the integrals at the end of the horizon
+        busy_area += len(mgr.sessions) * (config.hours - now)
+        occupied_area += (total_bays - self._free_bays(lot)) * (config.hours - now)
+        return SimulationReport(
+            simulated_hours=config.hours,
+            wall_seconds=time.perf_counter() - wall_start,
+            max_queue=max_queue,
+            energy_kwh=energy_kwh,
+            charger_utilization=busy_area / (chargers * config.hours) if chargers else 0.0,
+            occupancy=occupied_area / (total_bays * config.hours) if total_bays else 0.0,
+            park_latency_us=percentiles(park_latency),
+            remove_latency_us=percentiles(remove_latency),
+            **counts,
+        )
+
+    @staticmethod
+    def _free_bays(lot):
+        return sum(level.regular_bays.free + level.ev_bays.free for level in lot.levels.values())
+
+
+def simulate(**overrides) -> SimulationReport:
+    """Run a simulation with SimulationConfig defaults replaced by `overrides`."""
+    return Simulation(SimulationConfig(**overrides)).run()
+
+
+if __name__ == "__main__":
+    print(simulate())
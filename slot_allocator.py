@@ -0,0 +1,238 @@
+from array import array
+from typing import Iterable, List, Optional
+
+
+class SlotAllocator:
+    """
+    Free-bay allocator with stable slot ids.
+
+    Bays are tracked in a segment tree where every node stores the longest
+    run of free bays inside it, plus the free runs touching its left and
+    right edges. That is enough to find the lowest contiguous run of any
+    length in O(log n) and to update a bay in O(log n).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        size = 1
+        while size < capacity:
+            size *= 2
+        self._size = size
+        # Bays beyond capacity are padding and never free. All real bays
+        # start free, so each tree level is known in closed form: nodes
+        # fully inside the capacity hold their whole width, the node
+        # straddling the end holds the remainder (with no free suffix),
+        # and padding nodes hold 0.
+        self._best = array("i", [0])
+        self._prefix = array("i", [0])
+        self._suffix = array("i", [0])
+        nodes, width = 1, size
+        while nodes <= size:
+            full, rest = divmod(capacity, width)
+            edge = array("i", [rest]) if rest else array("i")
+            padding = array("i", [0]) * (nodes - full - len(edge))
+            row = array("i", [width]) * full + edge + padding
+            self._best += row
+            self._prefix += row
+            self._suffix += array("i", [width]) * full + array("i", [0]) * (nodes - full)
+            nodes, width = nodes * 2, width // 2
+        self.free = capacity
+
+    def _rebuild(self) -> None:
+        """Recompute every inner node from the leaves, one tree level at a time."""
+        prefix, suffix, best = self._prefix, self._suffix, self._best
+        first = self._size // 2
+        half = 1
+        while first:
+            for node in range(first, 2 * first):
+                # Same as _pull(node, half), inlined
+                left = 2 * node
+                right = left + 1
+                pl, sr = prefix[left], suffix[right]
+                prefix[node] = pl if pl < half else half + prefix[right]
+                suffix[node] = sr if sr < half else half + suffix[left]
+                cross = suffix[left] + prefix[right]
+                bl, br = best[left], best[right]
+                best[node] = bl if bl >= br and bl >= cross else (br if br >= cross else cross)
+            first //= 2
+            half *= 2
+
+    def _pull(self, node: int, half: int) -> None:
+        """Recompute a node from its two children, each covering `half` bays."""
+        left, right = 2 * node, 2 * node + 1
+        prefix, suffix, best = self._prefix, self._suffix, self._best
+        prefix[node] = prefix[left] if prefix[left] < half else half + prefix[right]
+        suffix[node] = suffix[right] if suffix[right] < half else half + suffix[left]
+        best[node] = max(best[left], best[right], suffix[left] + prefix[right])
+
+    def _set(self, slot: int, free: int) -> None:
+        prefix, suffix, best = self._prefix, self._suffix, self._best
+        node = self._size + slot
+        best[node] = prefix[node] = suffix[node] = free
+        half = 1
+        node //= 2
+        while node:
+            # Same as _pull(node, half), inlined for the hot path
+            left = 2 * node
+            right = left + 1
+            pl, sr = prefix[left], suffix[right]
+            prefix[node] = pl if pl < half else half + prefix[right]
+            suffix[node] = sr if sr < half else half + suffix[left]
+            cross = suffix[left] + prefix[right]
+            bl, br = best[left], best[right]
+            best[node] = bl if bl >= br and bl >= cross else (br if br >= cross else cross)
+            half *= 2
+            node //= 2
+
+    @property
+    def largest_free_run(self) -> int:
+        """Length of the longest run of contiguous free bays."""
+        return self._best[1] if self.capacity else 0
+
+    def fragmentation(self) -> float:
+        """
+        Share of free bays that lie outside the largest free run.
+
+        0.0 means all free bays are contiguous; values close to 1.0 mean the
+        free space is scattered in small gaps.
+        """
+        if not self.free:
+            return 0.0
+        return 1.0 - self.largest_free_run / self.free
+
+    def is_free(self, slot: int) -> bool:
+        return bool(self._best[self._size + slot])
+
+    def find(self, span: int = 1) -> Optional[int]:
+        """Return the lowest slot starting a free run of `span` bays, or None."""
+        best, prefix, suffix = self._best, self._prefix, self._suffix
+        if span < 1 or not self.capacity or best[1] < span:
+            return None
+        node, start, length = 1, 0, self._size
+        while node < self._size:
+            half = length // 2
+            left, right = 2 * node, 2 * node + 1
+            if best[left] >= span:
+                node = left
+            elif suffix[left] + prefix[right] >= span:
+                return start + half - suffix[left]
+            else:
+                node = right
+                start += half
+            length = half
+        return start
+
+    def allocate(self, span: int = 1) -> Optional[int]:
+        """Reserve the lowest free run of `span` bays and return its first slot."""
+        slot = self.find(span)
+        if slot is not None:
+            for i in range(slot, slot + span):
+                self._set(i, 0)
+            self.free -= span
+        return slot
+
+    def release(self, slot: int, span: int = 1) -> None:
+        """Return `span` bays starting at `slot` to the free pool."""
+        for i in range(slot, slot + span):
+            if self.is_free(i):
+                raise ValueError(f"Slot {i + 1} is already free.")
+            self._set(i, 1)
+        self.free += span
+
+    def _set_many(self, slots: List[int], free: int) -> None:
+        """Set many bays, recomputing each affected tree node once."""
+        size = self._size
+        best, prefix, suffix = self._best, self._prefix, self._suffix
+        for slot in slots:
+            node = size + slot
+            best[node] = prefix[node] = suffix[node] = free
+        nodes = {(size + slot) // 2 for slot in slots}
+        half = 1
+        while nodes:
+            for node in nodes:
+                self._pull(node, half)
+            nodes = {node // 2 for node in nodes if node > 1}
+            half *= 2
+
+    def allocate_many(self, count: int) -> List[int]:
+        """
+        Reserve up to `count` single bays, lowest first, in one tree pass.
+
+        Cheaper than `count` calls to allocate() because the tree nodes above
+        neighbouring bays are only recomputed once.
+        """
+        found = []
+        taken = []  # (node, bays covered) of every subtree handed out whole
+        best, size = self._best, self._size
+        stack = [(1, 0, size)] if self.capacity else []  # (node, first bay, bays covered)
+        while stack and len(found) < count:
+            node, start, length = stack.pop()
+            free = best[node]
+            if not free:
+                continue
+            if free == length and length <= count - len(found):
+                # Whole subtree is free: take it without descending
+                found.extend(range(start, start + length))
+                taken.append((node, length))
+                continue
+            half = length // 2
+            stack.append((2 * node + 1, start + half, half))
+            stack.append((2 * node, start, half))
+        self._clear_subtrees(taken)
+        self.free -= len(found)
+        return found
+
+    def _clear_subtrees(self, subtrees) -> None:
+        """
+        Mark every bay under the given (node, bays covered) subtrees as taken.
+
+        Every node inside a taken subtree becomes 0, so each tree level of
+        it is zeroed with one slice assignment; only the ancestors above
+        the subtrees are recomputed node by node, children before parents.
+        """
+        best, prefix, suffix = self._best, self._prefix, self._suffix
+        size = self._size
+        above = set()
+        for node, length in subtrees:
+            first, width = node, 1
+            while width <= length:
+                zeros = array("i", [0]) * width
+                best[first:first + width] = zeros
+                prefix[first:first + width] = zeros
+                suffix[first:first + width] = zeros
+                first, width = first * 2, width * 2
+            node //= 2
+            while node and node not in above:
+                above.add(node)
+                node //= 2
+        # A node at depth d has an id in [2**d, 2**(d + 1)), so descending ids visit children first
+        for node in sorted(above, reverse=True):
+            self._pull(node, size >> node.bit_length())
+
+    def occupy_many(self, slots: Iterable[int]) -> None:
+        """Mark specific bays as taken, e.g. when rebuilding a level from a snapshot."""
+        slots = list(slots)
+        if len(set(slots)) != len(slots):
+            raise ValueError("Slots to occupy must be distinct.")
+        for slot in slots:
+            if not 0 <= slot < self.capacity or not self.is_free(slot):
+                raise ValueError(f"Slot {slot + 1} is not free.")
+        if len(slots) * self._size.bit_length() > self._size:
+            # Touching most of the tree anyway: set the leaves and rebuild it in one sweep
+            best, prefix, suffix = self._best, self._prefix, self._suffix
+            size = self._size
+            for slot in slots:
+                best[size + slot] = prefix[size + slot] = suffix[size + slot] = 0
+            self._rebuild()
+        else:
+            self._set_many(slots, 0)
+        self.free -= len(slots)
+
+    def release_many(self, slots: Iterable[int]) -> None:
+        """Return many single bays to the free pool at once."""
+        slots = list(slots)
+        for slot in slots:
+            if self.is_free(slot):
+                raise ValueError(f"Slot {slot + 1} is already free.")
+        self._set_many(slots, 1)
+        self.free += len(slots)
@@ -1,11 +1,187 @@
-import tkinter as tk
-from tkinter import messagebox
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox, ttk
 from controller import ParkingController
+from events import LOT_RESET, PARKED, QUEUED, REMOVED, SESSION_ENDED, SESSION_STARTED, WAIT_CANCELLED
+from search import VehicleSearch
 from Vehicle import VehicleType
 
+FRAME_MS = 33  # the UI applies results and redraws at most this often (about 30 fps)
+MAX_LOG_LINES = 500  # older messages are dropped from the output area
+MAX_SEARCH_RESULTS = 50  # matches listed by Find Vehicle
+
+# Changes that alter a row of the vehicle table
+TABLE_EVENTS = (PARKED, REMOVED, LOT_RESET, SESSION_STARTED, SESSION_ENDED, QUEUED, WAIT_CANCELLED)
+
+# Columns of the parked-vehicle table: (id, heading, width)
+TREE_COLUMNS = (
+    ("lot", "Lot", 60),
+    ("level", "Level", 45),
+    ("slot", "Slot", 70),
+    ("type", "Type", 105),
+    ("vehicle", "Vehicle", 200),
+    ("charging", "Charging", 130),
+)
+
+
+def _row(mgr, lot, regnum, location):
+    """Row values of one parked vehicle, in TREE_COLUMNS order."""
+    level_no, kind, index = location
+    v = lot.levels[level_no].vehicle_at(kind, index)
+    session = mgr.active_by_regnum.get(regnum)
+    if session is not None:
+        charging = f"on {session.charger_id}"
+    elif mgr.is_waiting(regnum):
+        charging = "queued"
+    else:
+        charging = ""
+    slot = f"EV {index + 1}" if kind == "ev" else str(index + 1)
+    return (lot.name, level_no, slot, v.vehicle_type.name.replace("_", " ").title(),
+            f"{regnum} ({v.color} {v.make} {v.model})", charging)
+
+
+def occupancy_rows(controller):
+    """Return {regnum: row values} for every parked vehicle, in TREE_COLUMNS order."""
+    mgr = controller.ev_charging_mgr
+    return {regnum: _row(mgr, lot, regnum, location)
+            for lot in controller.lots.values() for regnum, location in lot._index.items()}
+
+
+def current_rows(controller, regnums):
+    """Return {regnum: row values, or None if no longer parked} for the given vehicles only."""
+    mgr = controller.ev_charging_mgr
+    lots = list(controller.lots.values())
+    rows = {}
+    for regnum in regnums:
+        rows[regnum] = None
+        for lot in lots:
+            location = lot.locate(regnum)
+            if location is not None:
+                rows[regnum] = _row(mgr, lot, regnum, location)
+                break
+    return rows
+
+
+def diff_rows(old, new):
+    """
+    Compare two occupancy_rows() results.
+
+    Returns:
+        (regnums to delete, {regnum: values} to insert, {regnum: values} to update)
+    """
+    removed = [regnum for regnum in old if regnum not in new]
+    added = {}
+    changed = {}
+    for regnum, values in new.items():
+        before = old.get(regnum)
+        if before is None:
+            added[regnum] = values
+        elif before != values:
+            changed[regnum] = values
+    return removed, added, changed
+
+
+class ControllerWorker:
+    """
+    Runs controller calls on a background thread, one at a time.
+
+    Tk widgets may only be touched from the Tk thread, so a finished job
+    does not call back directly: its callback and outcome are queued in
+    self.done, which the UI drains from its after() loop.
+
+    The worker follows the controller's change events, so a table delta
+    only re-reads the vehicles named by events since the last one; the
+    whole table is rebuilt only at start-up or if events were dropped.
+    """
+
+    def __init__(self, controller, maxsize=100_000):
+        self.controller = controller
+        self.version = 0  # bumped after every job that may change the lot
+        self.done = queue.Queue()  # (callback, value, exception)
+        self._jobs = queue.Queue()
+        self._changes = controller.events.subscribe(TABLE_EVENTS, maxsize=maxsize)
+        self._dropped = 0
+        self._shown = None  # rows the UI was last sent, owned by the worker thread
+        self._thread = threading.Thread(target=self._run, name="controller-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, job, on_done=None, changes=True):
+        """
+        Queue `job(controller)` for the worker thread.
+
+        Args:
+            job: Callable taking the controller
+            on_done: Called on the Tk thread with (value, exception)
+            changes: Whether the job may change what is parked or charging
+        """
+        self._jobs.put((job, on_done, changes))
+
+    def stop(self):
+        self._changes.close()
+        self._jobs.put(None)
+
+    def _run(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            job, on_done, changes = item
+            try:
+                value, error = job(self.controller), None
+            except Exception as e:
+                value, error = None, e
+            if changes:
+                self.version += 1
+            if on_done is not None:
+                self.done.put((on_done, value, error))
+
+    def table_delta(self, controller):
+        """Job computing what changed in the vehicle table since the last delta, or None if nothing did."""
+        events = self._changes.drain()
+        shown = self._shown
+        if shown is None or self._changes.dropped != self._dropped:
+            self._dropped = self._changes.dropped
+            rows = occupancy_rows(controller)
+            self._shown = rows
+            return diff_rows(shown or {}, rows)
+        if not events:
+            return None
+        touched = set()
+        for event in events:
+            if event.kind == LOT_RESET:
+                touched.update(regnum for regnum, values in shown.items() if values[0] == event.lot)
+            elif event.regnum is not None:
+                touched.add(event.regnum)
+        removed, added, changed = [], {}, {}
+        for regnum, values in current_rows(controller, touched).items():
+            before = shown.get(regnum)
+            if values is None:
+                if before is not None:
+                    removed.append(regnum)
+                    del shown[regnum]
+                continue
+            if before is None:
+                added[regnum] = values
+            elif before != values:
+                changed[regnum] = values
+            shown[regnum] = values
+        return removed, added, changed
+
+
 class ParkingUI:
+    """
+    Tkinter front end.
+
+    Controller calls run on a ControllerWorker thread, so the window stays
+    responsive however large the lot is. Every FRAME_MS the UI applies
+    finished results, appends new messages in one insert, and, if
+    anything changed, asks the worker for the rows that differ from the
+    table on screen. Parked vehicles live in a Treeview keyed by
+    registration number, so a park or remove touches one row instead of
+    redrawing the whole status.
+    """
+
     def __init__(self, root):
         self.root = root
         self.root.title("Parking Lot Manager (Refactored)")
@@ -13,7 +189,15 @@ class ParkingUI:
         self.root.resizable(0, 0)
 
         self.controller = ParkingController()
+        self.worker = ControllerWorker(self.controller)
+        self.search = VehicleSearch(self.controller)
+        self._messages = []  # (text, tag) waiting for the next frame
+        self._table_stale = True
+        self._table_requested = False
+        self._rows_shown = 0  # rows in the vehicle table
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.root.after(FRAME_MS, self._frame)
 
     def setup_ui(self):
         lbl_title = tk.Label(self.root, text="Parking Lot Manager", font="Arial 16 bold")
@@ -93,6 +277,7 @@ class ParkingUI:
         tk.Button(frame_vehicle, text="Park Vehicle", command=self.park_vehicle).grid(row=1, column=4, padx=5)
         tk.Button(frame_vehicle, text="Remove Vehicle", command=self.remove_vehicle).grid(row=1, column=5, padx=5)
         tk.Button(frame_vehicle, text="View Status", command=self.view_status).grid(row=1, column=6, padx=5)
+        tk.Button(frame_vehicle, text="Find", command=self.find_vehicles).grid(row=1, column=7, padx=5)
 
         # EV Charging Controls
         frame_charging = tk.LabelFrame(self.root, text="EV Charging Management", font="Arial 12 bold", padx=10, pady=10)
@@ -101,6 +286,23 @@ class ParkingUI:
         tk.Button(frame_charging, text="View Charging Status", command=self.view_charging_status).pack(side=tk.LEFT, padx=5)
         tk.Button(frame_charging, text="Stop Charging", command=self.stop_charging).pack(side=tk.LEFT, padx=5)
         
+        # Parked vehicles, updated row by row
+        frame_table = tk.Frame(self.root)
+        frame_table.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+        table_scrollbar = tk.Scrollbar(frame_table)
+        table_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.table = ttk.Treeview(frame_table, columns=[c[0] for c in TREE_COLUMNS], show="headings",
+                                  height=12, yscrollcommand=table_scrollbar.set)
+        for column, heading, width in TREE_COLUMNS:
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=width, anchor=tk.W)
+        self.table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        table_scrollbar.config(command=self.table.yview)
+        self.lbl_summary = tk.Label(self.root, text="", anchor="w")
+        self.lbl_summary.pack(padx=10, fill="x")
+
         # Output Text Area with Scrollbar
         frame_output = tk.Frame(self.root)
         frame_output.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
@@ -108,7 +310,7 @@ class ParkingUI:
         scrollbar = tk.Scrollbar(frame_output)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        self.output = tk.Text(frame_output, width=80, height=25, yscrollcommand=scrollbar.set)
+        self.output = tk.Text(frame_output, width=80, height=12, yscrollcommand=scrollbar.set)
         self.output.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         scrollbar.config(command=self.output.yview)
@@ -118,13 +320,74 @@ class ParkingUI:
         self.output.tag_configure('success', foreground='green')
         self.output.tag_configure('error', foreground='red')
 
+    # ==============================
+    # FRAME LOOP
+    # ==============================
+
+    def _frame(self):
+        """Apply finished jobs, flush messages and refresh the table, then schedule the next frame."""
+        while True:
+            try:
+                callback, value, error = self.worker.done.get_nowait()
+            except queue.Empty:
+                break
+            callback(value, error)
+        self._flush_messages()
+        if self._table_stale and not self._table_requested:
+            # Many changes within one frame cost a single table refresh
+            self._table_stale = False
+            self._table_requested = True
+            self.worker.submit(self.worker.table_delta, self._apply_delta, changes=False)
+        self.root.after(FRAME_MS, self._frame)
+
+    def _apply_delta(self, delta, error):
+        self._table_requested = False
+        if error is not None:
+            self.display(f"Error refreshing status: {error}", 'error')
+            return
+        if delta is None:
+            return
+        removed, added, changed = delta
+        table = self.table
+        if removed:
+            table.delete(*removed)
+        for regnum, values in added.items():
+            table.insert("", tk.END, iid=regnum, values=values)
+        for regnum, values in changed.items():
+            table.item(regnum, values=values)
+        self._rows_shown += len(added) - len(removed)
+        self.lbl_summary.config(text=f"{self._rows_shown} vehicles parked")
+
+    def _run(self, job, on_done, changes=True):
+        """Run `job(controller)` on the worker; `on_done(value)` runs on the Tk thread."""
+        def finish(value, error):
+            if changes:
+                self._table_stale = True
+            if error is not None:
+                self.display(f"❌ Error: {error}", 'error')
+            else:
+                on_done(value)
+        self.worker.submit(job, finish, changes)
+
+    def close(self):
+        self.worker.stop()
+        self.search.close()
+        self.root.destroy()
+
+    # ==============================
+    # ACTIONS
+    # ==============================
+
     def create_lot(self):
-        msg = self.controller.create_lot(
-            int(self.entry_regular.get() or 0),
-            int(self.entry_ev.get() or 0),
-            int(self.entry_level.get() or 1)
-        )
-        self.display(msg)
+        try:
+            capacity = int(self.entry_regular.get() or 0)
+            ev_capacity = int(self.entry_ev.get() or 0)
+            level = int(self.entry_level.get() or 1)
+        except ValueError:
+            messagebox.showwarning("Invalid Input", "Slots and level must be whole numbers")
+            return
+        self._run(lambda c: c.create_lot(capacity, ev_capacity, level),
+                  lambda result: self.display(str(result), None if result else 'error'))
 
     def on_vehicle_type_change(self, *args):
         """Update the vehicle type label when selection changes"""
@@ -132,83 +395,130 @@ class ParkingUI:
         self.vehicle_type_label.config(text=self.vehicle_type_map.get(selected_type, selected_type))
         
     def park_vehicle(self):
-        try:
-            reg = self.reg.get().strip()
-            make = self.make.get().strip()
-            model = self.model.get().strip()
-            color = self.color.get().strip()
-            vehicle_type = self.vehicle_type.get()
-            
-            if not all([reg, make, model, color]):
-                messagebox.showwarning("Input Required", "Please fill in all vehicle details")
-                return
-            
-            # Map the vehicle type to the appropriate parameters
-            is_electric = vehicle_type in ("ELECTRIC_CAR", "ELECTRIC_BIKE")
-            is_motorcycle = vehicle_type in ("MOTORCYCLE", "ELECTRIC_BIKE")
-                
-            # Use the park method with vehicle type
-            msg = self.controller.park(
-                regnum=reg,
-                make=make,
-                model=model,
-                color=color,
-                is_electric=is_electric,
-                is_motorcycle=is_motorcycle,
-                vehicle_type=getattr(VehicleType, vehicle_type) if hasattr(VehicleType, vehicle_type) else None
-            )
-            self.display(f"✅ {msg}", 'success')
-            self.view_status()  # Refresh status after parking
-        except Exception as e:
-            self.display(f"❌ Error parking vehicle: {str(e)}", 'error')
+        reg = self.reg.get().strip()
+        make = self.make.get().strip()
+        model = self.model.get().strip()
+        color = self.color.get().strip()
+        vehicle_type = self.vehicle_type.get()
+
+        if not all([reg, make, model, color]):
+            messagebox.showwarning("Input Required", "Please fill in all vehicle details")
+            return
+
+        # Map the vehicle type to the appropriate parameters
+        is_electric = vehicle_type in ("ELECTRIC_CAR", "ELECTRIC_BIKE")
+        is_motorcycle = vehicle_type in ("MOTORCYCLE", "ELECTRIC_BIKE")
+        v_type = getattr(VehicleType, vehicle_type) if hasattr(VehicleType, vehicle_type) else None
+
+        # Use the park method with vehicle type; the table refreshes on the next frame
+        self._run(lambda c: c.park(regnum=reg, make=make, model=model, color=color, is_electric=is_electric,
+                                   is_motorcycle=is_motorcycle, vehicle_type=v_type),
+                  self.show_result)
 
     def remove_vehicle(self):
         reg = self.reg.get().strip()
         if not reg:
             messagebox.showwarning("Input Required", "Please enter a registration number")
             return
-            
-        try:
-            msg = self.controller.remove(reg)
-            self.display(f"✅ {msg}", 'success')
-            self.view_status()  # Refresh status after removal
-        except Exception as e:
-            self.display(f"❌ Error removing vehicle: {str(e)}", 'error')
+        self._run(lambda c: c.remove(reg), self.show_result)
+
+    def find_vehicles(self):
+        """
+        Search parked vehicles.
+
+        A registration number (or its start, or a misread of it) is looked
+        up by plate; otherwise the make, model and color fields that are
+        filled in must all match.
+        """
+        reg = self.reg.get().strip()
+        filters = {name: entry.get().strip() or None
+                   for name, entry in (("make", self.make), ("model", self.model), ("color", self.color))}
+        if reg:
+            query = f"plate {reg}"
+            job = lambda c: self.search.lookup(reg, max_distance=1, limit=MAX_SEARCH_RESULTS)
+        elif any(filters.values()):
+            query = " ".join(value for value in filters.values() if value)
+            job = lambda c: self.search.where(**filters, limit=MAX_SEARCH_RESULTS)
+        else:
+            messagebox.showwarning("Input Required", "Enter a registration number, or a make, model or color")
+            return
+        self._run(job, lambda matches: self.show_matches(query, matches), changes=False)
+
+    def show_matches(self, query, matches):
+        lines = []
+        for match in matches:
+            v = match.vehicle
+            where = f"lot {match.lot}, " if len(self.controller.lots) > 1 else ""
+            slot = f"EV slot {match.slot}" if match.kind == "ev" else f"slot {match.slot}"
+            note = f" (plate differs by {match.distance})" if match.distance else ""
+            lines.append(f"{match.regnum}: {where}level {match.level}, {slot} - {v.color} {v.make} {v.model}{note}")
+        self.show_report(f"=== Search: {query} ===", "\n".join(lines) or "No parked vehicle matches.")
+        found = [match.regnum for match in matches if self.table.exists(match.regnum)]
+        self.table.selection_set(found)
+        if found:
+            self.table.see(found[0])
 
     def view_status(self):
-        try:
-            self.output.delete(1.0, tk.END)
-            self.display("=== Parking Lot Status ===", 'header')
-            self.display(self.controller.get_status())
-            self.display("\n=== EV Charging Status ===", 'header')
-            self.display(self.controller.get_charging_status())
-        except Exception as e:
-            self.display(f"Error getting status: {str(e)}", 'error')
-    
+        """Refresh the vehicle table and show the charger summary."""
+        self._table_stale = True
+        self._run(self._charger_summary, lambda text: self.show_report("=== EV Charging Status ===", text),
+                  changes=False)
+
+    @staticmethod
+    def _charger_summary(controller):
+        return controller.ev_charging_mgr.charger_status().rstrip("\n") or "No chargers registered."
+
     def view_charging_status(self):
-        try:
-            status = self.controller.get_charging_status()
-            self.output.delete(1.0, tk.END)
-            self.display("=== Detailed EV Charging Status ===", 'header')
-            self.display(status)
-        except Exception as e:
-            self.display(f"Error getting charging status: {str(e)}", 'error')
+        self._run(lambda c: c.get_charging_status(),
+                  lambda status: self.show_report("=== Detailed EV Charging Status ===", status),
+                  changes=False)
     
     def stop_charging(self):
-        reg = self.reg.get()
+        reg = self.reg.get().strip()
         if not reg:
             messagebox.showwarning("Input Required", "Please enter a registration number")
             return
-            
-        try:
-            # Find and stop the charging session for this vehicle
-            msg = self.controller.remove(reg)  # This will also stop charging
-            self.display(f"Stopped charging for {reg}", 'success')
+
+        def stopped(result):
+            if result:
+                self.display(f"Stopped charging for {reg}", 'success')
+            else:
+                self.show_result(result)
             self.view_charging_status()  # Refresh charging status
-        except Exception as e:
-            self.display(f"Error stopping charging: {str(e)}", 'error')
+
+        # Removing the vehicle also stops its charging session
+        self._run(lambda c: c.remove(reg), stopped)
+
+    # ==============================
+    # OUTPUT
+    # ==============================
+
+    def show_result(self, result):
+        """Render a controller result record, green on success and red on failure."""
+        if result:
+            self.display(f"✅ {result}", 'success')
+        else:
+            self.display(f"❌ {result}", 'error')
+
+    def show_report(self, header, text):
+        """Replace the output area with a report."""
+        self._messages.clear()
+        self.output.delete(1.0, tk.END)
+        self.display(header, 'header')
+        self.display(text)
 
     def display(self, text, tag=None):
-        self.output.insert(tk.END, text + "\n", tag)
-        self.output.see(tk.END)
-        self.output.update()  # Ensure the display updates immediately
+        """Queue a message; messages are written together on the next frame."""
+        self._messages.append((text, tag))
+
+    def _flush_messages(self):
+        if not self._messages:
+            return
+        output = self.output
+        for text, tag in self._messages:
+            output.insert(tk.END, text + "\n", tag)
+        self._messages.clear()
+        lines = int(output.index("end-1c").split(".")[0])
+        if lines > MAX_LOG_LINES:
+            output.delete(1.0, f"{lines - MAX_LOG_LINES + 1}.0")
+        output.see(tk.END)